@@ -6,6 +6,7 @@ import ArticleSidebar from "@/components/ArticleSidebar";
 import { Avatar, AvatarFallback, AvatarImage } from "@/components/ui/avatar";
 import { Badge } from "@/components/ui/badge";
 import { Calendar, Clock, User, List } from "lucide-react";
+import { ArticleCard } from "@/components/article-card";
 import ReactMarkdown from "react-markdown";
 import remarkGfm from "remark-gfm";
 
@@ -320,7 +321,7 @@ async function getArticle(slug: string): Promise<NextArticleType | null> {
   const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL;
   try {
     const res = await fetch(`${API_BASE_URL}/articles/${slug}`, {
-      next: { revalidate: 300 }, // Revalidate every 5 minutes
+      next: { revalidate: 300, tags: ["articles", `article:${slug}`] }, // Revalidate every 5 minutes
       cache: "force-cache",
     });
 
@@ -354,11 +355,43 @@ async function getArticle(slug: string): Promise<NextArticleType | null> {
   }
 }
 
+interface RelatedArticle {
+  id: string;
+  title: string;
+  slug: string;
+  excerpt?: string;
+  cover_image?: string;
+  category?: string;
+  author?: string;
+  date: string;
+  reading_time?: string; // already formatted, e.g. "5 min read"
+  score: number;
+}
+
+async function getRelatedArticles(slug: string): Promise<RelatedArticle[]> {
+  const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL;
+  try {
+    const res = await fetch(`${API_BASE_URL}/articles/${slug}/related?limit=3`, {
+      next: { revalidate: 300, tags: ["articles", `article:${slug}`] },
+      cache: "force-cache",
+    });
+
+    if (!res.ok) {
+      return [];
+    }
+    const responseData = await res.json();
+    return responseData.related || [];
+  } catch (error) {
+    console.error(`Error fetching related articles for ${slug}:`, error);
+    return [];
+  }
+}
+
 async function getAllArticleSlugs(): Promise<string[]> {
   const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL;
   try {
-    const res = await fetch(`${API_BASE_URL}/articles`, {
-      next: { revalidate: 300 },
+    const res = await fetch(`${API_BASE_URL}/articles?fields=sitemap`, {
+      next: { revalidate: 300, tags: ["articles"] },
       cache: "force-cache",
     });
 
@@ -466,7 +499,10 @@ export async function generateMetadata({
 
 export default async function ArticlePage({ params }: ArticlePageProps) {
   const { slug } = await params;
-  const article = await getArticle(slug);
+  const [article, relatedArticles] = await Promise.all([
+    getArticle(slug),
+    getRelatedArticles(slug),
+  ]);
 
   if (!article) {
     notFound();
@@ -657,6 +693,33 @@ export default async function ArticlePage({ params }: ArticlePageProps) {
                 </p>
               )}
             </article>
+
+            {relatedArticles.length > 0 && (
+              <section className="max-w-4xl mx-auto mt-12">
+                <h2 className="text-2xl font-bold tracking-tight mb-6">
+                  Related Reading
+                </h2>
+                <div className="grid gap-6 sm:grid-cols-2 lg:grid-cols-3">
+                  {relatedArticles.map((related) => (
+                    <ArticleCard
+                      key={related.id}
+                      id={related.slug}
+                      title={related.title}
+                      excerpt={related.excerpt || ""}
+                      coverImage={related.cover_image || ""}
+                      category={related.category || "General"}
+                      date={new Date(related.date).toLocaleDateString("en-US", {
+                        year: "numeric",
+                        month: "long",
+                        day: "numeric",
+                      })}
+                      readingTime={related.reading_time || ""}
+                      author={related.author}
+                    />
+                  ))}
+                </div>
+              </section>
+            )}
           </main>
         </div>
       </div>
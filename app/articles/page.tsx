@@ -6,7 +6,7 @@ const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL;
 
 async function getAllArticles(): Promise<NextArticleType[]> {
   try {
-    const res = await fetch(`${API_BASE_URL}/articles`, {
+    const res = await fetch(`${API_BASE_URL}/articles?fields=card`, {
       next: { revalidate: 300, tags: ["articles"] }, // Revalidate every 5 minutes
       cache: "force-cache",
     });
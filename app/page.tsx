@@ -28,6 +28,7 @@ import { Separator } from "@/components/ui/separator";
 import { NewsletterSignup } from "@/components/newsletter-signup";
 import { HeroSection } from "@/components/hero-section";
 import { RecentArticles } from "@/components/recent-articles";
+import { HotNow } from "@/components/hot-now";
 import type { Article as NextArticleType } from "@/lib/mongodb";
 
 // Define a type for the article structure coming from Flask
@@ -54,7 +55,7 @@ async function getFeaturedArticles(
 ): Promise<NextArticleType[]> {
   const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL;
   try {
-    const res = await fetch(`${API_BASE_URL}/articles?limit=${limit}`, {
+    const res = await fetch(`${API_BASE_URL}/articles?limit=${limit}&fields=card`, {
       next: { revalidate: 3600 },
     });
 
@@ -94,6 +95,7 @@ export default function Home() {
     <div className="flex flex-col">
       <HeroSection />
       <RecentArticles />
+      <HotNow />
 
       <section className="py-12 md:py-16 relative">
         <div className="absolute inset-0 -z-10">
@@ -0,0 +1,28 @@
+import { NextResponse } from "next/server";
+import { proxySyndication } from "@/lib/syndication";
+
+// Sitemap index; article URLs live in /sitemaps/sitemap-<n>.xml shards
+export async function GET(request: Request) {
+  const baseUrl =
+    process.env.NEXT_PUBLIC_SITE_URL || "https://futurehumanjournal.com";
+
+  const proxied = await proxySyndication(request, "sitemap.xml");
+  if (proxied) {
+    return proxied;
+  }
+
+  // Return just the main pages if the backend is not available
+  const lastmod = new Date().toISOString();
+  const fallbackXml = `<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>${baseUrl}</loc><lastmod>${lastmod}</lastmod><changefreq>daily</changefreq><priority>1.0</priority></url>
+  <url><loc>${baseUrl}/articles</loc><lastmod>${lastmod}</lastmod><changefreq>daily</changefreq><priority>0.8</priority></url>
+</urlset>`;
+
+  return new NextResponse(fallbackXml, {
+    headers: {
+      "Content-Type": "application/xml",
+      "Cache-Control": "public, max-age=60, s-maxage=60",
+    },
+  });
+}
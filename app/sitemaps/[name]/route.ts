@@ -0,0 +1,23 @@
+import { NextResponse } from "next/server";
+import { proxySyndication } from "@/lib/syndication";
+
+export async function GET(
+  request: Request,
+  { params }: { params: Promise<{ name: string }> }
+) {
+  const { name } = await params;
+
+  if (!/^sitemap-(pages|\d+)\.xml$/.test(name)) {
+    return new NextResponse("Not found", { status: 404 });
+  }
+
+  const proxied = await proxySyndication(request, `sitemaps/${name}`);
+  if (proxied) {
+    return proxied;
+  }
+
+  return new NextResponse("Sitemap temporarily unavailable", {
+    status: 503,
+    headers: { "Retry-After": "60" },
+  });
+}
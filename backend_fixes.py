@@ -34,12 +34,11 @@ def upload_file():
                 })
                 continue
             
-            # Check file size
-            file.seek(0, os.SEEK_END)
-            file_size = file.tell()
-            file.seek(0)
-            
-            if file_size > app.config['MAX_CONTENT_LENGTH']:
+            # The body was streamed to disk and hashed while the request was
+            # parsed; oversize files stopped being written at the limit
+            try:
+                incoming = ingest_upload(file)
+            except UploadTooLarge:
                 errors.append({
                     "filename": file.filename,
                     "error": f"File too large. Maximum size: {app.config['MAX_CONTENT_LENGTH'] // (1024*1024)}MB"
@@ -47,50 +46,52 @@ def upload_file():
                 continue
 
             try:
-                # Generate secure filename with metadata
                 original_filename = secure_filename(file.filename)
                 file_extension = original_filename.rsplit('.', 1)[1].lower()
-                unique_filename = f"{uuid.uuid4().hex}_{int(datetime.now().timestamp())}.{file_extension}"
-                
                 file_type = get_file_type(original_filename)
+                file_size = incoming.size
+                metrics.inc("upload_bytes_total", file_size, file_type=file_type)
                 
-                # Create organized directory structure
-                date_folder = datetime.now().strftime("%Y/%m/%d")
-                type_folder = UPLOAD_FOLDER / file_type / date_folder
-                type_folder.mkdir(parents=True, exist_ok=True)
-                
-                file_path = type_folder / unique_filename
+                # Content-addressed storage: identical bytes resolve to one blob
+                blob = store_blob(incoming, file_type, file_extension, file.content_type)
+                unique_filename = blob["filename"]
+                file_path = Path(blob["path"])
+                file_url = blob["url"]
+                cdn_url = blob["cdn_url"]  # For CDN integration
                 
-                # Save the file with metadata
-                file.save(str(file_path))
-                
-                # Generate optimized URLs
-                file_url = f"/static/uploads/{file_type}/{date_folder}/{unique_filename}"
-                cdn_url = f"/api/media/{file_type}/{date_folder}/{unique_filename}"  # For CDN integration
-                
-                # Create thumbnail for images
-                thumbnail_url = None
+                # Images are processed in the background (thumbnail, responsive
+                # widths, WebP/AVIF, metadata); duplicates reuse the existing results
+                file_id = uuid.uuid4().hex
+                thumbnail_url = blob.get("thumbnail_url")
+                metadata = blob.get("metadata", {})
+                processing = None
                 if file_type == 'images':
-                    thumbnail_url = create_thumbnail(file_path, unique_filename)
-                
-                # Extract metadata
-                metadata = extract_file_metadata(file_path, file_type)
+                    # Starts the job, joins the one already running, or retries a failed one
+                    processing = start_or_join_media_job(blob, file_id, article_id, upload_type)
+                elif blob["created"]:
+                    with metrics.timer("media_processing_seconds", step="metadata"):
+                        metadata = extract_file_metadata(file_path, file_type)
+                    save_blob_metadata(blob["_id"], metadata)
                 
                 file_info = {
-                    "id": uuid.uuid4().hex,
+                    "id": file_id,
                     "original_name": original_filename,
                     "filename": unique_filename,
                     "file_type": file_type,
                     "file_size": file_size,
                     "human_size": format_file_size(file_size),
+                    "content_hash": blob["_id"],
+                    "deduplicated": not blob["created"],
                     "url": file_url,
                     "cdn_url": cdn_url,
                     "thumbnail_url": thumbnail_url,
+                    "variants": blob.get("variants", []),
                     "uploaded_at": datetime.now(timezone.utc).isoformat(),
                     "mime_type": file.content_type,
                     "metadata": metadata,
                     "upload_type": upload_type,
-                    "article_id": article_id
+                    "article_id": article_id,
+                    "processing": processing
                 }
                 
                 # Store file info in database
@@ -101,6 +102,10 @@ def upload_file():
                     # Add to article attachments
                     add_article_attachment(article_id, file_info)
                 
+                # A duplicate of an already processed image gets its variants now
+                if article_id and file_type == 'images' and not blob["created"] and processing is None:
+                    update_article_media_variants(article_id, file_id, upload_type, blob)
+                
                 uploaded_files.append(file_info)
                 app.logger.info(f"File uploaded successfully: {file_url}")
                 
@@ -147,15 +152,75 @@ def create_article():
     base_slug = generate_slug(data.get("title", ""))
     slug = ensure_unique_slug(base_slug, articles_col)
     
+    article_doc = build_article_doc(data, slug, now_utc)
+
+    try:
+        # The unique slug index settles races; the loser picks the next free slug
+        for attempt in range(SLUG_INSERT_RETRIES):
+            try:
+                result = articles_col.insert_one(article_doc)
+                break
+            except DuplicateKeyError as e:
+                if not is_slug_conflict(e) or attempt == SLUG_INSERT_RETRIES - 1:
+                    raise
+                article_doc.pop("_id", None)
+                article_doc["slug"] = ensure_unique_slug(base_slug, articles_col)
+        app.logger.info(f"Article created with ID: {result.inserted_id}")
+        
+        # Create initial revision
+        create_revision(result.inserted_id, article_doc, "Initial creation")
+        
+        # Make the new article searchable without waiting for the next index sync
+        search_index.add_document(article_doc)
+        
+        # Keep the materialized filter counts in step
+        adjust_facet_counts(db, None, article_doc)
+        
+        # Drop cached listings this article belongs in; published articles
+        # revalidate the frontend through the batched publish fan-out instead
+        published = article_doc["status"] == "published"
+        invalidate_article_cache(article_doc, notify_frontend=not published)
+        
+        # Language/sentiment run off the request path when not already cached
+        if article_doc["language"] is None:
+            schedule_content_enrichment(result.inserted_id, article_doc["content_hash"], article_doc["content"])
+        
+        # Post-publish tasks run batched off the request path; scheduled
+        # articles go on the scheduler's due-queue
+        if published:
+            publish_fanout.enqueue(article_doc)
+        elif article_doc["status"] == "scheduled":
+            publish_scheduler.notify(article_doc)
+        
+        created_article = articles_col.find_one({"_id": result.inserted_id})
+        
+        return jsonify({
+            "success": True,
+            "article": serialize_article(created_article),
+            "message": "Article created successfully"
+        }), 201
+
+    except Exception as e:
+        app.logger.error(f"Error creating article: {e}")
+        return jsonify({"error": "Failed to create article", "details": str(e)}), 500
+
+def build_article_doc(data, slug, now_utc):
+    '''Build a new article document from validated request data'''
+    # Parse the HTML once; everything below is derived from this (cached by hash)
+    analysis = analyze_content(data.get("content") or "")
+    
     # Auto-generate excerpt if not provided
     excerpt = data.get("excerpt")
     if not excerpt and data.get("content"):
-        excerpt = generate_excerpt(data["content"], max_length=160)
+        excerpt = analysis["excerpt"]
     
     # Calculate reading time if not provided
     reading_time = data.get("reading_time")
     if not reading_time and data.get("content"):
-        reading_time = calculate_reading_time(data["content"])
+        reading_time = analysis["reading_time"]
+    
+    # Language and sentiment come from the cache or are filled in asynchronously
+    enrichment = cached_enrichment(analysis["content_hash"])
     
     # Process and validate cover image
     cover_image = data.get("cover_image")
@@ -192,14 +257,14 @@ def create_article():
         "workflow_stage": data.get("workflow_stage", "draft"),
         "attachments": data.get("attachments", []),
         "version": 1,
-        "revision_history": [],
         "is_featured": data.get("is_featured", False),
         "seo_keywords": data.get("seo_keywords", []),
         "meta_description": data.get("meta_description", excerpt),
         "ai_generated": data.get("ai_generated", False),
-        "word_count": count_words(data.get("content", "")),
-        "language": detect_language(data.get("content", "")),
-        "sentiment": analyze_sentiment(data.get("content", "")),
+        "word_count": analysis["word_count"],
+        "content_hash": analysis["content_hash"],
+        "language": enrichment.get("language"),
+        "sentiment": enrichment.get("sentiment"),
     }
     
     # Add auto-save functionality
@@ -209,149 +274,108 @@ def create_article():
             "last_saved": now_utc,
             "version": 1
         }
-
-    try:
-        result = articles_col.insert_one(article_doc)
-        app.logger.info(f"Article created with ID: {result.inserted_id}")
-        
-        # Create initial revision
-        create_revision(result.inserted_id, article_doc, "Initial creation")
-        
-        # Trigger post-creation tasks
-        if article_doc["status"] == "published":
-            trigger_publish_tasks(result.inserted_id)
-        
-        created_article = articles_col.find_one({"_id": result.inserted_id})
-        
-        return jsonify({
-            "success": True,
-            "article": serialize_article(created_article),
-            "message": "Article created successfully"
-        }), 201
-
-    except Exception as e:
-        app.logger.error(f"Error creating article: {e}")
-        return jsonify({"error": "Failed to create article", "details": str(e)}), 500
+    
+    return article_doc
 """
 
 # 3. ENHANCED ARTICLE DISPLAY WITH FILTERING
 """
+from pymongo.errors import ConnectionFailure
+
 @app.route("/articles", methods=["GET"])
+@cached_response(listing_cache_tags)
 def get_articles():
     '''Get articles with advanced filtering and pagination'''
     
     app.logger.info("Fetching articles with filters")
     
-    # Get database collections
+    # Get database collections (raises DatabaseUnavailable -> 503 when Mongo is down)
     db, articles_col, signups_col, projects_col = get_collections()
     
-    if articles_col is None:
-        return jsonify({"error": "Database connection not available"}), 500
-    
-    # Enhanced query parameters
-    search = request.args.get("search", "")
-    category = request.args.get("category")
-    tags = request.args.getlist("tags")  # Multiple tags
-    topics = request.args.getlist("topics")  # Multiple topics
-    author = request.args.get("author")
-    status = request.args.get("status", "published")  # Default to published only
-    date_from = request.args.get("date_from")
-    date_to = request.args.get("date_to")
-    sort_by = request.args.get("sort_by", "date")  # date, views, likes, title
-    sort_order = request.args.get("sort_order", "desc")
-    page = int(request.args.get("page", 1))
-    limit = int(request.args.get("limit", 12))
-    featured_only = request.args.get("featured", "false").lower() == "true"
-    
-    # Build advanced query
-    query = {}
-    
-    # Status filter (allow 'all' to see everything)
-    if status != "all":
-        query["status"] = status
-    
-    # Text search across multiple fields
-    if search:
-        search_regex = {"$regex": search, "$options": "i"}
-        query["$or"] = [
-            {"title": search_regex},
-            {"excerpt": search_regex},
-            {"content": search_regex},
-            {"tags": search_regex},
-            {"seo_keywords": search_regex}
-        ]
-    
-    # Category filter
-    if category:
-        query["category"] = category
-    
-    # Tags filter (match any)
-    if tags:
-        query["tags"] = {"$in": tags}
-    
-    # Topics filter (match any)
-    if topics:
-        query["topics"] = {"$in": topics}
-    
-    # Author filter
-    if author:
-        query["author"] = author
-    
-    # Date range filter
-    if date_from or date_to:
-        date_query = {}
-        if date_from:
-            date_query["$gte"] = date_from
-        if date_to:
-            date_query["$lte"] = date_to
-        query["date"] = date_query
-    
-    # Featured filter
-    if featured_only:
-        query["is_featured"] = True
-    
-    # Sorting options
-    sort_options = {
-        "date": ("date", -1 if sort_order == "desc" else 1),
-        "views": ("view_count", -1 if sort_order == "desc" else 1),
-        "likes": ("likes", -1 if sort_order == "desc" else 1),
-        "title": ("title", 1 if sort_order == "asc" else -1),
-        "updated": ("updated_at", -1 if sort_order == "desc" else 1)
-    }
+    # Parse filters, sort and pagination into a Mongo query
+    try:
+        listing = parse_article_listing(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    sort_field, sort_direction = sort_options.get(sort_by, ("date", -1))
+    query = listing["query"]
+    ranked_ids = listing["ranked_ids"]
+    sort_by = listing["sort_by"]
+    sort_field = listing["sort_field"]
+    sort_direction = listing["sort_direction"]
+    page = listing["page"]
+    limit = listing["limit"]
+    after = listing["after"]
+    cursor_mode = listing["cursor_mode"]
+    include_total = listing["include_total"]
+    fields = listing["fields"]
+    projection = listing["projection"]
     
     try:
-        # Get total count for pagination
-        total = articles_col.count_documents(query)
+        next_cursor = None
+        total = None
+        query_started = time.perf_counter()
         
-        # Calculate pagination metadata
-        total_pages = (total + limit - 1) // limit
-        has_next = page < total_pages
-        has_prev = page > 1
+        if cursor_mode:
+            # Keyset pagination: a range query on (sort_field, _id) instead of skip
+            page_query = query
+            if after:
+                try:
+                    page_query = apply_cursor(query, after, sort_field, sort_direction)
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+            
+            docs = list(
+                articles_col.find(page_query, projection)
+                .sort([(sort_field, sort_direction), ("_id", sort_direction)])
+                .limit(limit + 1)
+            )
+            has_next = len(docs) > limit
+            articles_cursor = docs[:limit]
+            if has_next:
+                next_cursor = encode_cursor(articles_cursor[-1], sort_field, sort_direction)
+            has_prev = bool(after)
+            if include_total:
+                total = cached_count(articles_col, query)
+            total_pages = (total + limit - 1) // limit if total is not None else None
         
-        # Fetch articles with pagination
-        articles_cursor = (
-            articles_col.find(query)
-            .sort(sort_field, sort_direction)
-            .skip((page - 1) * limit)
-            .limit(limit)
-        )
+        elif ranked_ids is not None and sort_by == "relevance":
+            # Keep the index's ranking, restricted to ids that pass the other filters
+            matching = {doc["_id"] for doc in articles_col.find(query, {"_id": 1})}
+            ordered_ids = [obj_id for obj_id in ranked_ids if obj_id in matching]
+            total = len(ordered_ids)
+            page_ids = ordered_ids[(page - 1) * limit:page * limit]
+            docs_by_id = {doc["_id"]: doc for doc in articles_col.find({"_id": {"$in": page_ids}}, projection)}
+            articles_cursor = [docs_by_id[obj_id] for obj_id in page_ids if obj_id in docs_by_id]
+            
+            total_pages = (total + limit - 1) // limit
+            has_next = page < total_pages
+            has_prev = page > 1
+        else:
+            # Get total count for pagination (cached briefly per normalized query)
+            total = cached_count(articles_col, query)
+            
+            # Fetch articles with pagination
+            articles_cursor = list(
+                articles_col.find(query, projection)
+                .sort([(sort_field, sort_direction), ("_id", sort_direction)])
+                .skip((page - 1) * limit)
+                .limit(limit)
+            )
+            
+            # Calculate pagination metadata
+            total_pages = (total + limit - 1) // limit
+            has_next = page < total_pages
+            has_prev = page > 1
         
-        articles = []
-        for article in articles_cursor:
-            serialized = serialize_article(article)
-            # Add interaction counts
-            serialized["interactions"] = {
-                "views": article.get("view_count", 0),
-                "likes": article.get("likes", 0),
-                "shares": article.get("shares", 0),
-                "comments": article.get("comments_count", 0)
-            }
-            articles.append(serialized)
+        metrics.observe("articles_stage_seconds", time.perf_counter() - query_started, stage="query")
         
-        # Get aggregate data for filters
-        aggregates = get_article_aggregates(articles_col, query)
+        with metrics.timer("articles_stage_seconds", stage="serialize"):
+            articles = [serialize_article_profile(article, fields) for article in articles_cursor]
+        
+        # Get aggregate data for filters (materialized counts or cached facets)
+        with metrics.timer("articles_stage_seconds", stage="facets"):
+            aggregates = get_cached_article_aggregates(db, articles_col, query)
         
         response = {
             "success": True,
@@ -361,6 +385,7 @@ def get_articles():
             "total_pages": total_pages,
             "has_next": has_next,
             "has_prev": has_prev,
+            "next_cursor": next_cursor,
             "articles": articles,
             "filters": {
                 "categories": aggregates.get("categories", []),
@@ -371,7 +396,10 @@ def get_articles():
         }
         
         return jsonify(response), 200
-        
+    
+    except (ConnectionFailure, DatabaseUnavailable):
+        # Let handle_database_unavailable trip the circuit breaker and answer 503
+        raise
     except Exception as e:
         app.logger.error(f"Error fetching articles: {e}")
         return jsonify({"error": "Failed to fetch articles", "details": str(e)}), 500
@@ -395,89 +423,102 @@ def article_interaction(article_id):
     except Exception:
         return jsonify({"error": "Invalid article ID"}), 400
     
-    db, articles_col, _, _ = get_collections()
-    
-    article = articles_col.find_one({"_id": obj_id})
-    if not article:
+    # Known articles are answered from the buffer's count cache; only the
+    # first hit for an article since the last flush reads from Mongo
+    if not interaction_buffer.exists(obj_id):
         return jsonify({"error": "Article not found"}), 404
     
     try:
-        update_doc = {}
-        
-        if interaction_type == "view":
-            update_doc = {"$inc": {"view_count": 1}}
-            # Track unique views if user_id provided
-            if user_id:
-                update_doc["$addToSet"] = {"unique_viewers": user_id}
-                
-        elif interaction_type == "like":
-            update_doc = {"$inc": {"likes": 1}}
-            if user_id:
-                update_doc["$addToSet"] = {"liked_by": user_id}
-                
-        elif interaction_type == "unlike":
-            update_doc = {"$inc": {"likes": -1}}
-            if user_id:
-                update_doc["$pull"] = {"liked_by": user_id}
-                
-        elif interaction_type == "share":
-            update_doc = {"$inc": {"shares": 1}}
-            platform = data.get("platform", "unknown")
-            update_doc["$push"] = {
-                "share_history": {
-                    "user_id": user_id,
-                    "platform": platform,
-                    "timestamp": datetime.now(timezone.utc)
-                }
-            }
-        
-        # Update interaction timestamp
-        update_doc["$set"] = {"last_interaction": datetime.now(timezone.utc)}
-        
-        articles_col.update_one({"_id": obj_id}, update_doc)
+        delta, viewer, like, event = interaction_update(interaction_type, user_id, data)
         
-        # Get updated counts
-        updated_article = articles_col.find_one(
-            {"_id": obj_id},
-            {"view_count": 1, "likes": 1, "shares": 1, "comments_count": 1}
-        )
+        # Coalesce into the write-behind buffer; Mongo sees one bulk update
+        # per article per flush instead of find/update/find per hit
+        counts = interaction_buffer.record(obj_id, delta, viewer=viewer, like=like, event=event)
         
-        return jsonify({
-            "success": True,
-            "interaction": interaction_type,
-            "counts": {
-                "views": updated_article.get("view_count", 0),
-                "likes": updated_article.get("likes", 0),
-                "shares": updated_article.get("shares", 0),
-                "comments": updated_article.get("comments_count", 0)
-            }
-        }), 200
+        return jsonify(interaction_response(interaction_type, counts)), 200
         
     except Exception as e:
         app.logger.error(f"Error processing interaction: {e}")
         return jsonify({"error": "Failed to process interaction"}), 500
-"""
 
-# 5. HELPER FUNCTIONS
-"""
-def validate_article_data(data):
-    '''Validate article data and return errors'''
-    errors = []
+@app.route("/articles/<article_id>/stats", methods=["GET"])
+def article_stats(article_id):
+    '''Interaction counts plus the unique-viewer estimate from the HLL sketch'''
+    try:
+        obj_id = ObjectId(article_id)
+    except Exception:
+        return jsonify({"error": "Invalid article ID"}), 400
+    
+    _, articles_col, _, _ = get_collections()
+    projection = {field: 1 for field in INTERACTION_COUNT_FIELDS.values()}
+    article = articles_col.find_one({"_id": obj_id}, dict(projection, uv_hll=1))
+    if not article:
+        return jsonify({"error": "Article not found"}), 404
     
-    if not data.get("title"):
-        errors.append({"field": "title", "message": "Title is required"})
-    elif len(data["title"]) > 200:
-        errors.append({"field": "title", "message": "Title must be less than 200 characters"})
+    counts = {name: article.get(source, 0) for name, source in INTERACTION_COUNT_FIELDS.items()}
+    counts["unique_viewers"] = estimate_unique_viewers(article)
+    return jsonify({"success": True, "article_id": article_id, "counts": counts}), 200
+
+def interaction_update(interaction_type, user_id, data):
+    '''Return (delta, viewer, like, event) to buffer for one interaction'''
+    delta = {}
+    viewer = None
+    like = None
+    event = None
+    now_utc = datetime.now(timezone.utc)
     
-    if not data.get("content"):
-        errors.append({"field": "content", "message": "Content is required"})
-    elif len(data["content"]) < 100:
-        errors.append({"field": "content", "message": "Content must be at least 100 characters"})
+    if interaction_type == "view":
+        delta["view_count"] = 1
+        # Track unique views if user_id provided (HyperLogLog sketch, fixed size)
+        if user_id:
+            viewer = user_id
+            
+    elif interaction_type == "like":
+        delta["likes"] = 1
+        if user_id:
+            like = (user_id, True)
+            
+    elif interaction_type == "unlike":
+        delta["likes"] = -1
+        if user_id:
+            like = (user_id, False)
+            
+    elif interaction_type == "share":
+        delta["shares"] = 1
+        event = {
+            "type": "share",
+            "user_id": user_id,
+            "platform": data.get("platform", "unknown"),
+            "timestamp": now_utc
+        }
     
-    if data.get("category") and data["category"] not in VALID_CATEGORIES:
-        errors.append({"field": "category", "message": f"Invalid category. Valid options: {', '.join(VALID_CATEGORIES)}"})
+    # Likes/unlikes by known users also go to the event log
+    if like and event is None:
+        event = {"type": interaction_type, "user_id": user_id, "timestamp": now_utc}
     
-    return errors
+    return delta, viewer, like, event
+
+def interaction_response(interaction_type, counts):
+    return {
+        "success": True,
+        "interaction": interaction_type,
+        "counts": {
+            "views": counts.get("view_count", 0),
+            "likes": counts.get("likes", 0),
+            "shares": counts.get("shares", 0),
+            "comments": counts.get("comments_count", 0)
+        }
+    }
+"""
+
+# 5. HELPER FUNCTIONS
+"""
+import os
+import threading
+
+def validate_article_data(data):
+    '''Validate article data and return errors (checks compiled from ARTICLE_SCHEMA)'''
+    return article_validator(data)
 
 def generate_slug(title):
     '''Generate URL-friendly slug from title'''
@@ -488,35 +529,44 @@ def generate_slug(title):
 
 def ensure_unique_slug(base_slug, collection):
     '''Ensure slug is unique by appending number if needed'''
-    slug = base_slug
-    counter = 1
-    
-    while collection.find_one({"slug": slug}):
-        slug = f"{base_slug}-{counter}"
-        counter += 1
-    
-    return slug
-
-def generate_excerpt(content, max_length=160):
-    '''Generate excerpt from content'''
-    # Strip HTML tags
-    text = re.sub(r'<[^>]+>', '', content)
-    # Get first paragraph or max_length characters
-    excerpt = text[:max_length]
-    if len(text) > max_length:
-        excerpt = excerpt.rsplit(' ', 1)[0] + '...'
-    return excerpt
+    # One indexed prefix query for base_slug and base_slug-N, however many exist
+    return allocate_slugs([base_slug], collection)[0]
+
+def dedupe_slugs(collection):
+    '''Rename duplicate (or missing) slugs so the unique slug index can build
+
+    The oldest article keeps its slug; the others get the next free base-N.
+    Returns [(article_id, old_slug, new_slug)].
+    '''
+    groups = collection.aggregate([
+        {"$group": {"_id": "$slug", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"$or": [{"count": {"$gt": 1}}, {"_id": None}]}}
+    ], allowDiskUse=True)
+    renamed = []
+    for group in groups:
+        slug = group["_id"]
+        ids = sorted(group["ids"])
+        if slug is None:
+            docs = {doc["_id"]: doc for doc in collection.find({"_id": {"$in": ids}}, {"title": 1})}
+            bases = [generate_slug(docs.get(obj_id, {}).get("title") or "") or "article" for obj_id in ids]
+        else:
+            ids = ids[1:]
+            bases = [slug] * len(ids)
+        for obj_id, new_slug in zip(ids, allocate_slugs(bases, collection)):
+            collection.update_one({"_id": obj_id, "slug": slug}, {"$set": {"slug": new_slug}})
+            renamed.append((obj_id, slug, new_slug))
+    for obj_id, old_slug, new_slug in renamed:
+        app.logger.warning(f"Renamed slug of article {obj_id}: {old_slug!r} -> {new_slug!r}")
+    return renamed
 
-def calculate_reading_time(content):
-    '''Calculate estimated reading time'''
-    words = len(content.split())
-    minutes = max(1, round(words / 200))  # Average 200 words per minute
-    return f"{minutes} min read"
+def ensure_slug_index(collection):
+    '''Unique index on slug: backs the prefix query and rejects racing duplicates'''
+    dedupe_slugs(collection)
+    collection.create_index("slug", unique=True, name="slug_unique")
 
-def count_words(content):
-    '''Count words in content'''
-    text = re.sub(r'<[^>]+>', '', content)
-    return len(text.split())
+def is_slug_conflict(error):
+    '''True if a DuplicateKeyError was raised by the slug index'''
+    return "slug" in (error.details or {}).get("keyPattern", {})
 
 def normalize_tags(tags):
     '''Normalize tags to lowercase and remove duplicates'''
@@ -566,9 +616,106 @@ def format_file_size(size_bytes):
         size_bytes /= 1024.0
     return f"{size_bytes:.1f} TB"
 
-def get_article_aggregates(collection, base_query):
-    '''Get aggregate data for filters'''
-    pipeline = [
+def parse_article_listing(args):
+    '''Turn GET /articles query params into a query, sort and page (ValueError on bad input)'''
+    search = args.get("search", "")
+    category = args.get("category")
+    tags = args.getlist("tags")  # Multiple tags
+    topics = args.getlist("topics")  # Multiple topics
+    author = args.get("author")
+    status = args.get("status", "published")  # Default to published only
+    date_from = args.get("date_from")
+    date_to = args.get("date_to")
+    sort_by = args.get("sort_by", "relevance" if search else "date")  # relevance, date, views, likes, title, trending
+    sort_order = args.get("sort_order", "desc")
+    page = int(args.get("page", 1))
+    limit = int(args.get("limit", 12))
+    after = args.get("after")  # Opaque cursor from a previous next_cursor
+    cursor_mode = after is not None or args.get("paginate") == "cursor"
+    include_total = args.get("include_total", "false" if cursor_mode else "true").lower() == "true"
+    featured_only = args.get("featured", "false").lower() == "true"
+    fields = args.get("fields", "full")  # card, feed, sitemap, full
+    
+    if fields not in PROJECTION_PROFILES:
+        raise ValueError(f"Invalid fields profile. Valid options: {', '.join(PROJECTION_PROFILES)}")
+    
+    # Build advanced query
+    query = {}
+    
+    # Status filter (allow 'all' to see everything)
+    if status != "all":
+        query["status"] = status
+    
+    # Text search via the inverted index (BM25 ranked, prefix match on the last word)
+    ranked_ids = None
+    if search:
+        with metrics.timer("articles_stage_seconds", stage="search"):
+            ranked_ids = search_index.search(search, prefix=True, limit=SEARCH_MAX_RESULTS)
+        query["_id"] = {"$in": ranked_ids}
+    
+    # Category filter
+    if category:
+        query["category"] = category
+    
+    # Tags filter (match any)
+    if tags:
+        query["tags"] = {"$in": tags}
+    
+    # Topics filter (match any)
+    if topics:
+        query["topics"] = {"$in": topics}
+    
+    # Author filter
+    if author:
+        query["author"] = author
+    
+    # Date range filter
+    if date_from or date_to:
+        date_query = {}
+        if date_from:
+            date_query["$gte"] = date_from
+        if date_to:
+            date_query["$lte"] = date_to
+        query["date"] = date_query
+    
+    # Featured filter
+    if featured_only:
+        query["is_featured"] = True
+    
+    # Sorting options
+    sort_options = {
+        "date": ("date", -1 if sort_order == "desc" else 1),
+        "views": ("view_count", -1 if sort_order == "desc" else 1),
+        "likes": ("likes", -1 if sort_order == "desc" else 1),
+        "title": ("title", 1 if sort_order == "asc" else -1),
+        "updated": ("updated_at", -1 if sort_order == "desc" else 1),
+        "trending": ("trending", -1 if sort_order == "desc" else 1)
+    }
+    
+    sort_field, sort_direction = sort_options.get(sort_by, ("date", -1))
+    
+    if cursor_mode and sort_field not in CURSOR_SORT_FIELDS:
+        raise ValueError("Cursor pagination supports sort_by date, views, likes, updated or trending")
+    
+    return {
+        "query": query,
+        "ranked_ids": ranked_ids,
+        "sort_by": sort_by,
+        "sort_field": sort_field,
+        "sort_direction": sort_direction,
+        "page": page,
+        "limit": limit,
+        "after": after,
+        "cursor_mode": cursor_mode,
+        "include_total": include_total,
+        "fields": fields,
+        # Only load what the chosen profile serializes (plus the sort key for cursors)
+        "projection": profile_projection(fields, sort_field)
+    }
+
+def article_aggregate_pipeline(base_query):
+    '''$facet pipeline behind the filter sidebar'''
+    return [
         {"$match": base_query},
         {"$facet": {
             "categories": [
@@ -593,16 +740,5473 @@ def get_article_aggregates(collection, base_query):
             ]
         }}
     ]
-    
-    result = list(collection.aggregate(pipeline))
+
+def get_article_aggregates(collection, base_query):
+    '''Get aggregate data for filters'''
+    result = list(collection.aggregate(article_aggregate_pipeline(base_query)))
     if result:
         return result[0]
     return {}
 
+_worker_start_hooks = []
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+def on_worker_start(hook):
+    '''Register hook() to run once in every worker process before it serves
+
+    Background threads and in-memory indexes belong to the worker, not the
+    module: under gunicorn --preload the master imports app.py and forks, and
+    threads started at import would stay behind in the master.
+    '''
+    _worker_start_hooks.append(hook)
+    return hook
+
+def start_worker():
+    '''Run the worker start hooks once per process
+
+    Called from gunicorn's post_fork, the ASGI lifespan startup and, as a
+    fallback for other servers, before the first request a process handles.
+    '''
+    global _worker_pid
+    with _worker_lock:
+        if _worker_pid == os.getpid():
+            return
+        _worker_pid = os.getpid()
+    for hook in _worker_start_hooks:
+        try:
+            hook()
+        except Exception as e:
+            app.logger.error(f"Worker start hook {getattr(hook, '__name__', hook)} failed: {e}")
+
+@app.before_request
+def _start_worker_on_first_request():
+    if _worker_pid != os.getpid():
+        start_worker()
+
 # Add these constants to your app.py
 VALID_CATEGORIES = [
     "Technology", "AI & Machine Learning", "Future Trends", 
     "Digital Transformation", "Innovation", "Research", 
     "Opinion", "Tutorial", "Case Study", "News"
 ]
-"""
\ No newline at end of file
+
+# Number of times create_article re-allocates a slug that a concurrent write took
+SLUG_INSERT_RETRIES = 3
+"""
+
+# 6. WRITE-BEHIND INTERACTION COUNTER BUFFER
+"""
+import atexit
+import hashlib
+import math
+import os
+import signal
+import threading
+import time
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+# HyperLogLog with 2^9 registers (~4.6% error) stored as "uv_hll.<index>" fields,
+# so merging a register is a plain $max and the sketch never grows past 512 fields
+HLL_PRECISION = 9
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+
+# Events are appended to per-article, per-hour bucket documents of bounded size
+EVENT_BUCKET_MAX_EVENTS = 200
+
+# Listing cache tags (see listing_tags_for) for the sorts a flushed delta reorders
+LISTING_SORT_TAGS = {"view_count": "articles:sort:views", "likes": "articles:sort:likes"}
+TRENDING_SORT_TAG = "articles:sort:trending"
+
+def hll_register(user_id):
+    '''Return (register index, rank) for a viewer id'''
+    x = int.from_bytes(hashlib.blake2b(str(user_id).encode("utf-8"), digest_size=8).digest(), "big")
+    index = x >> (64 - HLL_PRECISION)
+    remaining_bits = 64 - HLL_PRECISION
+    w = x & ((1 << remaining_bits) - 1)
+    return index, remaining_bits - w.bit_length() + 1
+
+def estimate_unique_viewers(article):
+    '''Estimate distinct viewers from an article's uv_hll sketch'''
+    registers = article.get("uv_hll") or {}
+    if not registers:
+        return 0
+    total = sum(2.0 ** -registers.get(str(i), 0) for i in range(HLL_REGISTERS))
+    estimate = HLL_ALPHA * HLL_REGISTERS * HLL_REGISTERS / total
+    zeros = HLL_REGISTERS - len(registers)
+    if estimate <= 2.5 * HLL_REGISTERS and zeros:
+        # Small-range correction (linear counting)
+        estimate = HLL_REGISTERS * math.log(HLL_REGISTERS / zeros)
+    return int(round(estimate))
+
+def event_bucket_start(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+class InteractionBuffer:
+    '''Coalesce article interaction updates and flush them with bulk_write
+    
+    Counters and the unique-viewer sketch go to the article; likes go to
+    article_likes and the event log to article_events, so the article
+    document stays the same size however popular it gets.
+    '''
+    
+    COUNT_FIELDS = ["view_count", "likes", "shares", "comments_count"]
+    
+    def __init__(self, collection_getter, flush_interval=5.0, max_pending=500, listing_invalidate_interval=30.0):
+        self.collection_getter = collection_getter
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.listing_invalidate_interval = listing_invalidate_interval
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.pending = {}      # article _id -> pending update parts
+        self.base_counts = {}  # article _id -> last counts read from Mongo
+        self.slugs = {}        # article _id -> slug (for cache invalidation)
+        self.dirty_listing_tags = set()
+        self.listings_invalidate_after = 0.0
+        self.stopped = threading.Event()
+        self.wake = threading.Event()
+        self.drain_requested = False  # set from the SIGTERM handler, which must not take locks
+        self.thread = None
+        self.pid = None
+    
+    def start(self):
+        '''Start the background flush thread in this process
+
+        record() calls this on its first use in a process, so a buffer created
+        before a fork (gunicorn --preload) gets its thread in each worker.
+        '''
+        with self.start_lock:
+            if self.pid == os.getpid() and self.thread is not None and self.thread.is_alive():
+                return
+            self.stopped.clear()
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self._run, name="interaction-flush", daemon=True)
+            self.thread.start()
+    
+    def _run(self):
+        while not self.stopped.is_set():
+            # Woken early by record() when the buffer fills up
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            if self.stopped.is_set():
+                break
+            try:
+                self.flush()
+                self.invalidate_listings()
+            except Exception as e:
+                app.logger.error(f"Error flushing interaction buffer: {e}")
+            if self.drain_requested:
+                break
+    
+    def exists(self, obj_id):
+        '''Return True if the article exists, caching its counts on first sight'''
+        if self.is_known(obj_id):
+            return True
+        
+        article = self.collection_getter().find_one({"_id": obj_id}, self.lookup_projection())
+        if not article:
+            return False
+        self.remember(obj_id, article)
+        return True
+    
+    def is_known(self, obj_id):
+        with self.lock:
+            return obj_id in self.base_counts
+    
+    def lookup_projection(self):
+        projection = {field: 1 for field in self.COUNT_FIELDS}
+        projection["slug"] = 1
+        return projection
+    
+    def remember(self, obj_id, article):
+        '''Cache counts and slug from an article read with lookup_projection()'''
+        with self.lock:
+            self.base_counts.setdefault(
+                obj_id, {field: article.get(field, 0) for field in self.COUNT_FIELDS}
+            )
+            self.slugs[obj_id] = article.get("slug")
+    
+    def _new_entry(self):
+        return {"inc": {}, "hll": {}, "trending": 0, "likes": {}, "events": [], "last_interaction": None}
+    
+    def record(self, obj_id, delta, viewer=None, like=None, event=None):
+        '''Buffer one interaction and return the optimistic counts
+        
+        viewer is a user id for the unique-viewer sketch, like is a
+        (user_id, liked) pair and event is a dict for the event log.
+        '''
+        should_flush = False
+        if self.pid != os.getpid():
+            self.start()
+        
+        with self.lock:
+            entry = self.pending.get(obj_id)
+            if entry is None:
+                entry = self.pending[obj_id] = self._new_entry()
+            
+            for field, amount in delta.items():
+                entry["inc"][field] = entry["inc"].get(field, 0) + amount
+            # Tracked apart from inc so a failed counter write and a failed
+            # trending write are retried independently
+            entry["trending"] += trending_points(delta)
+            
+            if viewer is not None:
+                index, rank = hll_register(viewer)
+                if rank > entry["hll"].get(index, 0):
+                    entry["hll"][index] = rank
+            
+            # Last like/unlike per user within one window wins
+            if like is not None:
+                user_id, liked = like
+                entry["likes"][user_id] = liked
+            
+            if event is not None:
+                entry["events"].append(event)
+            
+            entry["last_interaction"] = datetime.now(timezone.utc)
+            
+            counts = dict(self.base_counts.get(obj_id, {}))
+            for field, amount in entry["inc"].items():
+                counts[field] = counts.get(field, 0) + amount
+            
+            should_flush = len(self.pending) >= self.max_pending
+        
+        if should_flush:
+            self.wake.set()
+        
+        return counts
+    
+    def _build_operations(self, batch):
+        '''Return (ops, owners) pairs for the articles, likes and events of a batch
+
+        owners[i] is the (obj_id, part) that ops[i] writes, part being
+        "counters", "trending", ("like", user_id) or ("events", chunk).
+        '''
+        article_ops = []
+        owners = []
+        like_ops = []
+        like_owners = []
+        event_ops = []
+        event_owners = []
+        for obj_id, entry in batch.items():
+            inc = {field: amount for field, amount in entry["inc"].items() if amount}
+            if inc or entry["hll"]:
+                update_doc = {"$set": {"last_interaction": entry["last_interaction"]}}
+                if inc:
+                    update_doc["$inc"] = inc
+                if entry["hll"]:
+                    update_doc["$max"] = {f"uv_hll.{index}": rank for index, rank in entry["hll"].items()}
+                article_ops.append(UpdateOne({"_id": obj_id}, update_doc))
+                owners.append((obj_id, "counters"))
+            
+            # Decayed trending score, recomputed server-side from the stored one
+            if entry["trending"]:
+                article_ops.append(trending_update(obj_id, entry["trending"], entry["last_interaction"]))
+                owners.append((obj_id, "trending"))
+            
+            for user_id, liked in entry["likes"].items():
+                key = {"article_id": obj_id, "user_id": user_id}
+                if liked:
+                    like_ops.append(UpdateOne(
+                        key, {"$setOnInsert": {"liked_at": entry["last_interaction"]}}, upsert=True
+                    ))
+                else:
+                    like_ops.append(DeleteOne(key))
+                like_owners.append((obj_id, ("like", user_id)))
+            
+            # Group events by hour; a full bucket makes the upsert create the next one
+            by_bucket = {}
+            for event in entry["events"]:
+                by_bucket.setdefault(event_bucket_start(event["timestamp"]), []).append(event)
+            for bucket, events in by_bucket.items():
+                for start in range(0, len(events), EVENT_BUCKET_MAX_EVENTS):
+                    chunk = events[start:start + EVENT_BUCKET_MAX_EVENTS]
+                    event_ops.append(UpdateOne(
+                        {
+                            "article_id": obj_id,
+                            "bucket": bucket,
+                            "count": {"$lte": EVENT_BUCKET_MAX_EVENTS - len(chunk)}
+                        },
+                        {"$push": {"events": {"$each": chunk}}, "$inc": {"count": len(chunk)}},
+                        upsert=True
+                    ))
+                    event_owners.append((obj_id, ("events", chunk)))
+        return (article_ops, owners), (like_ops, like_owners), (event_ops, event_owners)
+    
+    def _failed_parts(self, batch, owners, indexes):
+        '''Return the part of batch written by the ops at indexes
+
+        The other ops of an unordered bulk_write were applied and must not be
+        retried, or their $inc counters and $push events would apply twice.
+        '''
+        failed = {}
+        for index in indexes:
+            obj_id, part = owners[index]
+            entry = batch[obj_id]
+            retry = failed.get(obj_id)
+            if retry is None:
+                retry = failed[obj_id] = self._new_entry()
+                retry["last_interaction"] = entry["last_interaction"]
+            if part == "counters":
+                retry["inc"] = dict(entry["inc"])
+                retry["hll"] = dict(entry["hll"])
+            elif part == "trending":
+                retry["trending"] = entry["trending"]
+            elif part[0] == "like":
+                retry["likes"][part[1]] = entry["likes"][part[1]]
+            else:
+                retry["events"].extend(part[1])
+        return failed
+    
+    def _write_side(self, collection, ops, owners, batch):
+        '''bulk_write likes or events, requeueing only the ops that failed'''
+        if not ops:
+            return
+        try:
+            collection.bulk_write(ops, ordered=False)
+            return
+        except BulkWriteError as e:
+            error = e
+            indexes = [write_error["index"] for write_error in e.details.get("writeErrors", [])]
+        except Exception as e:
+            error = e
+            indexes = range(len(ops))
+        app.logger.error(f"Writing {collection.name} failed, requeueing {len(indexes)} ops: {error}")
+        self._requeue(self._failed_parts(batch, owners, indexes))
+    
+    def _requeue(self, batch):
+        '''Merge a batch that failed to flush back in front of newer deltas'''
+        with self.lock:
+            for obj_id, failed in batch.items():
+                entry = self.pending.get(obj_id)
+                if entry is None:
+                    self.pending[obj_id] = failed
+                    continue
+                for field, amount in failed["inc"].items():
+                    entry["inc"][field] = entry["inc"].get(field, 0) + amount
+                for index, rank in failed["hll"].items():
+                    entry["hll"][index] = max(rank, entry["hll"].get(index, 0))
+                entry["trending"] += failed["trending"]
+                for user_id, liked in failed["likes"].items():
+                    entry["likes"].setdefault(user_id, liked)
+                entry["events"] = failed["events"] + entry["events"]
+    
+    def flush(self):
+        '''Write all pending deltas to Mongo with one bulk_write per collection'''
+        with self.flush_lock:
+            with self.lock:
+                if not self.pending:
+                    return 0
+                batch = self.pending
+                self.pending = {}
+            
+            (article_ops, owners), likes, events = self._build_operations(batch)
+            failed = {}
+            try:
+                articles_col = self.collection_getter()
+                if article_ops:
+                    articles_col.bulk_write(article_ops, ordered=False)
+            except BulkWriteError as e:
+                # Only the listed ops failed; the rest are already applied
+                indexes = [write_error["index"] for write_error in e.details.get("writeErrors", [])]
+                failed = self._failed_parts(batch, owners, indexes)
+                app.logger.error(f"Interaction flush partly failed, requeueing {len(failed)} articles: {e}")
+                self._requeue(failed)
+            except Exception as e:
+                app.logger.error(f"Interaction flush failed, requeueing {len(batch)} articles: {e}")
+                self._requeue(batch)
+                raise
+            
+            # Counters are safe; failed like/event writes go back to pending
+            db = articles_col.database
+            self._write_side(db["article_likes"], *likes, batch)
+            self._write_side(db["article_events"], *events, batch)
+            
+            # Cached detail payloads carry counts; sorted listings are invalidated
+            # (throttled) by invalidate_listings()
+            tags = [f"article:{obj_id}" for obj_id in batch]
+            tags += [f"article:{self.slugs[obj_id]}" for obj_id in batch if self.slugs.get(obj_id)]
+            response_cache.invalidate(tags)
+            listing_tags = set()
+            for entry in batch.values():
+                listing_tags.update(LISTING_SORT_TAGS[field] for field, amount in entry["inc"].items()
+                                    if amount and field in LISTING_SORT_TAGS)
+                if entry["trending"]:
+                    listing_tags.add(TRENDING_SORT_TAG)
+            
+            # Fold the flushed deltas into the cached base counts (requeued
+            # ones are still counted from pending)
+            with self.lock:
+                for obj_id, entry in batch.items():
+                    counts = self.base_counts.get(obj_id)
+                    if counts is None or failed.get(obj_id, {}).get("inc"):
+                        continue
+                    for field, amount in entry["inc"].items():
+                        counts[field] = counts.get(field, 0) + amount
+                # Drop cached counts for idle articles so the cache stays bounded
+                # and other writers' updates are picked up again
+                if len(self.base_counts) > self.max_pending * 4:
+                    for obj_id in list(self.base_counts):
+                        if obj_id not in self.pending:
+                            del self.base_counts[obj_id]
+                            self.slugs.pop(obj_id, None)
+                self.dirty_listing_tags |= listing_tags
+            
+            app.logger.info(f"Flushed interactions for {len(batch)} articles")
+            return len(article_ops)
+    
+    def invalidate_listings(self, force=False):
+        '''Invalidate the view/like/trending sorted listings flushed deltas reorder
+
+        At most once per listing_invalidate_interval, so busy articles do not
+        empty the listing cache on every flush; later changes wait their turn.
+        '''
+        with self.lock:
+            if not self.dirty_listing_tags:
+                return
+            if not force and time.monotonic() < self.listings_invalidate_after:
+                return
+            tags = sorted(self.dirty_listing_tags)
+            self.dirty_listing_tags = set()
+            self.listings_invalidate_after = time.monotonic() + self.listing_invalidate_interval
+        response_cache.invalidate(tags)
+    
+    def request_drain(self):
+        '''Ask the flush thread to write what is buffered and stop (signal-safe)'''
+        self.drain_requested = True
+    
+    def drain(self):
+        '''Stop the flush thread and write everything still buffered'''
+        self.stopped.set()
+        self.wake.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.flush_interval + 1)
+        for attempt in range(3):
+            try:
+                self.flush()
+                self.invalidate_listings(force=True)
+                return
+            except Exception as e:
+                app.logger.error(f"Interaction drain attempt {attempt + 1} failed: {e}")
+                time.sleep(0.5 * (attempt + 1))
+        app.logger.error(f"Dropping {len(self.pending)} buffered interaction updates on shutdown")
+
+def _drain_interactions_on_signal(signum, frame):
+    # The interrupted frame may hold the buffer's locks, so flushing happens
+    # on the flush thread and in the atexit drain, never here
+    interaction_buffer.request_drain()
+    previous = _previous_sigterm_handler
+    if callable(previous):
+        previous(signum, frame)
+    else:
+        raise SystemExit(0)
+
+def get_articles_collection():
+    _, articles_col, _, _ = get_collections()
+    return articles_col
+
+def ensure_interaction_indexes(db):
+    db["article_likes"].create_index(
+        [("article_id", 1), ("user_id", 1)], unique=True, name="article_user"
+    )
+    db["article_events"].create_index(
+        [("article_id", 1), ("bucket", -1), ("count", 1)], name="article_bucket"
+    )
+
+def migrate_interaction_arrays(db, articles_col):
+    '''One-off: move unique_viewers/liked_by/share_history off article documents'''
+    arrays = {"unique_viewers": 1, "liked_by": 1, "share_history": 1}
+    has_arrays = {"$or": [{field: {"$exists": True}} for field in arrays]}
+    for article in articles_col.find(has_arrays, arrays):
+        obj_id = article["_id"]
+        registers = {}
+        for user_id in article.get("unique_viewers", []):
+            index, rank = hll_register(user_id)
+            registers[index] = max(rank, registers.get(index, 0))
+        
+        update_doc = {"$unset": {field: "" for field in arrays}}
+        if registers:
+            update_doc["$max"] = {f"uv_hll.{index}": rank for index, rank in registers.items()}
+        
+        likes = [
+            UpdateOne({"article_id": obj_id, "user_id": user_id}, {"$setOnInsert": {"liked_at": None}}, upsert=True)
+            for user_id in article.get("liked_by", [])
+        ]
+        if likes:
+            db["article_likes"].bulk_write(likes, ordered=False)
+        
+        shares = [dict(share, type="share") for share in article.get("share_history", []) if share.get("timestamp")]
+        for start in range(0, len(shares), EVENT_BUCKET_MAX_EVENTS):
+            chunk = shares[start:start + EVENT_BUCKET_MAX_EVENTS]
+            db["article_events"].insert_one({
+                "article_id": obj_id,
+                "bucket": event_bucket_start(chunk[0]["timestamp"]),
+                "count": len(chunk),
+                "events": chunk
+            })
+        
+        articles_col.update_one({"_id": obj_id}, update_doc)
+
+# Add these lines to your app.py after the app and get_collections() are set up
+INTERACTION_FLUSH_INTERVAL = float(os.getenv("INTERACTION_FLUSH_INTERVAL", "5"))
+INTERACTION_MAX_PENDING = int(os.getenv("INTERACTION_MAX_PENDING", "500"))
+INTERACTION_LISTING_INVALIDATE_INTERVAL = float(os.getenv("INTERACTION_LISTING_INVALIDATE_INTERVAL", "30"))
+
+interaction_buffer = InteractionBuffer(
+    get_articles_collection,
+    flush_interval=INTERACTION_FLUSH_INTERVAL,
+    max_pending=INTERACTION_MAX_PENDING,
+    listing_invalidate_interval=INTERACTION_LISTING_INVALIDATE_INTERVAL
+)
+# The flush thread starts in each worker on its first record(); nothing runs
+# at import, so a --preload master never forks a dead thread into its workers
+
+# Flush whatever is buffered when the worker exits or is told to stop
+atexit.register(interaction_buffer.drain)
+_previous_sigterm_handler = signal.signal(signal.SIGTERM, _drain_interactions_on_signal)
+"""
+
+# 7. INVERTED FULL-TEXT SEARCH INDEX
+"""
+import bisect
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "in", "is", "it", "its", "of", "on", "or", "that", "the", "this", "to", "was",
+    "were", "will", "with"
+}
+
+# Longest suffix first; the replacement keeps related forms on one stem
+STEM_SUFFIXES = [
+    ("ational", "ate"), ("ization", "ize"), ("fulness", "ful"), ("iveness", "ive"),
+    ("ations", "ate"), ("ation", "ate"), ("ments", ""), ("ment", ""),
+    ("ness", ""), ("ingly", ""), ("edly", ""), ("ing", ""), ("ies", "y"),
+    ("ied", "y"), ("ers", ""), ("er", ""), ("ed", ""), ("es", ""), ("ly", ""), ("s", "")
+]
+
+# Field weights for the BM25 term frequency (title matches count most)
+SEARCH_FIELD_WEIGHTS = {
+    "title": 3.0,
+    "tags": 2.0,
+    "seo_keywords": 2.0,
+    "excerpt": 1.5,
+    "content": 1.0
+}
+
+SEARCH_PROJECTION = {field: 1 for field in SEARCH_FIELD_WEIGHTS}
+SEARCH_PROJECTION["updated_at"] = 1
+
+def stem(token):
+    '''Light suffix-stripping stemmer (keeps stems at least 3 characters long)'''
+    for suffix, replacement in STEM_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) + len(replacement) >= 3:
+            return token[:len(token) - len(suffix)] + replacement
+    return token
+
+def tokenize(text):
+    '''Lowercase, split into words and drop stop words'''
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+class SearchIndex:
+    '''In-process inverted index over article fields with BM25 ranking
+
+    Each worker builds and syncs its own copy from a thread started by
+    start(); searches wait briefly for the first build.
+    '''
+    
+    def __init__(self, k1=1.2, b=0.75, collection_getter=None, sync_interval=60.0, ready_timeout=5.0):
+        self.k1 = k1
+        self.b = b
+        self.collection_getter = collection_getter
+        self.sync_interval = sync_interval
+        self.ready_timeout = ready_timeout
+        self.ready = threading.Event()
+        self.thread = None
+        self.pid = None
+        self.lock = threading.RLock()
+        self.postings = defaultdict(dict)  # stem -> {article _id: weighted tf}
+        self.doc_terms = {}                # article _id -> set of stems (for removal)
+        self.doc_lengths = {}              # article _id -> weighted length
+        self.total_length = 0.0
+        self.sorted_terms = []             # sorted vocabulary for prefix lookups
+        self.terms_dirty = False
+        self.last_synced = None
+    
+    def _document_terms(self, doc):
+        weights = defaultdict(float)
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            value = doc.get(field)
+            if not value:
+                continue
+            if isinstance(value, list):
+                value = " ".join(str(item) for item in value)
+            if field == "content":
+                value = HTML_TAG_RE.sub(' ', value)
+            for token in tokenize(value):
+                weights[stem(token)] += weight
+        return weights
+    
+    def add_document(self, doc):
+        '''Index (or re-index) a single article document'''
+        weights = self._document_terms(doc)
+        doc_id = doc["_id"]
+        with self.lock:
+            self._remove(doc_id)
+            for term, tf in weights.items():
+                if term not in self.postings:
+                    self.terms_dirty = True
+                self.postings[term][doc_id] = tf
+            self.doc_terms[doc_id] = set(weights)
+            length = sum(weights.values())
+            self.doc_lengths[doc_id] = length
+            self.total_length += length
+    
+    def remove_document(self, doc_id):
+        '''Drop an article from the index (e.g. after delete)'''
+        with self.lock:
+            self._remove(doc_id)
+    
+    def _remove(self, doc_id):
+        for term in self.doc_terms.pop(doc_id, ()):
+            docs = self.postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[term]
+                self.terms_dirty = True
+        self.total_length -= self.doc_lengths.pop(doc_id, 0.0)
+    
+    def term_idf(self, terms):
+        '''Inverse document frequency for each term (unknown terms score highest)'''
+        self.wait_ready()
+        with self.lock:
+            doc_count = len(self.doc_lengths)
+            return {
+                term: math.log(1 + (doc_count + 0.5) / (len(self.postings.get(term, ())) + 0.5))
+                for term in terms
+            }
+    
+    def _expand_prefix(self, prefix):
+        if self.terms_dirty:
+            self.sorted_terms = sorted(self.postings)
+            self.terms_dirty = False
+        start = bisect.bisect_left(self.sorted_terms, prefix)
+        matches = []
+        for term in self.sorted_terms[start:]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+    
+    def start(self):
+        '''Start the build/sync thread in this process (once per pid)'''
+        with self.lock:
+            if self.pid == os.getpid() and self.thread is not None and self.thread.is_alive():
+                return
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self._run, name="search-sync", daemon=True)
+            self.thread.start()
+    
+    def _run(self):
+        # A copy inherited across fork keeps its last_synced, so this only catches up
+        while True:
+            try:
+                self.sync(self.collection_getter())
+                self.ready.set()
+            except Exception as e:
+                app.logger.error(f"Error syncing search index: {e}")
+            time.sleep(self.sync_interval)
+    
+    def wait_ready(self):
+        if self.pid != os.getpid():
+            self.start()
+        return self.ready.wait(self.ready_timeout)
+    
+    def search(self, text, prefix=False, limit=1000):
+        '''Return article _ids ranked by BM25 score, best first'''
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        
+        self.wait_ready()
+        with self.lock:
+            doc_count = len(self.doc_lengths)
+            if not doc_count:
+                return []
+            avg_length = self.total_length / doc_count
+            
+            # Each query word is a group of index terms; a prefix group can expand
+            # to many terms, and a document scores on its best term in the group
+            groups = [[stem(token)] for token in tokens]
+            if prefix:
+                last = tokens[-1]
+                groups[-1] = self._expand_prefix(last) or self._expand_prefix(stem(last))
+            
+            scores = defaultdict(float)
+            for terms in groups:
+                best = {}
+                for term in terms:
+                    docs = self.postings.get(term)
+                    if not docs:
+                        continue
+                    idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                    for doc_id, tf in docs.items():
+                        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                        score = idf * tf * (self.k1 + 1) / (tf + norm)
+                        if score > best.get(doc_id, 0.0):
+                            best[doc_id] = score
+                for doc_id, score in best.items():
+                    scores[doc_id] += score
+        
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return [doc_id for doc_id, _ in ranked[:limit]]
+    
+    def build(self, collection):
+        '''Rebuild the whole index from the articles collection'''
+        fresh = SearchIndex(self.k1, self.b)
+        started = datetime.now(timezone.utc)
+        for doc in collection.find({}, SEARCH_PROJECTION):
+            fresh.add_document(doc)
+        with self.lock:
+            self.postings = fresh.postings
+            self.doc_terms = fresh.doc_terms
+            self.doc_lengths = fresh.doc_lengths
+            self.total_length = fresh.total_length
+            self.terms_dirty = True
+            self.last_synced = started
+        self.ready.set()
+        app.logger.info(f"Search index built with {len(self.doc_lengths)} articles")
+    
+    def sync(self, collection):
+        '''Re-index articles changed since the last sync (picks up other workers' writes)'''
+        if self.last_synced is None:
+            return self.build(collection)
+        started = datetime.now(timezone.utc)
+        changed = 0
+        for doc in collection.find({"updated_at": {"$gte": self.last_synced}}, SEARCH_PROJECTION):
+            self.add_document(doc)
+            changed += 1
+        self.last_synced = started
+        return changed
+
+def index_article_change(article_id, deleted=False):
+    '''Call from the update/delete article routes after the write succeeds'''
+    if deleted:
+        search_index.remove_document(article_id)
+        return
+    _, articles_col, _, _ = get_collections()
+    doc = articles_col.find_one({"_id": article_id}, SEARCH_PROJECTION)
+    if doc:
+        search_index.add_document(doc)
+    else:
+        search_index.remove_document(article_id)
+
+# Add these lines to your app.py
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))
+SEARCH_SYNC_INTERVAL = float(os.getenv("SEARCH_SYNC_INTERVAL", "60"))
+SEARCH_READY_TIMEOUT = float(os.getenv("SEARCH_READY_TIMEOUT", "5"))
+
+# Nothing touches Mongo at import; each worker builds its index on start
+search_index = SearchIndex(
+    collection_getter=get_articles_collection,
+    sync_interval=SEARCH_SYNC_INTERVAL,
+    ready_timeout=SEARCH_READY_TIMEOUT
+)
+on_worker_start(search_index.start)
+"""
+
+
+# 8. KEYSET (CURSOR) PAGINATION HELPERS
+"""
+import base64
+import threading
+import time
+from bson import json_util
+
+# Sort fields that can be paginated by cursor; each has a matching compound index
+CURSOR_SORT_FIELDS = ["date", "view_count", "likes", "updated_at", "trending"]
+
+def encode_cursor(article, sort_field, sort_direction):
+    '''Encode the last article of a page as an opaque, URL-safe cursor'''
+    payload = json_util.dumps({
+        "f": sort_field,
+        "d": sort_direction,
+        "v": article.get(sort_field),
+        "id": article["_id"]
+    })
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(token):
+    '''Decode a cursor produced by encode_cursor'''
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        return payload["f"], payload["d"], payload.get("v"), payload["id"]
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+def apply_cursor(query, token, sort_field, sort_direction):
+    '''Return query restricted to documents after the cursor position'''
+    field, direction, value, last_id = decode_cursor(token)
+    if field != sort_field or direction != sort_direction:
+        raise ValueError("Cursor does not match the requested sort")
+    
+    op = "$lt" if sort_direction == -1 else "$gt"
+    if value is None:
+        # Missing values sort first ascending and last descending
+        if sort_direction == -1:
+            after = {field: None, "_id": {op: last_id}}
+        else:
+            after = {"$or": [{field: {"$ne": None}}, {field: None, "_id": {op: last_id}}]}
+    else:
+        after = {"$or": [
+            {field: {op: value}},
+            {field: value, "_id": {op: last_id}}
+        ]}
+        if sort_direction == -1:
+            # Missing/null values (e.g. trending before any interaction) come
+            # after every real value and $lt never matches them
+            after["$or"].append({field: None})
+    
+    if not query:
+        return after
+    return {"$and": [query, after]}
+
+_count_cache = {}
+_count_cache_lock = threading.Lock()
+
+def cached_count(collection, query):
+    '''count_documents with a short per-query TTL cache'''
+    key, total = count_cache_lookup(query)
+    if total is None:
+        total = collection.count_documents(query)
+        count_cache_store(key, total)
+    return total
+
+def count_cache_lookup(query):
+    '''Return (cache key, cached total or None)'''
+    key = json_util.dumps(query, sort_keys=True)
+    with _count_cache_lock:
+        hit = _count_cache.get(key)
+        if hit and hit[1] > time.monotonic():
+            return key, hit[0]
+    return key, None
+
+def count_cache_store(key, total):
+    with _count_cache_lock:
+        if len(_count_cache) >= COUNT_CACHE_MAX_ENTRIES:
+            _count_cache.clear()
+        _count_cache[key] = (total, time.monotonic() + COUNT_CACHE_TTL)
+
+def ensure_pagination_indexes(collection):
+    '''Compound indexes backing the (status, sort_field, _id) range scans'''
+    for field in CURSOR_SORT_FIELDS:
+        collection.create_index(
+            [("status", 1), (field, -1), ("_id", -1)],
+            name=f"status_{field}_id"
+        )
+
+# Add these lines to your app.py
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "30"))
+COUNT_CACHE_MAX_ENTRIES = int(os.getenv("COUNT_CACHE_MAX_ENTRIES", "1000"))
+"""
+
+
+# 9. CACHED AND MATERIALIZED FACET AGGREGATES
+"""
+import threading
+import time
+from bson import json_util
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+FACET_FIELDS = {
+    "categories": "category",
+    "tags": "tags",
+    "topics": "topics",
+    "authors": "author"
+}
+FACET_LIMITS = {"tags": 20, "topics": 20}
+MATERIALIZED_FACET_PROJECTION = {"_id": 0, "facet": 1, "value": 1, "count": 1}
+
+def facet_values(article, facet):
+    '''Values an article contributes to a facet (mirrors the $unwind/$group pipeline)'''
+    value = article.get(FACET_FIELDS[facet])
+    if facet in ("tags", "topics"):
+        return set(value or [])
+    return {value}
+
+def facet_counts_collection(db):
+    return db["article_facet_counts"]
+
+def ensure_facet_indexes(db):
+    facet_counts_collection(db).create_index(
+        [("status", 1), ("facet", 1), ("value", 1)], unique=True, name="status_facet_value"
+    )
+
+def adjust_facet_counts(db, old_article, new_article):
+    '''Apply the facet count difference between two versions of an article
+
+    Pass old_article=None on create and new_article=None on delete; a status
+    change moves the article's contributions from one status bucket to another.
+    '''
+    adjust_facet_counts_many(db, [(old_article, new_article)])
+
+def adjust_facet_counts_many(db, changes):
+    '''Apply several (old_article, new_article) changes in one bulk_write'''
+    deltas = {}
+    for old_article, new_article in changes:
+        for article, sign in ((old_article, -1), (new_article, 1)):
+            if not article:
+                continue
+            status = article.get("status", "draft")
+            for facet in FACET_FIELDS:
+                for value in facet_values(article, facet):
+                    key = (status, facet, value)
+                    deltas[key] = deltas.get(key, 0) + sign
+    
+    operations = [
+        UpdateOne(
+            {"status": status, "facet": facet, "value": value},
+            {"$inc": {"count": delta}},
+            upsert=True
+        )
+        for (status, facet, value), delta in deltas.items() if delta
+    ]
+    if not operations:
+        return
+    
+    try:
+        facet_counts_collection(db).bulk_write(operations, ordered=False)
+    except Exception as e:
+        # The periodic rebuild reconciles anything missed here
+        app.logger.error(f"Error adjusting facet counts: {e}")
+    facet_cache.clear()
+
+def rebuild_facet_counts(db, articles_col):
+    '''Reconcile the materialized facet counts with the articles collection
+
+    Counts are read before the aggregation and corrected with $inc updates
+    conditional on the count read, so an adjust_facet_counts increment that
+    lands during the rebuild makes that row's correction skip (the next run
+    retries it) instead of being overwritten.
+    '''
+    counts_col = facet_counts_collection(db)
+    stored = {
+        (row.get("status", "draft"), row["facet"], row.get("value")): row["count"]
+        for row in counts_col.find({}, {"_id": 0, "status": 1, "facet": 1, "value": 1, "count": 1})
+    }
+    
+    pipeline = [
+        {"$project": {"status": 1, "category": 1, "author": 1, "tags": 1, "topics": 1}},
+        {"$facet": {
+            "categories": [
+                {"$group": {"_id": {"status": "$status", "value": "$category"}, "count": {"$sum": 1}}}
+            ],
+            "tags": [
+                {"$unwind": "$tags"},
+                {"$group": {"_id": {"status": "$status", "value": "$tags", "doc": "$_id"}}},
+                {"$group": {"_id": {"status": "$_id.status", "value": "$_id.value"}, "count": {"$sum": 1}}}
+            ],
+            "topics": [
+                {"$unwind": "$topics"},
+                {"$group": {"_id": {"status": "$status", "value": "$topics", "doc": "$_id"}}},
+                {"$group": {"_id": {"status": "$_id.status", "value": "$_id.value"}, "count": {"$sum": 1}}}
+            ],
+            "authors": [
+                {"$group": {"_id": {"status": "$status", "value": "$author"}, "count": {"$sum": 1}}}
+            ]
+        }}
+    ]
+    result = list(articles_col.aggregate(pipeline))
+    facets = result[0] if result else {}
+    actual = {}
+    for facet in FACET_FIELDS:
+        for row in facets.get(facet, []):
+            actual[(row["_id"].get("status", "draft"), facet, row["_id"].get("value"))] = row["count"]
+    
+    operations = []
+    for key in set(actual) | set(stored):
+        status, facet, value = key
+        want = actual.get(key, 0)
+        have = stored.get(key)
+        row = {"status": status, "facet": facet, "value": value}
+        if have is None:
+            # Created meanwhile by an increment? Then leave it to the next run
+            operations.append(UpdateOne(row, {"$setOnInsert": {"count": want}}, upsert=True))
+        elif have != want:
+            operations.append(UpdateOne(dict(row, count=have), {"$inc": {"count": want - have}}))
+    
+    if operations:
+        try:
+            counts_col.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Upserts that lost a race with a concurrent increment's upsert
+            app.logger.warning(f"Skipped {len(e.details.get('writeErrors', []))} facet corrections: {e}")
+    # Values with no articles left
+    counts_col.delete_many({"count": 0})
+    facet_cache.clear()
+    app.logger.info(f"Reconciled {len(operations)} of {len(actual)} facet counts")
+
+def materialized_facet_match(status):
+    match = {"count": {"$gt": 0}}
+    if status is not None:
+        match["status"] = status
+    return match
+
+def read_materialized_facets(db, status):
+    '''Build the filters payload from the counts collection (status None = all)'''
+    rows = facet_counts_collection(db).find(materialized_facet_match(status), MATERIALIZED_FACET_PROJECTION)
+    return fold_facet_rows(rows)
+
+def materialized_facet_status(query):
+    '''(True, status) when query can be answered from the materialized counts'''
+    if not query:
+        return True, None
+    if set(query) == {"status"} and isinstance(query["status"], str):
+        return True, query["status"]
+    return False, None
+
+def fold_facet_rows(rows):
+    '''Sum per-status count rows into the filters payload'''
+    totals = {facet: {} for facet in FACET_FIELDS}
+    for row in rows:
+        bucket = totals.get(row["facet"])
+        if bucket is not None:
+            bucket[row["value"]] = bucket.get(row["value"], 0) + row["count"]
+    
+    aggregates = {}
+    for facet, bucket in totals.items():
+        rows = sorted(bucket.items(), key=lambda item: item[1], reverse=True)
+        limit = FACET_LIMITS.get(facet)
+        if limit:
+            rows = rows[:limit]
+        aggregates[facet] = [{"_id": value, "count": count} for value, count in rows]
+    return aggregates
+
+class FacetCache:
+    '''Small TTL cache of facet results keyed by the normalized query'''
+    
+    def __init__(self, ttl=300, max_entries=500):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+    
+    def set(self, key, value):
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                oldest = min(self.entries, key=lambda k: self.entries[k][1])
+                del self.entries[oldest]
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+def get_cached_article_aggregates(db, articles_col, query):
+    '''Facets for the filter sidebar without a per-request collection aggregation'''
+    # Plain status listings are answered straight from the materialized counts
+    materialized, status = materialized_facet_status(query)
+    if materialized:
+        return read_materialized_facets(db, status)
+    
+    # Filtered listings fall back to the $facet pipeline, cached per query
+    key = json_util.dumps(query, sort_keys=True)
+    aggregates = facet_cache.get(key)
+    if aggregates is None:
+        aggregates = get_article_aggregates(articles_col, query)
+        facet_cache.set(key, aggregates)
+    return aggregates
+
+def reconcile_facet_counts():
+    db, articles_col, _, _ = get_collections()
+    rebuild_facet_counts(db, articles_col)
+
+# Add these lines to your app.py
+FACET_CACHE_TTL = float(os.getenv("FACET_CACHE_TTL", "300"))
+FACET_REBUILD_INTERVAL = float(os.getenv("FACET_REBUILD_INTERVAL", "3600"))
+
+facet_cache = FacetCache(ttl=FACET_CACHE_TTL)
+
+# reconcile_facet_counts runs as a leader job (registered with leader_jobs),
+# so one worker reconciles, when it takes the lease and every interval after
+
+# In the update/delete/status-change routes, after the write succeeds:
+#     adjust_facet_counts(db, previous_article, updated_article)   # update or status change
+#     adjust_facet_counts(db, deleted_article, None)               # delete
+"""
+
+
+# 10. ASYNCHRONOUS MEDIA PROCESSING PIPELINE
+"""
+# Save as media_worker.py next to app.py.
+#
+# The process pool uses the spawn start method, so every pool process imports
+# the module that defines the submitted function. Keeping it here (stdlib and
+# Pillow only) means a pool process never imports app.py and so never builds
+# the search index, starts background threads or touches the database.
+
+import time
+from pathlib import Path
+
+RESPONSIVE_WIDTHS = [480, 960, 1600]
+THUMBNAIL_SIZE = (300, 300)
+VARIANT_FORMATS = [("webp", "WEBP", {"quality": 80, "method": 4}), ("avif", "AVIF", {"quality": 60})]
+
+def process_image_variants(file_path, url_prefix, widths=None):
+    '''Runs in a worker process: open the image once and derive everything from it
+
+    Returns plain data only (no app or database access happens here).
+    '''
+    from PIL import Image, ImageOps
+    
+    started = time.perf_counter()
+    file_path = Path(file_path)
+    stem = file_path.stem
+    result = {"metadata": {}, "thumbnail_url": None, "variants": [], "errors": []}
+    
+    with Image.open(file_path) as img:
+        result["metadata"] = {
+            "width": img.width,
+            "height": img.height,
+            "format": img.format,
+            "mode": img.mode
+        }
+        source_format = img.format
+        img = ImageOps.exif_transpose(img)
+        img.load()
+    
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    
+    # Thumbnail in the original format
+    thumb = img.copy()
+    thumb.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+    thumb_name = f"thumb_{file_path.name}"
+    try:
+        save_img = thumb.convert("RGB") if source_format == "JPEG" else thumb
+        save_img.save(file_path.parent / thumb_name, format=source_format, optimize=True, quality=85)
+        result["thumbnail_url"] = f"{url_prefix}/{thumb_name}"
+    except Exception as e:
+        result["errors"].append(f"thumbnail: {e}")
+    
+    # Responsive widths, never upscaled, each encoded as WebP and AVIF
+    widths = widths or RESPONSIVE_WIDTHS
+    for width in sorted(set(w for w in widths if w < img.width)) + [img.width]:
+        if width == img.width:
+            resized = img
+        else:
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), Image.Resampling.LANCZOS)
+        for extension, pil_format, options in VARIANT_FORMATS:
+            variant_name = f"{stem}_w{width}.{extension}"
+            try:
+                resized.save(file_path.parent / variant_name, format=pil_format, **options)
+            except Exception as e:
+                # AVIF needs a Pillow build with libavif; skip it quietly if missing
+                result["errors"].append(f"{variant_name}: {e}")
+                continue
+            result["variants"].append({
+                "width": width,
+                "height": resized.height,
+                "format": extension,
+                "url": f"{url_prefix}/{variant_name}"
+            })
+    
+    result["duration_seconds"] = time.perf_counter() - started
+    return result
+"""
+
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from media_worker import process_image_variants
+
+class MediaPipeline:
+    '''Process pool for image work plus job bookkeeping in Mongo'''
+    
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.executor = None
+    
+    def _get_executor(self):
+        # Created lazily so each web worker gets its own pool after forking
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.executor
+    
+    def jobs_collection(self):
+        db, _, _, _ = get_collections()
+        return db["media_jobs"]
+    
+    def submit(self, file_path, url_prefix, file_id, article_id=None, upload_type="general", job_id=None):
+        '''Queue an uploaded image for processing and return its job id'''
+        job_id = job_id or uuid.uuid4().hex
+        now_utc = datetime.now(timezone.utc)
+        self.jobs_collection().insert_one({
+            "_id": job_id,
+            "file_id": file_id,
+            "file_path": str(file_path),
+            "article_id": article_id,
+            "upload_type": upload_type,
+            "status": "pending",
+            "created_at": now_utc,
+            "updated_at": now_utc
+        })
+        
+        future = self._get_executor().submit(process_image_variants, str(file_path), url_prefix)
+        future.add_done_callback(lambda f: self._complete(job_id, file_id, article_id, upload_type, f))
+        return job_id
+    
+    def _complete(self, job_id, file_id, article_id, upload_type, future):
+        now_utc = datetime.now(timezone.utc)
+        try:
+            result = future.result()
+        except Exception as e:
+            app.logger.error(f"Media job {job_id} failed: {e}")
+            self.jobs_collection().update_one(
+                {"_id": job_id},
+                {"$set": {"status": "failed", "error": str(e), "updated_at": now_utc}}
+            )
+            media_blobs_collection().update_one(
+                {"job_id": job_id}, {"$set": {"processing_status": "failed"}}
+            )
+            return
+        
+        metrics.observe("media_processing_seconds", result.get("duration_seconds", 0.0), step="variants")
+        
+        try:
+            job = self.jobs_collection().find_one_and_update(
+                {"_id": job_id},
+                {"$set": {"status": "completed", "result": result, "updated_at": now_utc}}
+            )
+            media_blobs_collection().update_one({"job_id": job_id}, {"$set": {
+                "processing_status": "completed",
+                "thumbnail_url": result["thumbnail_url"],
+                "variants": result["variants"],
+                "metadata": result["metadata"]
+            }})
+            if article_id:
+                update_article_media_variants(article_id, file_id, upload_type, result)
+            # Duplicate uploads that arrived while this job was running
+            for subscriber in (job or {}).get("subscribers", []):
+                if subscriber.get("article_id"):
+                    update_article_media_variants(
+                        subscriber["article_id"], subscriber["file_id"], subscriber["upload_type"], result
+                    )
+            app.logger.info(f"Media job {job_id} completed with {len(result['variants'])} variants")
+        except Exception as e:
+            app.logger.error(f"Error recording media job {job_id}: {e}")
+    
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+def update_article_media_variants(article_id, file_id, upload_type, result):
+    '''Attach processed variants to the article that owns the upload'''
+    try:
+        obj_id = ObjectId(article_id)
+    except Exception:
+        return
+    _, articles_col, _, _ = get_collections()
+    
+    if upload_type == 'cover_image':
+        articles_col.update_one({"_id": obj_id}, {"$set": {
+            "cover_image_thumbnail": result["thumbnail_url"],
+            "cover_image_variants": result["variants"],
+            "cover_image_metadata": result["metadata"]
+        }})
+    elif upload_type == 'attachment':
+        articles_col.update_one(
+            {"_id": obj_id},
+            {"$set": {
+                "attachments.$[file].thumbnail_url": result["thumbnail_url"],
+                "attachments.$[file].variants": result["variants"],
+                "attachments.$[file].metadata": result["metadata"],
+                "attachments.$[file].processing.status": "completed"
+            }},
+            array_filters=[{"file.id": file_id}]
+        )
+
+@app.route("/api/upload/jobs/<job_id>", methods=["GET"])
+def get_media_job(job_id):
+    '''Status of a background media processing job'''
+    job = media_pipeline.jobs_collection().find_one({"_id": job_id}, {"file_path": 0})
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    
+    return jsonify({
+        "success": True,
+        "job_id": job["_id"],
+        "file_id": job.get("file_id"),
+        "status": job["status"],
+        "thumbnail_url": job.get("result", {}).get("thumbnail_url"),
+        "variants": job.get("result", {}).get("variants", []),
+        "metadata": job.get("result", {}).get("metadata", {}),
+        "error": job.get("error"),
+        "updated_at": job["updated_at"].isoformat()
+    }), 200
+
+# Add these lines to your app.py
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "0")) or None
+
+media_pipeline = MediaPipeline(max_workers=MEDIA_WORKERS)
+atexit.register(media_pipeline.shutdown)
+"""
+
+
+# 11. STREAMING UPLOAD INGESTION WITH CONTENT-ADDRESSED DEDUP
+"""
+import hashlib
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from flask import Request, g
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MEDIA_JOB_POLL_INTERVAL = 0.05
+
+class UploadTooLarge(Exception):
+    pass
+
+class HashingUploadStream:
+    '''Write target for Werkzeug's multipart parser that hashes while it writes
+
+    Once the size limit is passed nothing more is written or hashed; the rest
+    of the part is consumed so the other files in the request still parse.
+    '''
+    
+    def __init__(self, directory, max_size):
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=directory, prefix="upload_", suffix=".part")
+        self.file = os.fdopen(fd, "w+b")
+        self.path = Path(path)
+        self.hasher = hashlib.blake2b(digest_size=20)
+        self.size = 0
+        self.max_size = max_size
+        self.too_large = False
+    
+    def write(self, data):
+        if self.too_large:
+            return len(data)
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.too_large = True
+            self.file.truncate(0)
+            return len(data)
+        self.hasher.update(data)
+        return self.file.write(data)
+    
+    @property
+    def hexdigest(self):
+        return self.hasher.hexdigest()
+    
+    def discard(self):
+        '''Close and delete the spool file if it was not moved into storage'''
+        if not self.file.closed:
+            self.file.close()
+        self.path.unlink(missing_ok=True)
+    
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+class StreamingUploadRequest(Request):
+    '''Spool uploaded files straight into the upload area with hashing'''
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        stream = HashingUploadStream(UPLOAD_INCOMING_FOLDER, app.config['MAX_CONTENT_LENGTH'])
+        g.setdefault("upload_streams", []).append(stream)
+        return stream
+
+def ingest_upload(file):
+    '''Return the hashed spool for an uploaded file, raising UploadTooLarge'''
+    stream = file.stream
+    if not isinstance(stream, HashingUploadStream):
+        # Files not parsed by StreamingUploadRequest are copied in chunks
+        stream = HashingUploadStream(UPLOAD_INCOMING_FOLDER, app.config['MAX_CONTENT_LENGTH'])
+        g.setdefault("upload_streams", []).append(stream)
+        while not stream.too_large:
+            chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            stream.write(chunk)
+    
+    if stream.too_large:
+        stream.discard()
+        raise UploadTooLarge()
+    stream.file.flush()
+    return stream
+
+def media_blobs_collection():
+    db, _, _, _ = get_collections()
+    return db["media_blobs"]
+
+def store_blob(stream, file_type, file_extension, mime_type):
+    '''Move a spooled upload into content-addressed storage
+
+    Returns the blob record with created=False when the same bytes are already
+    stored, in which case the spool file is simply dropped.
+    '''
+    digest = stream.hexdigest
+    blobs = media_blobs_collection()
+    
+    existing = blobs.find_one({"_id": digest})
+    if existing:
+        if Path(existing["path"]).exists():
+            stream.discard()
+        else:
+            # Record survived but the file did not; restore it from this upload
+            stream.file.close()
+            Path(existing["path"]).parent.mkdir(parents=True, exist_ok=True)
+            os.replace(stream.path, existing["path"])
+        existing["created"] = False
+        return existing
+    
+    shard = f"{digest[:2]}/{digest[2:4]}"
+    folder = UPLOAD_FOLDER / file_type / shard
+    folder.mkdir(parents=True, exist_ok=True)
+    filename = f"{digest}.{file_extension}"
+    path = folder / filename
+    
+    stream.file.close()
+    os.replace(stream.path, path)
+    
+    blob = {
+        "_id": digest,
+        "file_type": file_type,
+        "filename": filename,
+        "shard": shard,
+        "path": str(path),
+        "url": f"/static/uploads/{file_type}/{shard}/{filename}",
+        "cdn_url": f"/api/media/{file_type}/{shard}/{filename}",
+        "size": stream.size,
+        "mime_type": mime_type,
+        "processing_status": "pending" if file_type == 'images' else "completed",
+        "job_id": None,
+        "thumbnail_url": None,
+        "variants": [],
+        "metadata": {},
+        "created_at": datetime.now(timezone.utc)
+    }
+    try:
+        blobs.insert_one(blob)
+    except DuplicateKeyError:
+        # A concurrent upload of the same bytes won; both wrote identical content
+        existing = blobs.find_one({"_id": digest})
+        existing["created"] = False
+        return existing
+    
+    blob["created"] = True
+    return blob
+
+def claim_blob_job(digest, expected_job_id):
+    '''Atomically give the blob a fresh job id if it still has expected_job_id
+
+    Returns the new job id, or None when another upload claimed it first.
+    '''
+    job_id = uuid.uuid4().hex
+    result = media_blobs_collection().update_one(
+        {"_id": digest, "job_id": expected_job_id},
+        {"$set": {"job_id": job_id, "processing_status": "pending"}}
+    )
+    return job_id if result.modified_count else None
+
+def start_or_join_media_job(blob, file_id, article_id, upload_type):
+    '''Return processing info for an image blob, making sure one job covers it
+
+    The blob's job id is claimed before the job is submitted, so concurrent
+    uploads of the same bytes start one job between them. A duplicate that
+    finds no job id yet waits up to MEDIA_JOB_CLAIM_WAIT for the first upload
+    to claim it, then claims it itself; a failed job is claimed and
+    resubmitted. Returns None when the blob is already processed.
+    '''
+    deadline = time.monotonic() + MEDIA_JOB_CLAIM_WAIT
+    created = blob["created"]
+    while blob is not None:
+        status = blob.get("processing_status")
+        job_id = blob.get("job_id")
+        if status == "completed":
+            return None
+        if job_id is not None and status != "failed":
+            # Same image is still being processed; get notified when it finishes
+            job = subscribe_to_media_job(job_id, file_id, article_id, upload_type)
+            if job is not None and job["status"] == "completed":
+                # Finished after the blob was read, so the subscription came too late
+                if article_id:
+                    update_article_media_variants(article_id, file_id, upload_type, job["result"])
+                return {"job_id": job_id, "status": "completed"}
+            if job is not None and job["status"] != "failed":
+                return {"job_id": job_id, "status": job["status"]}
+            if job is not None:
+                status = "failed"
+        
+        if status == "failed" or created or time.monotonic() >= deadline:
+            new_job_id = claim_blob_job(blob["_id"], job_id)
+            if new_job_id:
+                try:
+                    media_pipeline.submit(
+                        blob["path"], f"/static/uploads/{blob['file_type']}/{blob['shard']}",
+                        file_id=file_id, article_id=article_id, upload_type=upload_type, job_id=new_job_id
+                    )
+                except Exception:
+                    # Leave the blob retryable instead of pointing at a job that never ran
+                    media_blobs_collection().update_one(
+                        {"_id": blob["_id"], "job_id": new_job_id}, {"$set": {"processing_status": "failed"}}
+                    )
+                    raise
+                return {"job_id": new_job_id, "status": "pending"}
+        else:
+            time.sleep(MEDIA_JOB_POLL_INTERVAL)
+        # Lost the claim or still waiting: act on what the other upload did
+        created = False
+        blob = media_blobs_collection().find_one({"_id": blob["_id"]})
+    return None
+
+def save_blob_metadata(digest, metadata):
+    media_blobs_collection().update_one({"_id": digest}, {"$set": {"metadata": metadata}})
+
+def subscribe_to_media_job(job_id, file_id, article_id, upload_type):
+    '''Have a running media job also update another article when it finishes
+
+    Returns the job's status and result after subscribing, or None if the
+    job document does not exist (yet). The job's completion reads its
+    subscribers in the same update that sets "completed", so a subscriber
+    added after that sees status "completed" here and applies the result.
+    '''
+    return media_pipeline.jobs_collection().find_one_and_update(
+        {"_id": job_id},
+        {"$push": {"subscribers": {"file_id": file_id, "article_id": article_id, "upload_type": upload_type}}},
+        projection={"status": 1, "result": 1},
+        return_document=ReturnDocument.AFTER
+    )
+
+@app.teardown_request
+def discard_unused_upload_streams(exc):
+    '''Remove spool files for uploads that were rejected or never stored'''
+    for stream in g.pop("upload_streams", []):
+        stream.discard()
+
+# Add these lines to your app.py (before any request is handled)
+UPLOAD_INCOMING_FOLDER = UPLOAD_FOLDER / ".incoming"
+MEDIA_JOB_CLAIM_WAIT = float(os.getenv("MEDIA_JOB_CLAIM_WAIT", "2"))
+app.request_class = StreamingUploadRequest
+"""
+
+
+# 12. MEDIA SERVING ENDPOINT
+"""
+import mimetypes
+import re
+import stat
+from flask import send_file, make_response, abort
+from werkzeug.security import safe_join
+
+# <blake2b hex>.<ext>, thumb_<hex>.<ext> and <hex>_w<width>.<ext> never change
+HASHED_MEDIA_RE = re.compile(r'^(?:thumb_)?([0-9a-f]{40})(?:_w[0-9]+)?[.][a-z0-9]+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+MUTABLE_MAX_AGE = 24 * 3600
+
+def media_etag(filename, stat_result):
+    '''Strong ETag: the content hash for hashed names, size+mtime otherwise'''
+    match = HASHED_MEDIA_RE.match(filename)
+    if match:
+        return filename.rsplit('.', 1)[0], True
+    return f"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}", False
+
+@app.route("/api/media/<file_type>/<path:subpath>", methods=["GET", "HEAD"])
+def serve_media(file_type, subpath):
+    '''Serve uploaded media with ETags, range requests and sendfile offload'''
+    if file_type not in ALLOWED_EXTENSIONS:
+        abort(404)
+    
+    file_path = safe_join(str(UPLOAD_FOLDER / file_type), subpath)
+    if file_path is None:
+        abort(404)
+    try:
+        stat_result = os.stat(file_path)
+    except (FileNotFoundError, NotADirectoryError):
+        abort(404)
+    # Directories (e.g. a shard path) and other non-files are not media
+    if not stat.S_ISREG(stat_result.st_mode):
+        abort(404)
+    
+    filename = os.path.basename(file_path)
+    etag, immutable = media_etag(filename, stat_result)
+    max_age = IMMUTABLE_MAX_AGE if immutable else MUTABLE_MAX_AGE
+    
+    # Answer revalidation before touching the file body at all
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+        response.set_etag(etag)
+    elif MEDIA_ACCEL_REDIRECT_PREFIX:
+        # Let nginx stream the file (and handle Range) from an internal location
+        response = make_response("", 200)
+        response.headers["X-Accel-Redirect"] = f"{MEDIA_ACCEL_REDIRECT_PREFIX}/{file_type}/{subpath}"
+        response.headers["Content-Type"] = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response.set_etag(etag)
+    else:
+        # conditional=True gives If-Range/Range (206) handling; the WSGI server's
+        # file_wrapper sends the body with sendfile where available
+        response = send_file(
+            file_path,
+            conditional=True,
+            etag=etag,
+            last_modified=stat_result.st_mtime,
+            max_age=max_age
+        )
+        response.headers["Accept-Ranges"] = "bytes"
+    
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+# Add these lines to your app.py
+# Set to the nginx "internal" location that aliases UPLOAD_FOLDER, e.g. /_protected_media
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "").rstrip("/")
+app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE", "false").lower() == "true"
+"""
+
+
+# 13. BATCH ARTICLE IMPORT/CREATE ENDPOINT
+"""
+import json
+from flask import Response, stream_with_context
+from pymongo.errors import BulkWriteError
+
+MAX_BATCH_SIZE = 500
+NDJSON_CHUNK_SIZE = 100
+
+def allocate_slugs(base_slugs, collection, reserved=None):
+    '''Resolve unique slugs for many base slugs with one indexed query
+
+    Uses the same base, base-1, base-2 ... scheme as ensure_unique_slug, and
+    also keeps slugs unique within the batch itself. reserved is a set of
+    slugs handed out earlier (e.g. in previous chunks of one import); it is
+    avoided too and updated with the new slugs.
+    '''
+    unique_bases = list(dict.fromkeys(base_slugs))
+    # Anchored patterns let Mongo use the slug index for each prefix
+    patterns = [re.compile("^" + re.escape(base) + "(-[0-9]+)?$") for base in unique_bases]
+    taken = {
+        doc["slug"]
+        for doc in collection.find({"slug": {"$in": patterns}}, {"slug": 1, "_id": 0})
+    }
+    if reserved is not None:
+        taken |= reserved
+    
+    slugs = []
+    for base in base_slugs:
+        slug = base
+        counter = 1
+        while slug in taken:
+            slug = f"{base}-{counter}"
+            counter += 1
+        taken.add(slug)
+        slugs.append(slug)
+    if reserved is not None:
+        reserved.update(slugs)
+    return slugs
+
+def create_article_batch(items, db, articles_col, start_index=0, reserved_slugs=None):
+    '''Validate, slug, insert and post-process a list of article payloads
+
+    Returns one result dict per item, in input order. reserved_slugs is
+    passed to allocate_slugs so chunks of one import never share a slug.
+    '''
+    results = [None] * len(items)
+    now_utc = datetime.now(timezone.utc)
+    
+    # Validate everything up front; invalid items never reach the database
+    valid = []
+    for offset, data in enumerate(items):
+        index = start_index + offset
+        if not isinstance(data, dict):
+            results[offset] = {"index": index, "success": False, "errors": [{"message": "Article must be an object"}]}
+            continue
+        errors = validate_article_data(data)
+        if errors:
+            results[offset] = {"index": index, "success": False, "errors": errors}
+            continue
+        valid.append((offset, data))
+    
+    if not valid:
+        return results
+    
+    slugs = allocate_slugs(
+        [generate_slug(data.get("title", "")) for _, data in valid], articles_col, reserved_slugs
+    )
+    docs = [build_article_doc(data, slug, now_utc) for (_, data), slug in zip(valid, slugs)]
+    
+    failed = {}
+    try:
+        articles_col.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            message = error.get("errmsg", "Insert failed")
+            if error.get("code") == 11000:
+                message = "Slug was taken by a concurrent write; retry this item"
+            failed[error["index"]] = message
+    
+    inserted = []
+    for position, ((offset, _), doc) in enumerate(zip(valid, docs)):
+        index = start_index + offset
+        if position in failed:
+            results[offset] = {"index": index, "success": False, "errors": [{"message": failed[position]}]}
+            continue
+        inserted.append(doc)
+        results[offset] = {
+            "index": index,
+            "success": True,
+            "id": str(doc["_id"]),
+            "slug": doc["slug"],
+            "status": doc["status"]
+        }
+    
+    if inserted:
+        try:
+            create_initial_revisions(articles_col, inserted)
+        except Exception as e:
+            app.logger.error(f"Error writing batch revisions: {e}")
+        for doc in inserted:
+            search_index.add_document(doc)
+        adjust_facet_counts_many(db, [(None, doc) for doc in inserted])
+        published = [doc for doc in inserted if doc["status"] == "published"]
+        invalidate_article_cache(*inserted, notify_frontend=not published)
+        for doc in inserted:
+            if doc["language"] is None:
+                schedule_content_enrichment(doc["_id"], doc["content_hash"], doc["content"])
+        # One fan-out batch for the whole import instead of one per article
+        if published:
+            publish_fanout.enqueue(*published)
+        for doc in inserted:
+            if doc["status"] == "scheduled":
+                publish_scheduler.notify(doc)
+    
+    app.logger.info(f"Batch created {len(inserted)} of {len(items)} articles")
+    return results
+
+def _ndjson_batches(stream):
+    '''Yield (start_index, items, parse_errors, line_numbers) chunks from an NDJSON body
+
+    line_numbers[i] is the 1-based input line of items[i] (blank lines are
+    skipped, so indexes and line numbers can differ).
+    '''
+    items = []
+    parse_errors = []
+    line_numbers = []
+    start_index = 0
+    index = 0
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError as e:
+            # Keep the slot so result indexes match input lines
+            items.append(None)
+            parse_errors.append((index, str(e)))
+        line_numbers.append(line_number)
+        index += 1
+        if len(items) >= NDJSON_CHUNK_SIZE:
+            yield start_index, items, parse_errors, line_numbers
+            start_index, items, parse_errors, line_numbers = index, [], [], []
+    if items:
+        yield start_index, items, parse_errors, line_numbers
+
+@app.route("/articles/batch", methods=["POST"])
+def create_articles_batch():
+    '''Create many articles at once (JSON array or streamed NDJSON)'''
+    db, articles_col, _, _ = get_collections()
+    
+    if request.mimetype == "application/x-ndjson":
+        def generate():
+            # Slugs handed out anywhere in this stream, so later chunks never reuse one
+            reserved_slugs = set()
+            chunks = []
+            line_errors = []
+            created = 0
+            for start_index, items, parse_errors, line_numbers in _ndjson_batches(request.stream):
+                invalid = {index - start_index: message for index, message in parse_errors}
+                committed = True
+                try:
+                    results = create_article_batch(items, db, articles_col, start_index, reserved_slugs)
+                except Exception as e:
+                    app.logger.error(f"Error creating article batch: {e}")
+                    committed = False
+                    results = [
+                        {"index": start_index + offset, "success": False, "errors": [{"message": str(e)}]}
+                        for offset in range(len(items))
+                    ]
+                chunk_created = 0
+                for offset, result in enumerate(results):
+                    if offset in invalid:
+                        result = {"index": start_index + offset, "success": False,
+                                  "errors": [{"message": f"Invalid JSON: {invalid[offset]}"}]}
+                    result["line"] = line_numbers[offset]
+                    if result["success"]:
+                        chunk_created += 1
+                    else:
+                        line_errors.append({"line": result["line"], "index": result["index"], "errors": result["errors"]})
+                    yield json.dumps(result) + "\n"
+                created += chunk_created
+                chunks.append({
+                    "first_line": line_numbers[0],
+                    "last_line": line_numbers[-1],
+                    "committed": committed,
+                    "created": chunk_created,
+                    "failed": len(items) - chunk_created
+                })
+            
+            # Final line: what was written, chunk by chunk, and every failed line
+            yield json.dumps({
+                "summary": True,
+                "success": created > 0,
+                "created": created,
+                "failed": len(line_errors),
+                "chunks": chunks,
+                "errors": line_errors
+            }) + "\n"
+        
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    
+    data = request.get_json()
+    items = data.get("articles") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Expected a non-empty list of articles"}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch too large. Maximum: {MAX_BATCH_SIZE} articles (use NDJSON for more)"}), 413
+    
+    try:
+        results = create_article_batch(items, db, articles_col)
+    except Exception as e:
+        app.logger.error(f"Error creating article batch: {e}")
+        return jsonify({"error": "Failed to create articles", "details": str(e)}), 500
+    
+    created = sum(1 for result in results if result["success"])
+    return jsonify({
+        "success": created > 0,
+        "created": created,
+        "failed": len(results) - created,
+        "results": results
+    }), 201 if created else 400
+"""
+
+
+# 14. SINGLE-PASS CONTENT ANALYSIS
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from html import unescape
+from html.parser import HTMLParser
+from pymongo import ReturnDocument
+
+WORDS_PER_MINUTE = 200
+BLOCK_TAGS = {"p", "div", "li", "blockquote", "pre", "h1", "h2", "h3", "h4", "h5", "h6", "br", "tr", "section", "article"}
+SKIP_TAGS = {"script", "style", "noscript"}
+
+class _ContentParser(HTMLParser):
+    '''Collect text and a little structure from article HTML in one pass'''
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.headings = []
+        self.images = []
+        self.links = []
+        self.paragraphs = 0
+        self.skip_depth = 0
+        self.heading_tag = None
+        self.heading_parts = []
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+            return
+        if tag in BLOCK_TAGS:
+            self.parts.append(" ")
+        if tag == "p":
+            self.paragraphs += 1
+        elif tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            self.heading_tag = tag
+            self.heading_parts = []
+        elif tag == "img":
+            attributes = dict(attrs)
+            if attributes.get("src"):
+                self.images.append({"src": attributes["src"], "alt": attributes.get("alt", "")})
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+    
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+            return
+        if tag in BLOCK_TAGS:
+            self.parts.append(" ")
+        if tag == self.heading_tag:
+            text = " ".join("".join(self.heading_parts).split())
+            if text:
+                self.headings.append({"level": int(tag[1]), "text": text})
+            self.heading_tag = None
+    
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        self.parts.append(data)
+        if self.heading_tag:
+            self.heading_parts.append(data)
+
+def content_hash(content):
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+def _analyze(content, excerpt_length=160):
+    parser = _ContentParser()
+    try:
+        parser.feed(content)
+        parser.close()
+        text = "".join(parser.parts)
+    except Exception:
+        # Badly broken markup: fall back to treating it as text
+        text = unescape(content)
+    
+    words = text.split()
+    text = " ".join(words)
+    
+    excerpt = text[:excerpt_length]
+    if len(text) > excerpt_length:
+        excerpt = excerpt.rsplit(' ', 1)[0] + '...'
+    
+    minutes = max(1, round(len(words) / WORDS_PER_MINUTE))
+    
+    return {
+        "text": text,
+        "word_count": len(words),
+        "reading_time": f"{minutes} min read",
+        "excerpt": excerpt,
+        "headings": parser.headings,
+        "images": parser.images,
+        "links": parser.links,
+        "paragraphs": parser.paragraphs
+    }
+
+class ContentAnalysisCache:
+    '''Thread-safe LRU keyed by content hash'''
+    
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return value
+    
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+def analyze_content(content):
+    '''Parse article HTML once and derive text, counts, excerpt and structure'''
+    key = content_hash(content)
+    analysis = analysis_cache.get(key)
+    if analysis is None:
+        analysis = _analyze(content)
+        analysis["content_hash"] = key
+        analysis_cache.set(key, analysis)
+    return analysis
+
+def cached_enrichment(key):
+    '''Language/sentiment for a content hash if already computed'''
+    return enrichment_cache.get(key) or {}
+
+def _enrich(article_id, key, content):
+    try:
+        enrichment = enrichment_cache.get(key)
+        if enrichment is None:
+            text = analyze_content(content)["text"]
+            enrichment = {
+                "language": detect_language(text),
+                "sentiment": analyze_sentiment(text)
+            }
+            enrichment_cache.set(key, enrichment)
+        _, articles_col, _, _ = get_collections()
+        # Only apply if the article still has the content we analyzed
+        article = articles_col.find_one_and_update(
+            {"_id": article_id, "content_hash": key},
+            {"$set": enrichment},
+            projection={"slug": 1, "category": 1, "tags": 1, "topics": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if article:
+            # Cached payloads were rendered before language/sentiment existed
+            invalidate_article_cache(article)
+    except Exception as e:
+        app.logger.error(f"Error enriching article {article_id}: {e}")
+
+def schedule_content_enrichment(article_id, key, content):
+    '''Run language detection and sentiment analysis in the background'''
+    enrichment_executor.submit(_enrich, article_id, key, content)
+
+def content_update_fields(existing_article, new_content, data=None):
+    '''Fields to $set when an update or autosave changes the article body
+
+    Returns {} when the content hash is unchanged, so autosaves that only touch
+    other fields skip analysis entirely.
+    '''
+    key = content_hash(new_content)
+    if existing_article.get("content_hash") == key:
+        return {}
+    
+    data = data or {}
+    analysis = analyze_content(new_content)
+    enrichment = cached_enrichment(key)
+    fields = {
+        "content_hash": key,
+        "word_count": analysis["word_count"],
+        "language": enrichment.get("language"),
+        "sentiment": enrichment.get("sentiment")
+    }
+    # Only regenerate derived fields the editor has not set explicitly
+    if not data.get("reading_time"):
+        fields["reading_time"] = analysis["reading_time"]
+    if not data.get("excerpt"):
+        fields["excerpt"] = analysis["excerpt"]
+    return fields
+
+# Add these lines to your app.py
+analysis_cache = ContentAnalysisCache(max_entries=int(os.getenv("CONTENT_ANALYSIS_CACHE_SIZE", "256")))
+enrichment_cache = ContentAnalysisCache(max_entries=int(os.getenv("CONTENT_ENRICHMENT_CACHE_SIZE", "1024")))
+enrichment_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="content-enrich")
+
+# In the update/autosave route:
+#     content_fields = content_update_fields(existing_article, data["content"], data)
+#     update_fields.update(content_fields)
+#     ... write the update ...
+#     if content_fields and content_fields["language"] is None:
+#         schedule_content_enrichment(existing_article["_id"], content_fields["content_hash"], data["content"])
+"""
+
+
+# 15. RESPONSE CACHE WITH TAG-BASED INVALIDATION
+"""
+import json
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from flask import Response
+
+class ResponseCache:
+    '''Two-tier cache of serialized JSON responses with tag invalidation
+
+    Entries remember the version of each of their tags when stored; bumping a
+    tag's version makes every entry carrying it stale. The local tier is an
+    LRU with TTL. When REDIS_URL is set, bodies and tag versions are also kept
+    in Redis so invalidations reach every worker.
+    '''
+    
+    def __init__(self, ttl=300, max_entries=1000, redis_url=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (body, tag_versions, expires_at)
+        self.tag_versions = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.redis = None
+        if redis_url:
+            try:
+                import redis
+                self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.05)
+            except ImportError:
+                app.logger.warning("redis package not installed; response cache is local only")
+    
+    def snapshot(self, tags):
+        '''Tag versions to store with a body; take it before reading the data'''
+        return self._current_versions(list(tags))
+    
+    def _current_versions(self, tags):
+        if self.redis is None:
+            with self.lock:
+                return {tag: self.tag_versions.get(tag, 0) for tag in tags}
+        try:
+            values = self.redis.mget([f"cache:tag:{tag}" for tag in tags])
+            return {tag: int(value or 0) for tag, value in zip(tags, values)}
+        except Exception as e:
+            app.logger.warning(f"Shared cache unavailable: {e}")
+            with self.lock:
+                return {tag: self.tag_versions.get(tag, 0) for tag in tags}
+    
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[2] > now:
+                self.entries.move_to_end(key)
+            else:
+                entry = None
+        
+        if entry is None and self.redis is not None:
+            try:
+                raw = self.redis.get(f"cache:body:{key}")
+                if raw:
+                    stored = json.loads(raw)
+                    entry = (stored["body"].encode("utf-8"), stored["tags"], now + self.ttl)
+            except Exception as e:
+                app.logger.warning(f"Shared cache read failed: {e}")
+        
+        if entry is not None:
+            body, stored_versions, _ = entry
+            if self._current_versions(list(stored_versions)) == stored_versions:
+                with self.lock:
+                    self.entries[key] = entry
+                    self.hits += 1
+                return body
+        
+        with self.lock:
+            self.entries.pop(key, None)
+            self.misses += 1
+        return None
+    
+    def set(self, key, body, versions):
+        '''Store body under the versions snapshot taken before it was built
+
+        An invalidation that lands while the body is being built bumps a
+        version past the snapshot, so the entry is stale on its first read.
+        '''
+        with self.lock:
+            self.entries[key] = (body, versions, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        if self.redis is not None:
+            try:
+                payload = json.dumps({"body": body.decode("utf-8"), "tags": versions})
+                self.redis.set(f"cache:body:{key}", payload, ex=int(self.ttl))
+            except Exception as e:
+                app.logger.warning(f"Shared cache write failed: {e}")
+    
+    def invalidate(self, tags):
+        with self.lock:
+            for tag in tags:
+                self.tag_versions[tag] = self.tag_versions.get(tag, 0) + 1
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                for tag in tags:
+                    pipe.incr(f"cache:tag:{tag}")
+                pipe.execute()
+            except Exception as e:
+                app.logger.warning(f"Shared cache invalidation failed: {e}")
+
+def request_cache_key():
+    '''Path plus the query params in a stable order'''
+    return cache_key_for(request.path, request.args.items(multi=True))
+
+def cache_key_for(path, params):
+    return f"{path}?{urllib.parse.urlencode(sorted(params))}"
+
+def listing_cache_tags():
+    '''Tags for a GET /articles response'''
+    return listing_tags_for(request.args)
+
+def listing_tags_for(args):
+    '''Tags for a listing with these query params
+
+    Listings narrowed only by category/tags/topics carry those tags so writes
+    elsewhere leave them cached; anything else depends on the whole listing.
+    Listings sorted by views, likes or trending also carry articles:sort:<sort>,
+    which interaction flushes invalidate.
+    '''
+    narrowing = {"category", "tags", "topics"}
+    other_filters = {"search", "author", "date_from", "date_to", "featured"}
+    sort_by = args.get("sort_by")
+    sort_tags = [f"articles:sort:{sort_by}"] if sort_by in ("views", "likes", "trending") else []
+    if any(args.get(name) for name in other_filters):
+        return ["articles"] + sort_tags
+    
+    tags = [f"articles:category:{value}" for value in args.getlist("category")]
+    tags += [f"articles:tag:{value}" for value in args.getlist("tags")]
+    tags += [f"articles:topic:{value}" for value in args.getlist("topics")]
+    if not any(args.get(name) for name in narrowing):
+        return ["articles"] + sort_tags
+    return tags + sort_tags
+
+def cached_response(tags_fn):
+    '''Cache a route's successful JSON response under the tags from tags_fn()'''
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request_cache_key()
+            body = response_cache.get(key)
+            if body is not None:
+                response = Response(body, status=200, mimetype="application/json")
+                response.headers["X-Cache"] = "HIT"
+                return response
+            
+            versions = response_cache.snapshot(tags_fn(*args, **kwargs))
+            result = view(*args, **kwargs)
+            response = app.make_response(result)
+            if response.status_code == 200 and response.mimetype == "application/json":
+                response_cache.set(key, response.get_data(), versions)
+            response.headers["X-Cache"] = "MISS"
+            return response
+        return wrapper
+    return decorator
+
+def article_cache_tags(article):
+    '''Backend cache tags an article write affects'''
+    tags = ["articles", f"article:{article['_id']}"]
+    if article.get("slug"):
+        tags.append(f"article:{article['slug']}")
+    if article.get("category"):
+        tags.append(f"articles:category:{article['category']}")
+    tags += [f"articles:tag:{tag}" for tag in article.get("tags", [])]
+    tags += [f"articles:topic:{topic}" for topic in article.get("topics", [])]
+    return tags
+
+def invalidate_article_cache(*articles, notify_frontend=True):
+    '''Invalidate cached responses for written articles (pass old and new on update)'''
+    tags = []
+    frontend_tags = ["articles"]
+    for article in articles:
+        if not article:
+            continue
+        tags += article_cache_tags(article)
+        if article.get("slug"):
+            frontend_tags.append(f"article:{article['slug']}")
+    if not tags:
+        return
+    response_cache.invalidate(list(dict.fromkeys(tags)))
+    if notify_frontend:
+        notify_frontend_revalidate(list(dict.fromkeys(frontend_tags)))
+
+def _post_revalidate(tag):
+    url = f"{FRONTEND_URL}/api/revalidate?{urllib.parse.urlencode({'tag': tag})}"
+    req = urllib.request.Request(
+        url, method="POST", headers={"x-revalidate-token": REVALIDATE_TOKEN}, data=b""
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            resp.read()
+    except Exception as e:
+        app.logger.warning(f"Frontend revalidate for {tag} failed: {e}")
+
+def notify_frontend_revalidate(tags):
+    '''Call the Next.js /api/revalidate hook for each tag, off the request path'''
+    if not FRONTEND_URL or not REVALIDATE_TOKEN:
+        return
+    for tag in tags:
+        revalidate_executor.submit(_post_revalidate, tag)
+
+# Add these lines to your app.py
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+FRONTEND_URL = os.getenv("FRONTEND_URL", "").rstrip("/")
+REVALIDATE_TOKEN = os.getenv("REVALIDATE_TOKEN", "")
+REVALIDATE_WORKERS = int(os.getenv("REVALIDATE_WORKERS", "4"))
+
+# Bounded so a large batch import queues its revalidate calls instead of
+# starting a thread per tag
+revalidate_executor = ThreadPoolExecutor(max_workers=REVALIDATE_WORKERS, thread_name_prefix="frontend-revalidate")
+
+response_cache = ResponseCache(
+    ttl=RESPONSE_CACHE_TTL,
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    redis_url=os.getenv("REDIS_URL")
+)
+
+# Single-article route: cache by slug/id and tag it so writes invalidate it
+#     @app.route("/articles/<slug>", methods=["GET"])
+#     @cached_response(lambda slug: [f"article:{slug}"])
+#     def get_article(slug): ...
+#         (load with PROJECTION_PROFILES["detail"] and serialize with
+#         serialize_article_profile(article, "detail") for interactions.unique_viewers)
+#
+# Update/delete routes, after the write succeeds:
+#     invalidate_article_cache(previous_article, updated_article)
+"""
+
+
+# 16. FIELD PROJECTIONS AND LEAN LIST SERIALIZERS
+"""
+from bson import ObjectId
+
+CARD_FIELDS = [
+    "title", "slug", "excerpt", "cover_image", "category", "tags", "topics",
+    "author", "author_image", "date", "reading_time", "status", "is_featured",
+    "published_date", "updated_at", "view_count", "likes", "shares", "comments_count"
+]
+FEED_FIELDS = ["title", "slug", "excerpt", "category", "author", "date", "published_date", "updated_at"]
+SITEMAP_FIELDS = ["slug", "date", "updated_at"]
+
+# Internal fields never sent to clients, even with the full profile
+INTERNAL_FIELDS = ["uv_hll", "trending", "trending_score", "trending_at"]
+
+PROJECTION_PROFILES = {
+    "card": {field: 1 for field in CARD_FIELDS},
+    "feed": {field: 1 for field in FEED_FIELDS},
+    "sitemap": {field: 1 for field in SITEMAP_FIELDS},
+    # trending stays loaded: the serializer turns it into the decayed trending_score
+    "full": {field: 0 for field in INTERNAL_FIELDS if field != "trending"},
+    # Single-article payload: full, plus the sketch behind interactions.unique_viewers
+    "detail": {field: 0 for field in INTERNAL_FIELDS if field not in ("uv_hll", "trending")}
+}
+
+INTERACTION_COUNT_FIELDS = {
+    "views": "view_count",
+    "likes": "likes",
+    "shares": "shares",
+    "comments": "comments_count"
+}
+
+def profile_projection(profile, sort_field=None):
+    '''Mongo projection for a profile, making sure the sort key is loaded'''
+    projection = PROJECTION_PROFILES[profile]
+    if sort_field and projection and next(iter(projection.values())) == 1 and sort_field not in projection:
+        projection = dict(projection, **{sort_field: 1})
+    return projection
+
+def _lean_value(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def serialize_article_profile(article, profile="full"):
+    '''Serialize an article for a projection profile
+
+    Uses the profile's precompiled serializer; ObjectId and datetime values
+    are left for the app's JSON provider to encode.
+    '''
+    return ARTICLE_SERIALIZERS[profile](article)
+"""
+
+
+# 17. DELTA-COMPRESSED REVISION STORAGE
+"""
+import difflib
+import json
+import re
+import zlib
+from bson import Binary, ObjectId
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Every Nth revision in a chain is stored whole, bounding reconstruction cost
+REVISION_SNAPSHOT_INTERVAL = 20
+# Fall back to a snapshot when a delta is not clearly smaller than one
+REVISION_DELTA_MAX_RATIO = 0.5
+# Autosave revisions kept per article by compaction (manual saves are always kept)
+AUTOSAVE_REVISIONS_KEPT = 10
+
+# Small fields stored verbatim with every revision; content is delta-encoded
+REVISION_META_FIELDS = [
+    "title", "excerpt", "category", "tags", "topics", "cover_image",
+    "meta_description", "seo_keywords", "status"
+]
+
+# Split HTML before each tag so edits line up with markup boundaries
+CONTENT_TOKEN_RE = re.compile(r'(?=<)')
+
+def revisions_collection():
+    db, _, _, _ = get_collections()
+    return db["article_revisions"]
+
+def tokenize_content(content):
+    return [token for token in CONTENT_TOKEN_RE.split(content or "") if token]
+
+def compress_payload(payload):
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    if zstandard is not None:
+        return "zstd", Binary(zstandard.ZstdCompressor(level=10).compress(raw))
+    return "zlib", Binary(zlib.compress(raw, 9))
+
+def decompress_payload(codec, data):
+    if codec == "zstd":
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        raw = zlib.decompress(data)
+    return json.loads(raw)
+
+def make_delta(old_tokens, new_tokens):
+    '''Edit script turning old_tokens into new_tokens: ["=", n], ["-", n], ["+", [...]]'''
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i2 - i1])
+            continue
+        if i2 > i1:
+            ops.append(["-", i2 - i1])
+        if j2 > j1:
+            ops.append(["+", new_tokens[j1:j2]])
+    return ops
+
+def apply_delta(old_tokens, ops):
+    tokens = []
+    position = 0
+    for op, value in ops:
+        if op == "=":
+            tokens.extend(old_tokens[position:position + value])
+            position += value
+        elif op == "-":
+            position += value
+        else:
+            tokens.extend(value)
+    return tokens
+
+def build_revision_doc(article_id, article_doc, message, previous=None, previous_tokens=None, autosave=False):
+    '''Encode one revision as a snapshot or a delta against the previous one'''
+    tokens = tokenize_content(article_doc.get("content"))
+    codec, snapshot = compress_payload(tokens)
+    doc = {
+        "article_id": article_id,
+        "version": article_doc.get("version", 1),
+        "message": message,
+        "autosave": autosave,
+        "meta": {field: article_doc.get(field) for field in REVISION_META_FIELDS},
+        "content_hash": article_doc.get("content_hash"),
+        "created_at": datetime.now(timezone.utc),
+        "kind": "snapshot",
+        "chain_length": 0,
+        "codec": codec,
+        "data": snapshot
+    }
+    
+    if previous is not None and previous_tokens is not None and previous["chain_length"] + 1 < REVISION_SNAPSHOT_INTERVAL:
+        codec, delta = compress_payload(make_delta(previous_tokens, tokens))
+        if len(delta) < len(snapshot) * REVISION_DELTA_MAX_RATIO:
+            doc.update({
+                "kind": "delta",
+                "base_version": previous["version"],
+                "chain_length": previous["chain_length"] + 1,
+                "codec": codec,
+                "data": delta
+            })
+    doc["stored_bytes"] = len(doc["data"])
+    return doc
+
+def create_revision(article_id, article_doc, message, previous_content=None, autosave=False):
+    '''Record a revision of an article (pass the old content on updates if at hand)
+
+    previous_content is only diffed against when it hashes to the content of
+    the latest stored revision; the delta is replayed against that revision,
+    so anything else (an update that saved no revision) gets a snapshot.
+    '''
+    revisions = revisions_collection()
+    previous = revisions.find_one(
+        {"article_id": article_id},
+        {"version": 1, "chain_length": 1, "content_hash": 1},
+        sort=[("version", -1)]
+    )
+    previous_tokens = None
+    if previous is not None:
+        if previous_content is None:
+            previous_tokens = reconstruct_revision(article_id, previous["version"])["tokens"]
+        elif previous.get("content_hash") and content_hash(previous_content) == previous["content_hash"]:
+            previous_tokens = tokenize_content(previous_content)
+    
+    doc = build_revision_doc(article_id, article_doc, message, previous, previous_tokens, autosave)
+    revisions.insert_one(doc)
+    return doc
+
+def create_initial_revisions(articles_col, article_docs, message="Initial creation"):
+    '''Record the initial (snapshot) revision for many new articles at once'''
+    docs = [build_revision_doc(doc["_id"], doc, message) for doc in article_docs]
+    if docs:
+        revisions_collection().insert_many(docs, ordered=False)
+
+def reconstruct_revision(article_id, version):
+    '''Rebuild a version by following base_version links back to a snapshot'''
+    revisions = revisions_collection()
+    target = revisions.find_one({"article_id": article_id, "version": version}, {"data": 0})
+    if target is None:
+        return None
+    
+    # Walk down from the target; revisions off the chain (e.g. ones a
+    # compaction has not deleted yet) are skipped
+    chain = []
+    needed = version
+    cursor = revisions.find(
+        {"article_id": article_id, "version": {"$lte": version}},
+        sort=[("version", -1)]
+    )
+    for revision in cursor:
+        if revision["version"] != needed:
+            continue
+        chain.append(revision)
+        if revision["kind"] == "snapshot":
+            break
+        needed = revision["base_version"]
+    cursor.close()
+    
+    tokens = []
+    for revision in reversed(chain):
+        payload = decompress_payload(revision["codec"], revision["data"])
+        tokens = payload if revision["kind"] == "snapshot" else apply_delta(tokens, payload)
+    
+    target["tokens"] = tokens
+    target["content"] = "".join(tokens)
+    return target
+
+def compact_revisions(article_id):
+    '''Drop old autosave revisions and re-encode the survivors as a fresh chain'''
+    revisions = revisions_collection()
+    all_revisions = list(revisions.find({"article_id": article_id}, sort=[("version", 1)]))
+    autosaves = [rev["version"] for rev in all_revisions if rev.get("autosave")]
+    drop = set(autosaves[:-AUTOSAVE_REVISIONS_KEPT]) if AUTOSAVE_REVISIONS_KEPT else set(autosaves)
+    if all_revisions:
+        drop.discard(all_revisions[-1]["version"])
+    if not drop:
+        return 0
+    
+    # Decode every revision in order, then rebuild the chain over what is kept
+    decoded = {}
+    rebuilt = []
+    previous = None
+    previous_tokens = None
+    for revision in all_revisions:
+        payload = decompress_payload(revision["codec"], revision["data"])
+        if revision["kind"] == "snapshot":
+            tokens = payload
+        else:
+            tokens = apply_delta(decoded[revision["base_version"]], payload)
+        decoded[revision["version"]] = tokens
+        if revision["version"] in drop:
+            continue
+        article_doc = dict(revision["meta"], content="".join(tokens), version=revision["version"],
+                           content_hash=revision.get("content_hash"))
+        doc = build_revision_doc(article_id, article_doc, revision["message"], previous, previous_tokens,
+                                 revision.get("autosave", False))
+        doc["_id"] = revision["_id"]
+        doc["created_at"] = revision["created_at"]
+        rebuilt.append(doc)
+        previous, previous_tokens = doc, list(tokens)
+    
+    # Each rewritten revision decodes to the same content as before and links
+    # only to earlier kept ones, so every intermediate state is a valid chain;
+    # the dropped revisions are unlinked before they are deleted
+    for doc in rebuilt:
+        revisions.replace_one({"_id": doc["_id"]}, doc)
+    revisions.delete_many({"article_id": article_id, "version": {"$in": sorted(drop)}})
+    app.logger.info(f"Compacted {len(drop)} autosave revisions for article {article_id}")
+    return len(drop)
+
+def _revision_summary(revision):
+    return {
+        "version": revision["version"],
+        "message": revision.get("message"),
+        "autosave": revision.get("autosave", False),
+        "kind": revision["kind"],
+        "stored_bytes": revision.get("stored_bytes"),
+        "title": revision.get("meta", {}).get("title"),
+        "created_at": revision["created_at"].isoformat()
+    }
+
+@app.route("/articles/<article_id>/revisions", methods=["GET"])
+def list_revisions(article_id):
+    '''Revision history (metadata only) for the admin editor'''
+    try:
+        obj_id = ObjectId(article_id)
+    except Exception:
+        return jsonify({"error": "Invalid article ID"}), 400
+    
+    cursor = revisions_collection().find(
+        {"article_id": obj_id}, {"data": 0}, sort=[("version", -1)]
+    )
+    return jsonify({"success": True, "revisions": [_revision_summary(rev) for rev in cursor]}), 200
+
+@app.route("/articles/<article_id>/revisions/<int:version>", methods=["GET"])
+def get_revision(article_id, version):
+    '''A single reconstructed revision'''
+    try:
+        obj_id = ObjectId(article_id)
+    except Exception:
+        return jsonify({"error": "Invalid article ID"}), 400
+    
+    revision = reconstruct_revision(obj_id, version)
+    if revision is None:
+        return jsonify({"error": "Revision not found"}), 404
+    
+    result = _revision_summary(revision)
+    result.update(revision.get("meta", {}))
+    result["content"] = revision["content"]
+    return jsonify({"success": True, "revision": result}), 200
+
+@app.route("/articles/<article_id>/revisions/diff", methods=["GET"])
+def diff_revisions(article_id):
+    '''Token-level diff between two versions (?from=<v>&to=<v>)'''
+    try:
+        obj_id = ObjectId(article_id)
+        from_version = int(request.args["from"])
+        to_version = int(request.args["to"])
+    except Exception:
+        return jsonify({"error": "Valid article ID and integer from/to versions are required"}), 400
+    
+    old = reconstruct_revision(obj_id, from_version)
+    new = reconstruct_revision(obj_id, to_version)
+    if old is None or new is None:
+        return jsonify({"error": "Revision not found"}), 404
+    
+    changes = []
+    matcher = difflib.SequenceMatcher(None, old["tokens"], new["tokens"], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        changes.append({
+            "op": tag,
+            "from": "".join(old["tokens"][i1:i2]),
+            "to": "".join(new["tokens"][j1:j2])
+        })
+    
+    meta_changes = {
+        field: {"from": old["meta"].get(field), "to": new["meta"].get(field)}
+        for field in REVISION_META_FIELDS
+        if old["meta"].get(field) != new["meta"].get(field)
+    }
+    return jsonify({
+        "success": True,
+        "from": from_version,
+        "to": to_version,
+        "changes": changes,
+        "meta_changes": meta_changes
+    }), 200
+
+def ensure_revision_indexes(db):
+    db["article_revisions"].create_index(
+        [("article_id", 1), ("version", -1)], unique=True, name="article_version"
+    )
+
+# In the update/autosave route, after bumping "version" and writing the article:
+#     create_revision(obj_id, updated_article, data.get("revision_message", "Update"),
+#                     previous_content=existing_article["content"], autosave=bool(data.get("auto_save")))
+#     if data.get("auto_save"):
+#         compact_revisions(obj_id)  # or from a periodic job
+"""
+
+
+# 18. DATA-ACCESS LAYER: POOLED CLIENT, STARTUP INDEXES AND HEALTH
+"""
+import threading
+import time
+from pymongo import MongoClient, monitoring
+from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+
+class DatabaseUnavailable(Exception):
+    pass
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    '''Connection pool counters fed by PyMongo's CMAP events'''
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "pool_clears": 0,
+            "in_use": 0
+        }
+        self.checkout_wait_total = 0.0
+        self.pending_checkouts = threading.local()
+    
+    def _bump(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+    
+    def snapshot(self):
+        with self.lock:
+            data = dict(self.counters)
+            checkouts = data["checkouts"] or 1
+            data["avg_checkout_wait_ms"] = round(self.checkout_wait_total / checkouts * 1000, 3)
+            return data
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        self._bump("pool_clears")
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_created(self, event):
+        self._bump("connections_created")
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        self._bump("connections_closed")
+    
+    def connection_check_out_started(self, event):
+        self.pending_checkouts.started = time.perf_counter()
+    
+    def connection_check_out_failed(self, event):
+        self._bump("checkout_failures")
+    
+    def connection_checked_out(self, event):
+        started = getattr(self.pending_checkouts, "started", None)
+        with self.lock:
+            self.counters["checkouts"] += 1
+            self.counters["in_use"] += 1
+            if started is not None:
+                self.checkout_wait_total += time.perf_counter() - started
+    
+    def connection_checked_in(self, event):
+        self._bump("in_use", -1)
+
+class DataAccess:
+    '''One MongoClient per worker process, created lazily after fork
+
+    Also owns startup index creation and a short circuit breaker: after a
+    connection failure, requests fail immediately for DB_RETRY_AFTER seconds
+    instead of each waiting out the server selection timeout.
+    '''
+    
+    def __init__(self, uri, db_name, pool_options=None, retry_after=5.0, listeners=None):
+        self.uri = uri
+        self.db_name = db_name
+        self.pool_options = pool_options or {}
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.client = None
+        self.pid = None
+        self.collections = None
+        self.down_until = 0.0
+        self.last_error = None
+        self.metrics = PoolMetrics()
+        # PyMongo fixes event listeners per client, so they are given up front
+        self.listeners = list(listeners or [])
+        self.index_setup = []
+    
+    def _connect(self):
+        client = MongoClient(self.uri, event_listeners=[self.metrics] + self.listeners, **self.pool_options)
+        db = client[self.db_name]
+        self.client = client
+        self.pid = os.getpid()
+        self.collections = (db, db["articles"], db["signups"], db["projects"])
+    
+    def get_collections(self):
+        if time.monotonic() < self.down_until:
+            raise DatabaseUnavailable(f"Database unavailable: {self.last_error}")
+        # A client inherited across fork is unusable; make a fresh one per process
+        if self.collections is None or self.pid != os.getpid():
+            with self.lock:
+                if self.collections is None or self.pid != os.getpid():
+                    self._connect()
+        return self.collections
+    
+    def mark_down(self, error):
+        self.last_error = str(error)
+        self.down_until = time.monotonic() + self.retry_after
+    
+    def reset(self):
+        '''Drop the client (call from gunicorn post_fork or on shutdown)'''
+        with self.lock:
+            if self.client is not None and self.pid == os.getpid():
+                self.client.close()
+            self.client = None
+            self.collections = None
+            self.pid = None
+    
+    def register_indexes(self, setup):
+        '''Add a function(db) that creates indexes at startup'''
+        self.index_setup.append(setup)
+    
+    def ensure_indexes(self):
+        db, articles_col, _, _ = self.get_collections()
+        ensure_slug_index(articles_col)
+        # (status, date) listings use status_date_id from ensure_pagination_indexes
+        articles_col.create_index("tags", name="tags")
+        articles_col.create_index("topics", name="topics")
+        articles_col.create_index("category", name="category")
+        articles_col.create_index("updated_at", name="updated_at")
+        for setup in self.index_setup:
+            setup(db)
+    
+    def health(self):
+        '''Ping the server and report latency plus pool counters'''
+        started = time.perf_counter()
+        try:
+            db, _, _, _ = self.get_collections()
+            db.command("ping")
+            status = "ok"
+            error = None
+        except Exception as e:
+            self.mark_down(e)
+            status = "unavailable"
+            error = str(e)
+        return {
+            "status": status,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "error": error,
+            "pool": self.metrics.snapshot(),
+            "pool_options": {key: value for key, value in self.pool_options.items()}
+        }
+
+def get_collections():
+    '''Shared (db, articles, signups, projects) for this worker process'''
+    return data_access.get_collections()
+
+@app.errorhandler(DatabaseUnavailable)
+@app.errorhandler(ServerSelectionTimeoutError)
+@app.errorhandler(ConnectionFailure)
+def handle_database_unavailable(e):
+    if not isinstance(e, DatabaseUnavailable):
+        data_access.mark_down(e)
+    app.logger.error(f"Database unavailable: {e}")
+    response = jsonify({"error": "Database connection not available"})
+    response.headers["Retry-After"] = str(int(data_access.retry_after))
+    return response, 503
+
+@app.route("/api/db-health", methods=["GET"])
+def db_health():
+    '''Database reachability, ping latency and connection pool metrics'''
+    health = data_access.health()
+    return jsonify(health), 200 if health["status"] == "ok" else 503
+
+# Add these lines to your app.py, replacing the old get_collections()
+data_access = DataAccess(
+    os.getenv("MONGODB_URI", "mongodb://localhost:27017"),
+    os.getenv("MONGODB_DB", "futurehuman"),
+    pool_options={
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "2")),
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000")),
+        "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "2000")),
+        "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000")),
+        "retryWrites": True
+    },
+    retry_after=float(os.getenv("DB_RETRY_AFTER", "5")),
+    # Command latency and slow-query sampling (section 19); define it before data_access
+    listeners=[mongo_command_metrics]
+)
+
+# Indexes owned by the other subsystems in this file
+data_access.register_indexes(lambda db: ensure_pagination_indexes(db["articles"]))
+data_access.register_indexes(ensure_interaction_indexes)
+data_access.register_indexes(ensure_facet_indexes)
+data_access.register_indexes(ensure_revision_indexes)
+data_access.register_indexes(lambda db: db["media_blobs"].create_index("job_id", name="job_id"))
+data_access.register_indexes(ensure_scheduler_indexes)
+data_access.register_indexes(ensure_syndication_indexes)
+data_access.register_indexes(ensure_related_indexes)
+data_access.register_indexes(ensure_research_cache_indexes)
+
+@app.cli.command("ensure-indexes")
+def ensure_indexes_command():
+    '''Create all indexes (run on deploy: flask --app app ensure-indexes)'''
+    data_access.ensure_indexes()
+    print("Indexes ensured")
+
+# Not run at import: the app must start while Mongo is down, and the unique
+# slug index may need a dedup pass first. Run the command above on deploy;
+# the lease holder also runs it as the "ensure-indexes" leader job (section 22).
+
+# gunicorn.conf.py
+#     def post_fork(server, worker):
+#         data_access.reset()
+#         start_worker()
+"""
+
+
+# 19. HOT-PATH INSTRUMENTATION AND /metrics
+"""
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from flask import Response, g
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels) + "}"
+
+class Metrics:
+    '''Minimal in-process counters/histograms rendered in Prometheus text format
+
+    Values are per worker process; scrape each worker or aggregate upstream.
+    '''
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.meta = {}        # name -> (type, help)
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self.buckets = {}     # name -> bucket bounds
+        self.collectors = []  # callables yielding (name, type, help, labels, value) at scrape time
+    
+    def describe(self, name, kind, help_text, buckets=None):
+        self.meta[name] = (kind, help_text)
+        if kind == "histogram":
+            self.buckets[name] = tuple(buckets or DEFAULT_BUCKETS)
+    
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+    
+    def observe(self, name, value, **labels):
+        bounds = self.buckets.get(name, DEFAULT_BUCKETS)
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            series = self.histograms.get(key)
+            if series is None:
+                series = self.histograms[key] = [0] * len(bounds) + [0.0, 0]
+            for index, bound in enumerate(bounds):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+    
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+    
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+    
+    def render(self):
+        lines = []
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: list(series) for key, series in self.histograms.items()}
+        
+        gauges = {}
+        for collector in self.collectors:
+            try:
+                for name, kind, help_text, labels, value in collector():
+                    self.meta.setdefault(name, (kind, help_text))
+                    gauges[(name, tuple(sorted(labels.items())))] = value
+            except Exception as e:
+                app.logger.error(f"Metrics collector failed: {e}")
+        
+        by_name = {}
+        for (name, labels), value in list(counters.items()) + list(gauges.items()):
+            by_name.setdefault(name, []).append((labels, value))
+        for (name, labels), series in histograms.items():
+            by_name.setdefault(name, []).append((labels, series))
+        
+        for name in sorted(by_name):
+            kind, help_text = self.meta.get(name, ("untyped", ""))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in by_name[name]:
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                    continue
+                bounds = self.buckets.get(name, DEFAULT_BUCKETS)
+                for bound, count in zip(bounds, value):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {value[-1]}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value[-2]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value[-1]}")
+        return "\n".join(lines) + "\n"
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    '''Time every Mongo command and sample slow ones with their explain() plan'''
+    
+    EXPLAINABLE = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+    STRIP_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "signature"}
+    
+    def __init__(self, slow_ms=100, sample_rate=0.1, max_samples=50):
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.slow_queries = deque(maxlen=max_samples)
+    
+    def started(self, event):
+        command = None
+        if event.command_name in self.EXPLAINABLE:
+            command = {k: v for k, v in event.command.items() if k not in self.STRIP_FIELDS}
+        with self.lock:
+            self.in_flight[event.request_id] = (event.database_name, command)
+    
+    def _finish(self, event, outcome):
+        with self.lock:
+            database_name, command = self.in_flight.pop(event.request_id, (None, None))
+        seconds = event.duration_micros / 1e6
+        metrics.observe("mongo_command_seconds", seconds, command=event.command_name, outcome=outcome)
+        
+        if command is not None and seconds * 1000 >= self.slow_ms and random.random() < self.sample_rate:
+            sample = {
+                "command": event.command_name,
+                "database": database_name,
+                "duration_ms": round(seconds * 1000, 2),
+                "at": datetime.now(timezone.utc).isoformat(),
+                "filter": str(command.get("filter") or command.get("pipeline") or command.get("query"))[:2000],
+                "plan": None
+            }
+            self.slow_queries.append(sample)
+            # explain() is itself a Mongo command; run it off the request thread
+            threading.Thread(target=self._explain, args=(database_name, command, sample), daemon=True).start()
+    
+    def _explain(self, database_name, command, sample):
+        try:
+            db = data_access.get_collections()[0].client[database_name]
+            plan = db.command({"explain": command, "verbosity": "queryPlanner"})
+            winning = plan.get("queryPlanner", {}).get("winningPlan", {})
+            sample["plan"] = str(winning)[:4000]
+        except Exception as e:
+            sample["plan"] = f"explain failed: {e}"
+    
+    def succeeded(self, event):
+        self._finish(event, "ok")
+    
+    def failed(self, event):
+        self._finish(event, "error")
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request_metrics(response):
+    started = g.get("request_started")
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe(
+            "http_request_duration_seconds",
+            time.perf_counter() - started,
+            route=route,
+            method=request.method,
+            status=str(response.status_code)
+        )
+    return response
+
+def _cache_samples():
+    caches = {
+        "response": response_cache,
+        "facets": facet_cache,
+        "content_analysis": analysis_cache,
+        "content_enrichment": enrichment_cache,
+        "research": research_cache
+    }
+    for name, cache in caches.items():
+        yield ("cache_hits_total", "counter", "Cache lookups that hit", {"cache": name}, cache.hits)
+        yield ("cache_misses_total", "counter", "Cache lookups that missed", {"cache": name}, cache.misses)
+        total = cache.hits + cache.misses
+        ratio = cache.hits / total if total else 0.0
+        yield ("cache_hit_ratio", "gauge", "Hit ratio since process start", {"cache": name}, round(ratio, 4))
+
+def _pool_samples():
+    for name, value in data_access.metrics.snapshot().items():
+        yield (f"mongo_pool_{name}", "gauge", "MongoClient connection pool statistic", {}, value)
+    yield ("interaction_buffer_pending_articles", "gauge", "Articles with unflushed interactions", {},
+           len(interaction_buffer.pending))
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    '''Prometheus text exposition of this worker's metrics'''
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/metrics/slow-queries", methods=["GET"])
+def slow_queries():
+    '''Recently sampled slow Mongo commands with their winning plans'''
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify({"success": True, "slow_queries": list(mongo_command_metrics.slow_queries)}), 200
+
+# Add these lines to your app.py
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+metrics = Metrics()
+metrics.describe("http_request_duration_seconds", "histogram", "Request latency by route")
+metrics.describe("mongo_command_seconds", "histogram", "Mongo command latency by command name")
+metrics.describe("articles_stage_seconds", "histogram", "GET /articles time by stage (search, query, serialize, facets)")
+metrics.describe("media_processing_seconds", "histogram", "Thumbnail/variant and metadata processing time",
+                 buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+metrics.describe("upload_bytes_total", "counter", "Uploaded bytes (rate() gives bytes/sec)")
+metrics.add_collector(_cache_samples)
+metrics.add_collector(_pool_samples)
+
+# Place above data_access = DataAccess(...), which takes it as listeners=
+mongo_command_metrics = MongoCommandMetrics(
+    slow_ms=float(os.getenv("SLOW_QUERY_MS", "100")),
+    sample_rate=float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "0.1"))
+)
+"""
+
+
+# 20. BENCHMARK AND LOAD-TEST SUITE
+"""
+# Save as bench_backend.py next to app.py.
+#
+#   python bench_backend.py --articles 10000 --requests 500 --concurrency 32
+#   python bench_backend.py --mongo-uri mongodb://localhost:27017 --articles 1000000
+#   python bench_backend.py --compare bench-results/old.json bench-results/new.json
+#   python bench_backend.py --serialization --page-size 50
+#
+# Without --mongo-uri the corpus is seeded into mongomock (pip install mongomock),
+# which is good for comparing code paths between commits but not for absolute numbers.
+
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+backend = None
+
+WORDS = (
+    "intelligence model agent robot energy fusion compute chip alignment policy "
+    "research neural interface synthetic biology discovery orbit launch climate "
+    "future human society economy labor culture ethics frontier scale data"
+).split()
+TAGS = [f"{a}-{b}" for a in WORDS[:12] for b in WORDS[12:20]]
+TOPICS = [
+    "Core AI Capability Curve", "Recursive Self-Improvement", "Physical Embodiment",
+    "Compute & Energy", "Alignment & Governance", "Equitable Access", "Future of Work",
+    "Exponential Discovery", "Abundant Energy", "Brain-Computer Interfaces",
+    "Space Industry", "Culture & Ethics"
+]
+
+def fake_html(rng, paragraphs):
+    parts = []
+    for index in range(paragraphs):
+        if index % 5 == 0:
+            parts.append(f"<h2>{' '.join(rng.choices(WORDS, k=5)).title()}</h2>")
+        parts.append("<p>" + " ".join(rng.choices(WORDS, k=rng.randint(60, 140))) + "</p>")
+    return "".join(parts)
+
+def fake_article(rng, index, now):
+    title = " ".join(rng.choices(WORDS, k=rng.randint(4, 9))).title()
+    content = fake_html(rng, rng.randint(5, 40))
+    date = now - timedelta(days=rng.randint(0, 2000))
+    return {
+        "title": title,
+        "slug": f"{backend.generate_slug(title)}-{index}",
+        "content": content,
+        "excerpt": content[:160],
+        "author": rng.choice(["Future Human Labs", "A. Writer", "B. Analyst", "C. Editor"]),
+        "category": rng.choice(backend.VALID_CATEGORIES),
+        "tags": rng.sample(TAGS, rng.randint(2, 6)),
+        "topics": rng.sample(TOPICS, rng.randint(1, 3)),
+        "status": "published" if rng.random() < 0.9 else "draft",
+        "date": date.strftime("%Y-%m-%d"),
+        "created_at": date,
+        "updated_at": date,
+        "view_count": rng.randint(0, 100000),
+        "likes": rng.randint(0, 5000),
+        "shares": rng.randint(0, 1000),
+        "comments_count": 0,
+        "version": 1,
+        "is_featured": rng.random() < 0.05,
+        "seo_keywords": rng.sample(WORDS, 3)
+    }
+
+def load_backend(mongo_uri, db_name):
+    '''Import app.py against the benchmark database'''
+    global backend
+    if mongo_uri:
+        os.environ["MONGODB_URI"] = mongo_uri
+    else:
+        # app.py does `from pymongo import MongoClient`, so swap it before the import
+        import mongomock
+        import pymongo
+        pymongo.MongoClient = mongomock.MongoClient
+        os.environ["MONGODB_URI"] = "mongodb://mongomock"
+    os.environ["MONGODB_DB"] = db_name
+    import app
+    backend = app
+    return backend.get_collections()[0]
+
+def seed(db, count, seed_value):
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+    db["articles"].delete_many({})
+    batch = []
+    for index in range(count):
+        batch.append(fake_article(rng, index, now))
+        if len(batch) == 1000:
+            db["articles"].insert_many(batch)
+            batch = []
+    if batch:
+        db["articles"].insert_many(batch)
+    backend.data_access.ensure_indexes()
+    backend.search_index.build(db["articles"])
+    backend.rebuild_facet_counts(db, db["articles"])
+
+def flush_interactions():
+    '''Write buffered interactions, failing the run if any write failed
+
+    The flush thread only logs errors and requeues, so a backend that cannot
+    apply an update (mongomock has no pipeline updates, used for trending)
+    would otherwise report interaction numbers for writes that never happened.
+    '''
+    buffer = backend.interaction_buffer
+    try:
+        buffer.flush()
+    except Exception as e:
+        raise SystemExit(f"Interaction flush failed: {e}")
+    if buffer.pending:
+        raise SystemExit(f"Interaction flush left {len(buffer.pending)} articles unwritten (see the log)")
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_scenario(name, make_request, total, concurrency):
+    '''Run make_request(client, i) total times across concurrency threads'''
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    local = threading.local()
+    
+    def worker(i):
+        nonlocal errors
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = backend.app.test_client()
+        started = time.perf_counter()
+        response = make_request(client, i)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if response.status_code >= 400:
+                errors += 1
+    
+    tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(total)))
+    wall = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    result = {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(total / wall, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "peak_traced_mb": round(peak / (1024 * 1024), 2)
+    }
+    print(f"{name:<24} p50={result['p50_ms']:>8}ms p95={result['p95_ms']:>8}ms "
+          f"p99={result['p99_ms']:>8}ms {result['throughput_rps']:>8} req/s errors={errors}")
+    return result
+
+def make_image(size_px):
+    from PIL import Image
+    rng = random.Random(size_px)
+    img = Image.new("RGB", (size_px, size_px))
+    img.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(size_px * size_px)])
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+def scenarios(db, args):
+    rng = random.Random(args.seed)
+    ids = [str(doc["_id"]) for doc in db["articles"].find({}, {"_id": 1}).limit(1000)]
+    deep_page = max(1, min(args.articles // 12, 200))
+    
+    def cursor_walk(client, i):
+        url = "/articles?paginate=cursor&fields=card&limit=12"
+        response = None
+        for _ in range(10):
+            response = client.get(url)
+            next_cursor = response.get_json().get("next_cursor")
+            if not next_cursor:
+                break
+            url = f"/articles?paginate=cursor&fields=card&limit=12&after={next_cursor}"
+        return response
+    
+    yield "list_card", lambda c, i: c.get("/articles?fields=card"), args.concurrency
+    yield "list_full", lambda c, i: c.get("/articles"), args.concurrency
+    yield "search", lambda c, i: c.get(f"/articles?search={rng.choice(WORDS)}&fields=card&nocache={i}"), args.concurrency
+    yield "search_prefix", lambda c, i: c.get(f"/articles?search={rng.choice(WORDS)[:3]}&fields=card&nocache={i}"), args.concurrency
+    yield "filter_category_tags", lambda c, i: c.get(
+        f"/articles?category={rng.choice(backend.VALID_CATEGORIES)}&tags={rng.choice(TAGS)}&nocache={i}"
+    ), args.concurrency
+    yield "facets_all_status", lambda c, i: c.get(f"/articles?status=all&author=A.%20Writer&nocache={i}"), args.concurrency
+    yield "deep_offset_page", lambda c, i: c.get(f"/articles?page={deep_page}&fields=card&nocache={i}"), args.concurrency
+    yield "cursor_walk_10_pages", cursor_walk, min(args.concurrency, 8)
+    yield "interact_view", lambda c, i: c.post(
+        f"/articles/{rng.choice(ids)}/interact", json={"type": "view", "user_id": f"u{i}"}
+    ), args.interaction_concurrency
+    yield "interact_like_share", lambda c, i: c.post(
+        f"/articles/{rng.choice(ids)}/interact",
+        json={"type": rng.choice(["like", "share"]), "user_id": f"u{i}", "platform": "x"}
+    ), args.interaction_concurrency
+    title = "Weekly AI Roundup"
+    content = "<p>" + " ".join(WORDS * 5) + "</p>"
+    yield "create_slug_collisions", lambda c, i: c.post(
+        "/articles", json={"title": title, "content": content, "category": "News"}
+    ), 4
+    if args.upload:
+        image = make_image(args.image_px)
+        yield "upload_large_image", lambda c, i: c.post(
+            "/api/upload",
+            data={"file": (io.BytesIO(image), f"bench-{i}.jpg"), "type": "general"},
+            content_type="multipart/form-data"
+        ), 4
+
+def bench_serialization(args):
+    '''Per-article encode cost: old per-field conversion + stdlib jsonify vs compiled serializers + app.json'''
+    from bson import ObjectId
+    from flask.json.provider import DefaultJSONProvider
+    
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    page = []
+    for index in range(args.page_size):
+        article = fake_article(rng, index, now)
+        article["_id"] = ObjectId()
+        page.append(article)
+    
+    stdlib = DefaultJSONProvider(backend.app)
+    profile_fields = {"card": backend.CARD_FIELDS, "feed": backend.FEED_FIELDS, "sitemap": backend.SITEMAP_FIELDS}
+    
+    def legacy(article, profile):
+        fields = profile_fields.get(profile) or [f for f in article if f != "_id"]
+        serialized = {"id": str(article["_id"])}
+        for field in fields:
+            if field in article:
+                serialized[field] = backend._lean_value(article[field])
+        if profile in ("card", "full"):
+            serialized["interactions"] = {
+                name: article.get(field, 0) for name, field in backend.INTERACTION_COUNT_FIELDS.items()
+            }
+        return serialized
+    
+    def timed(fn):
+        fn()
+        started = time.perf_counter()
+        for _ in range(args.serialization_rounds):
+            fn()
+        elapsed = time.perf_counter() - started
+        return round(elapsed / (args.serialization_rounds * len(page)) * 1e6, 2)
+    
+    results = {}
+    for profile in ("card", "feed", "sitemap", "full"):
+        before = timed(lambda: stdlib.dumps({"articles": [legacy(a, profile) for a in page]}))
+        after = timed(lambda: backend.app.json.dumps({"articles": [backend.serialize_article_profile(a, profile) for a in page]}))
+        results[profile] = {"before_us_per_article": before, "after_us_per_article": after,
+                            "speedup": round(before / after, 2) if after else None}
+        print(f"{profile:<8} before={before:>8}us after={after:>8}us per article  x{results[profile]['speedup']}")
+    
+    article = page[0]
+    validate_us = timed(lambda: backend.validate_article_data(article))
+    print(f"validate_article_data {validate_us}us per article (orjson={'yes' if backend.orjson else 'no'})")
+    return {"page_size": len(page), "profiles": results, "validate_us_per_article": validate_us}
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+def compare(old_path, new_path):
+    old = json.loads(Path(old_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+    print(f"{'scenario':<24} {'p95 old':>10} {'p95 new':>10} {'change':>8}   {'rps old':>9} {'rps new':>9}")
+    for name, result in new["scenarios"].items():
+        before = old["scenarios"].get(name)
+        if not before:
+            print(f"{name:<24} {'-':>10} {result['p95_ms']:>10}")
+            continue
+        change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+        print(f"{name:<24} {before['p95_ms']:>10} {result['p95_ms']:>10} {change:>+7.1f}%   "
+              f"{before['throughput_rps']:>9} {result['throughput_rps']:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FHJ Flask backend")
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI"))
+    parser.add_argument("--db", default="fhj_bench")
+    parser.add_argument("--articles", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--interaction-concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--no-upload", dest="upload", action="store_false")
+    parser.add_argument("--image-px", type=int, default=2400)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--only", nargs="*", help="Run only these scenarios")
+    parser.add_argument("--out", default="bench-results")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--serialization", action="store_true", help="Only run the encode micro-benchmark")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--serialization-rounds", type=int, default=200)
+    args = parser.parse_args()
+    
+    if args.compare:
+        compare(*args.compare)
+        return
+    
+    db = load_backend(args.mongo_uri, args.db)
+    if args.serialization:
+        bench_serialization(args)
+        return
+    if not args.skip_seed:
+        started = time.perf_counter()
+        seed(db, args.articles, args.seed)
+        print(f"Seeded {args.articles} articles in {time.perf_counter() - started:.1f}s")
+    
+    results = {}
+    for name, make_request, concurrency in scenarios(db, args):
+        if args.only and name not in args.only:
+            continue
+        results[name] = run_scenario(name, make_request, args.requests, concurrency)
+    flush_interactions()
+    
+    report = {
+        "revision": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "backend": "mongodb" if args.mongo_uri else "mongomock",
+        "articles": args.articles,
+        "python": sys.version.split()[0],
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "scenarios": results
+    }
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_path = out_dir / f"{report['revision']}-{int(time.time())}.json"
+    out_path.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {out_path}")
+
+if __name__ == "__main__":
+    main()
+"""
+
+
+# 21. ASYNC (ASGI) SERVING MODE FOR READ AND INTERACTION PATHS
+"""
+# Save as asgi.py next to app.py and serve it with an ASGI server:
+#
+#   pip install motor starlette asgiref uvicorn
+#   uvicorn asgi:asgi_app --workers 4 --loop uvloop --http httptools --backlog 4096
+#
+# GET /articles and POST /articles/<article_id>/interact run as coroutines on
+# Motor, so a worker holds thousands of open requests while they wait on Mongo.
+# Every other route (uploads, batch import, revisions, media, metrics) is the
+# existing Flask app mounted behind WsgiToAsgi and keeps running in threads.
+# Both share the response cache, count/facet caches and the interaction buffer.
+# Those are synchronous (locks, Redis round trips), so the coroutines call them
+# through run_in_threadpool rather than on the event loop.
+
+import asyncio
+import contextlib
+import os
+import time
+from functools import wraps
+
+from asgiref.wsgi import WsgiToAsgi
+from bson import ObjectId, json_util
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import MultiDict
+
+from app import (
+    DatabaseUnavailable,
+    MATERIALIZED_FACET_PROJECTION,
+    apply_cursor,
+    app,
+    article_aggregate_pipeline,
+    cache_key_for,
+    count_cache_lookup,
+    count_cache_store,
+    data_access,
+    encode_cursor,
+    facet_cache,
+    facet_counts_collection,
+    fold_facet_rows,
+    interaction_buffer,
+    interaction_response,
+    interaction_update,
+    listing_tags_for,
+    materialized_facet_match,
+    materialized_facet_status,
+    metrics,
+    parse_article_listing,
+    response_cache,
+    serialize_article_profile,
+    start_worker,
+)
+
+class AsyncDataAccess:
+    '''Motor client for the async routes, one per process and event loop
+
+    Shares the URI, event listeners and circuit breaker of the sync
+    DataAccess, so /metrics and /api/db-health cover both paths.
+    '''
+    
+    def __init__(self, sync_access, pool_options=None):
+        self.sync_access = sync_access
+        self.pool_options = pool_options or {}
+        self.client = None
+        self.db = None
+        self.pid = None
+        self.loop = None
+    
+    def get_db(self):
+        if time.monotonic() < self.sync_access.down_until:
+            raise DatabaseUnavailable(f"Database unavailable: {self.sync_access.last_error}")
+        loop = asyncio.get_running_loop()
+        if self.db is None or self.pid != os.getpid() or self.loop is not loop:
+            self.client = AsyncIOMotorClient(
+                self.sync_access.uri,
+                event_listeners=[self.sync_access.metrics] + self.sync_access.listeners,
+                **self.pool_options
+            )
+            self.db = self.client[self.sync_access.db_name]
+            self.pid = os.getpid()
+            self.loop = loop
+        return self.db
+    
+    def close(self):
+        if self.client is not None and self.pid == os.getpid():
+            self.client.close()
+        self.client = None
+        self.db = None
+
+async def async_cached_count(collection, query):
+    key, total = await run_in_threadpool(count_cache_lookup, query)
+    if total is None:
+        total = await collection.count_documents(query)
+        await run_in_threadpool(count_cache_store, key, total)
+    return total
+
+async def async_article_aggregates(db, query):
+    '''Async get_cached_article_aggregates: materialized counts or cached $facet'''
+    materialized, status = materialized_facet_status(query)
+    if materialized:
+        rows = await facet_counts_collection(db).find(
+            materialized_facet_match(status), MATERIALIZED_FACET_PROJECTION
+        ).to_list(length=None)
+        return fold_facet_rows(rows)
+    
+    key = json_util.dumps(query, sort_keys=True)
+    aggregates = await run_in_threadpool(facet_cache.get, key)
+    if aggregates is None:
+        result = await db["articles"].aggregate(article_aggregate_pipeline(query)).to_list(length=1)
+        aggregates = result[0] if result else {}
+        await run_in_threadpool(facet_cache.set, key, aggregates)
+    return aggregates
+
+async def async_fetch_page(articles_col, listing):
+    '''Return (page docs, has_next, next_cursor, relevance total) for a parsed listing'''
+    query = listing["query"]
+    sort_field = listing["sort_field"]
+    sort_direction = listing["sort_direction"]
+    page = listing["page"]
+    limit = listing["limit"]
+    projection = listing["projection"]
+    sort = [(sort_field, sort_direction), ("_id", sort_direction)]
+    
+    if listing["cursor_mode"]:
+        page_query = query
+        if listing["after"]:
+            page_query = apply_cursor(query, listing["after"], sort_field, sort_direction)
+        docs = await articles_col.find(page_query, projection).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+        has_next = len(docs) > limit
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field, sort_direction) if has_next else None
+        return docs, has_next, next_cursor, None
+    
+    if listing["ranked_ids"] is not None and listing["sort_by"] == "relevance":
+        matching = {doc["_id"] async for doc in articles_col.find(query, {"_id": 1})}
+        ordered_ids = [obj_id for obj_id in listing["ranked_ids"] if obj_id in matching]
+        page_ids = ordered_ids[(page - 1) * limit:page * limit]
+        docs = await articles_col.find({"_id": {"$in": page_ids}}, projection).to_list(length=len(page_ids))
+        docs_by_id = {doc["_id"]: doc for doc in docs}
+        return [docs_by_id[obj_id] for obj_id in page_ids if obj_id in docs_by_id], None, None, len(ordered_ids)
+    
+    docs = await articles_col.find(query, projection).sort(sort).skip((page - 1) * limit).limit(limit).to_list(length=limit)
+    return docs, None, None, None
+
+async def _no_total():
+    return None
+
+def with_cors(response):
+    if ASGI_CORS_ORIGIN:
+        response.headers["Access-Control-Allow-Origin"] = ASGI_CORS_ORIGIN
+    return response
+
+def timed_route(route):
+    '''Record http_request_duration_seconds like the Flask after_request hook'''
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(request):
+            started = time.perf_counter()
+            response = await handler(request)
+            metrics.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - started,
+                route=route,
+                method=request.method,
+                status=str(response.status_code)
+            )
+            return with_cors(response)
+        return wrapper
+    return decorator
+
+@timed_route("/articles")
+async def async_get_articles(request):
+    '''GET /articles with query, count and facets awaited concurrently'''
+    args = MultiDict(request.query_params.multi_items())
+    key = cache_key_for(request.url.path, args.items(multi=True))
+    body = await run_in_threadpool(response_cache.get, key)
+    if body is not None:
+        return Response(body, media_type="application/json", headers={"X-Cache": "HIT"})
+    
+    versions = await run_in_threadpool(response_cache.snapshot, listing_tags_for(args))
+    db = async_data.get_db()
+    articles_col = db["articles"]
+    
+    try:
+        # Searches take the search index lock
+        listing = await run_in_threadpool(parse_article_listing, args)
+        if listing["cursor_mode"] and listing["after"]:
+            # Surface a bad cursor as a 400 before starting the other queries
+            apply_cursor(listing["query"], listing["after"], listing["sort_field"], listing["sort_direction"])
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    
+    query = listing["query"]
+    page = listing["page"]
+    limit = listing["limit"]
+    fields = listing["fields"]
+    relevance = listing["ranked_ids"] is not None and listing["sort_by"] == "relevance"
+    
+    if listing["cursor_mode"]:
+        count = async_cached_count(articles_col, query) if listing["include_total"] else _no_total()
+    elif relevance:
+        count = _no_total()
+    else:
+        count = async_cached_count(articles_col, query)
+    
+    query_started = time.perf_counter()
+    (docs, has_next, next_cursor, relevance_total), total, aggregates = await asyncio.gather(
+        async_fetch_page(articles_col, listing),
+        count,
+        async_article_aggregates(db, query)
+    )
+    metrics.observe("articles_stage_seconds", time.perf_counter() - query_started, stage="query")
+    
+    if relevance:
+        total = relevance_total
+    total_pages = (total + limit - 1) // limit if total is not None else None
+    if listing["cursor_mode"]:
+        has_prev = bool(listing["after"])
+    else:
+        has_next = page < total_pages
+        has_prev = page > 1
+    
+    with metrics.timer("articles_stage_seconds", stage="serialize"):
+        articles = [serialize_article_profile(article, fields) for article in docs]
+    
+    payload = {
+        "success": True,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "total_pages": total_pages,
+        "has_next": has_next,
+        "has_prev": has_prev,
+        "next_cursor": next_cursor,
+        "articles": articles,
+        "filters": {
+            "categories": aggregates.get("categories", []),
+            "tags": aggregates.get("tags", []),
+            "topics": aggregates.get("topics", []),
+            "authors": aggregates.get("authors", [])
+        }
+    }
+    # Same encoder as jsonify so cached bodies are interchangeable with the sync route
+    body = app.json.dumps(payload).encode("utf-8")
+    await run_in_threadpool(response_cache.set, key, body, versions)
+    return Response(body, media_type="application/json", headers={"X-Cache": "MISS"})
+
+@timed_route("/articles/<article_id>/interact")
+async def async_article_interaction(request):
+    '''POST /articles/<article_id>/interact without blocking on Mongo'''
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+    
+    interaction_type = data.get("type")
+    user_id = data.get("user_id")
+    if interaction_type not in ["view", "like", "share", "unlike"]:
+        return JSONResponse({"error": "Invalid interaction type"}, status_code=400)
+    
+    try:
+        obj_id = ObjectId(request.path_params["article_id"])
+    except Exception:
+        return JSONResponse({"error": "Invalid article ID"}, status_code=400)
+    
+    # Only the first hit for an article since the last flush reads from Mongo
+    if not await run_in_threadpool(interaction_buffer.is_known, obj_id):
+        article = await async_data.get_db()["articles"].find_one(
+            {"_id": obj_id}, interaction_buffer.lookup_projection()
+        )
+        if not article:
+            return JSONResponse({"error": "Article not found"}, status_code=404)
+        await run_in_threadpool(interaction_buffer.remember, obj_id, article)
+    
+    delta, viewer, like, event = interaction_update(interaction_type, user_id, data)
+    counts = await run_in_threadpool(
+        interaction_buffer.record, obj_id, delta, viewer=viewer, like=like, event=event
+    )
+    return JSONResponse(interaction_response(interaction_type, counts))
+
+async def handle_database_unavailable(request, exc):
+    if not isinstance(exc, DatabaseUnavailable):
+        data_access.mark_down(exc)
+    app.logger.error(f"Database unavailable: {exc}")
+    return with_cors(JSONResponse(
+        {"error": "Database connection not available"},
+        status_code=503,
+        headers={"Retry-After": str(int(data_access.retry_after))}
+    ))
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(start_worker)
+    yield
+    async_data.close()
+    # Blocks on the final bulk_write, so keep it off the loop
+    await run_in_threadpool(interaction_buffer.drain)
+
+ASGI_CORS_ORIGIN = os.getenv("ASGI_CORS_ORIGIN", "")  # e.g. https://futurehumanjournal.com
+
+async_data = AsyncDataAccess(
+    data_access,
+    pool_options={
+        "maxPoolSize": int(os.getenv("ASYNC_MONGO_MAX_POOL_SIZE", "200")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "2")),
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000")),
+        "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "2000")),
+        "socketTimeoutMS": int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+    }
+)
+
+# Routes not listed here (and other methods on these paths) fall through to Flask
+asgi_app = Starlette(
+    routes=[
+        Route("/articles", async_get_articles, methods=["GET"]),
+        Route("/articles/{article_id}/interact", async_article_interaction, methods=["POST"]),
+        Mount("/", app=WsgiToAsgi(app))
+    ],
+    exception_handlers={
+        DatabaseUnavailable: handle_database_unavailable,
+        ConnectionFailure: handle_database_unavailable,
+        ServerSelectionTimeoutError: handle_database_unavailable
+    },
+    lifespan=lifespan
+)
+"""
+
+
+# 22. PUBLISH SCHEDULER AND BATCHED POST-PUBLISH FAN-OUT
+"""
+import atexit
+import heapq
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+def _as_utc(value):
+    '''Mongo hands back naive UTC datetimes; compare everything that way'''
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def ensure_scheduler_indexes(db):
+    db["articles"].create_index(
+        [("status", 1), ("scheduled_date", 1)],
+        name="scheduled_due",
+        partialFilterExpression={"status": "scheduled"}
+    )
+    db["leader_job_queue"].create_index([("job", 1), ("queued_at", 1)], name="job_queued_at")
+
+class LeaderLease:
+    '''Time-limited lease in scheduler_leases; one holder per name at a time'''
+    
+    def __init__(self, collection_getter, name, ttl=30.0):
+        self.collection_getter = collection_getter
+        self.name = name
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex[:8]
+    
+    @property
+    def owner(self):
+        # Include the pid so forked workers never share a lease
+        return f"{socket.gethostname()}:{os.getpid()}:{self.token}"
+    
+    def acquire(self):
+        '''Take or renew the lease; False while another worker holds it'''
+        now = datetime.now(timezone.utc)
+        try:
+            self.collection_getter().find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl), "renewed_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return True
+        except DuplicateKeyError:
+            # The lease exists, is live and belongs to someone else
+            return False
+    
+    def release(self):
+        try:
+            self.collection_getter().delete_one({"_id": self.name, "owner": self.owner})
+        except Exception as e:
+            app.logger.error(f"Error releasing {self.name} lease: {e}")
+
+class PublishFanout:
+    '''Batched, deduplicating queue for post-publish side effects
+
+    Articles published within one window are handled together: one cache
+    invalidation, one /api/revalidate call per distinct tag and one run of
+    each registered hook (feed/sitemap regeneration), then the per-article
+    trigger_publish_tasks.
+    '''
+    
+    def __init__(self, window=2.0, max_batch=500):
+        self.window = window
+        self.max_batch = max_batch
+        self.lock = threading.Lock()
+        self.pending = {}  # article _id -> latest article doc
+        self.hooks = []
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+    
+    def register(self, hook):
+        '''Add a hook(articles) that runs once per batch'''
+        self.hooks.append(hook)
+    
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="publish-fanout", daemon=True)
+        self.thread.start()
+    
+    def enqueue(self, *articles):
+        with self.lock:
+            for article in articles:
+                self.pending[article["_id"]] = article
+        self.wake.set()
+    
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wake.wait()
+            self.wake.clear()
+            # Let the rest of a burst arrive before flushing
+            self.stopped.wait(self.window)
+            try:
+                self.flush()
+            except Exception as e:
+                app.logger.error(f"Error running publish fan-out: {e}")
+    
+    def flush(self):
+        while True:
+            with self.lock:
+                if not self.pending:
+                    return
+                ids = list(self.pending)[:self.max_batch]
+                batch = [self.pending.pop(obj_id) for obj_id in ids]
+            
+            invalidate_article_cache(*batch)
+            for hook in self.hooks:
+                try:
+                    hook(batch)
+                except Exception as e:
+                    app.logger.error(f"Publish hook {getattr(hook, '__name__', hook)} failed: {e}")
+            for article in batch:
+                try:
+                    trigger_publish_tasks(article["_id"])
+                except Exception as e:
+                    app.logger.error(f"Publish tasks failed for {article['_id']}: {e}")
+            metrics.inc("publish_fanout_batches_total")
+            metrics.inc("publish_fanout_articles_total", len(batch))
+            app.logger.info(f"Published fan-out for {len(batch)} articles")
+    
+    def drain(self):
+        self.stopped.set()
+        self.wake.set()
+        self.flush()
+
+class PublishScheduler:
+    '''Promote scheduled articles to published when scheduled_date passes
+
+    Only the worker holding the lease runs it. Upcoming due times sit in a
+    min-heap refilled from the partial (status, scheduled_date) index, so the
+    thread sleeps until the next article is due instead of polling a scan.
+    '''
+    
+    def __init__(self, collections_getter, lease, poll_interval=60.0, lookahead=300.0, batch_size=200):
+        self.collections_getter = collections_getter
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.lookahead = lookahead
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.heap = []       # (scheduled_date, _id)
+        self.queued = {}     # _id -> scheduled_date in the heap
+        self.next_refill = 0.0
+        self.is_leader = False
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+    
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="publish-scheduler", daemon=True)
+        self.thread.start()
+    
+    def notify(self, article):
+        '''Queue a newly (re)scheduled article without waiting for the next refill'''
+        if article.get("status") != "scheduled" or not article.get("scheduled_date"):
+            return
+        self._push(_as_utc(article["scheduled_date"]), article["_id"])
+        self.wake.set()
+    
+    def _push(self, due, obj_id):
+        with self.lock:
+            if self.queued.get(obj_id) == due:
+                return
+            self.queued[obj_id] = due
+            heapq.heappush(self.heap, (due, obj_id))
+    
+    def _run(self):
+        while not self.stopped.is_set():
+            timeout = self.lease.ttl / 3
+            try:
+                self.is_leader = self.lease.acquire()
+                if self.is_leader:
+                    if time.monotonic() >= self.next_refill:
+                        self._refill()
+                    self.promote_due()
+                    timeout = min(timeout, self._seconds_until_next())
+                else:
+                    with self.lock:
+                        self.heap = []
+                        self.queued = {}
+            except Exception as e:
+                # Can't tell whether the lease was renewed; assume it was not
+                self.is_leader = False
+                app.logger.error(f"Publish scheduler error: {e}")
+            self.wake.wait(max(timeout, 0.05))
+            self.wake.clear()
+    
+    def _seconds_until_next(self):
+        with self.lock:
+            if not self.heap:
+                return max(self.next_refill - time.monotonic(), 0.0)
+            due = self.heap[0][0]
+        now = _as_utc(datetime.now(timezone.utc))
+        return max((due - now).total_seconds(), 0.0)
+    
+    def _refill(self):
+        '''Load everything due within the lookahead window from the index'''
+        _, articles_col, _, _ = self.collections_getter()
+        horizon = datetime.now(timezone.utc) + timedelta(seconds=self.lookahead)
+        cursor = articles_col.find(
+            {"status": "scheduled", "scheduled_date": {"$lte": horizon}},
+            {"scheduled_date": 1}
+        ).sort("scheduled_date", 1).limit(self.batch_size * 10)
+        for doc in cursor:
+            self._push(_as_utc(doc["scheduled_date"]), doc["_id"])
+        self.next_refill = time.monotonic() + min(self.poll_interval, self.lookahead)
+    
+    def promote_due(self):
+        '''Publish every queued article whose time has come'''
+        now = _as_utc(datetime.now(timezone.utc))
+        while True:
+            due_ids = []
+            with self.lock:
+                while self.heap and self.heap[0][0] <= now and len(due_ids) < self.batch_size:
+                    due, obj_id = heapq.heappop(self.heap)
+                    if self.queued.get(obj_id) == due:
+                        del self.queued[obj_id]
+                        due_ids.append(obj_id)
+            if not due_ids:
+                return
+            self.promote(due_ids)
+    
+    def promote(self, obj_ids):
+        '''Flip due articles to published (skipping any rescheduled since) and fan out'''
+        db, articles_col, _, _ = self.collections_getter()
+        now = datetime.now(timezone.utc)
+        run_id = uuid.uuid4().hex
+        # Pipeline update keeps an explicit published_date and tags this run's articles
+        operations = [
+            UpdateOne(
+                {"_id": obj_id, "status": "scheduled", "scheduled_date": {"$lte": now}},
+                [{"$set": {
+                    "status": "published",
+                    "workflow_stage": "published",
+                    "published_date": {"$ifNull": ["$published_date", now]},
+                    "updated_at": now,
+                    "publish_run": run_id
+                }}]
+            )
+            for obj_id in obj_ids
+        ]
+        result = articles_col.bulk_write(operations, ordered=False)
+        if not result.modified_count:
+            return []
+        
+        # Scoped by _id so both reads use the primary key, not a collection scan
+        run_filter = {"_id": {"$in": list(obj_ids)}, "publish_run": run_id}
+        published = list(articles_col.find(run_filter))
+        articles_col.update_many(run_filter, {"$unset": {"publish_run": ""}})
+        for article in published:
+            article.pop("publish_run", None)
+        
+        adjust_facet_counts_many(db, [(dict(article, status="scheduled"), article) for article in published])
+        publish_fanout.enqueue(*published)
+        metrics.inc("scheduled_articles_published_total", len(published))
+        app.logger.info(f"Scheduler published {len(published)} articles")
+        return published
+    
+    def drain(self):
+        self.stopped.set()
+        self.wake.set()
+        if self.is_leader:
+            self.is_leader = False
+            self.lease.release()
+
+class LeaderJobs:
+    '''Background jobs that only the publish scheduler's lease holder runs
+
+    A job has a periodic run() (first called when this worker becomes
+    leader) and/or a handle(ids) for article ids any worker queued with
+    request(). Queued ids live in leader_job_queue, so nothing is lost
+    while the lease moves to another worker.
+    '''
+    
+    def __init__(self, is_leader, queue_getter, tick=5.0, batch_size=1000):
+        self.is_leader = is_leader
+        self.queue_getter = queue_getter
+        self.tick = tick
+        self.batch_size = batch_size
+        self.jobs = {}
+        self.was_leader = False
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+    
+    def register(self, name, run=None, interval=None, handle=None, reset=None):
+        '''Add a job; reset() is called when this worker loses the lease'''
+        self.jobs[name] = {"run": run, "interval": interval, "handle": handle, "reset": reset, "next_run": 0.0}
+    
+    def request(self, name, ids):
+        '''Queue article ids for the job's handle() on the leader'''
+        ids = list(ids)
+        if not ids:
+            return
+        # A fresh token per request keeps ids re-queued mid-handle for the next pass
+        token = uuid.uuid4().hex
+        now = datetime.now(timezone.utc)
+        self.queue_getter().bulk_write([
+            UpdateOne(
+                {"_id": f"{name}:{obj_id}"},
+                {"$set": {"job": name, "article_id": obj_id, "token": token, "queued_at": now}},
+                upsert=True
+            )
+            for obj_id in ids
+        ], ordered=False)
+        self.wake.set()
+    
+    def publish_hook(self, name):
+        '''A PublishFanout hook that queues each batch for the job'''
+        def hook(articles):
+            self.request(name, [article["_id"] for article in articles])
+        hook.__name__ = f"queue_{name}"
+        return hook
+    
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="leader-jobs", daemon=True)
+        self.thread.start()
+    
+    def _run(self):
+        while not self.stopped.is_set():
+            leader = self.is_leader()
+            if leader:
+                self.run_pending()
+            elif self.was_leader:
+                self._demote()
+            self.was_leader = leader
+            self.wake.wait(self.tick)
+            self.wake.clear()
+    
+    def _demote(self):
+        for name, job in self.jobs.items():
+            job["next_run"] = 0.0
+            if job["reset"]:
+                try:
+                    job["reset"]()
+                except Exception as e:
+                    app.logger.error(f"Resetting leader job {name} failed: {e}")
+    
+    def run_pending(self):
+        for name, job in self.jobs.items():
+            try:
+                if job["run"] and time.monotonic() >= job["next_run"]:
+                    job["run"]()
+                    job["next_run"] = time.monotonic() + job["interval"]
+                if job["handle"]:
+                    self._drain_queue(name, job["handle"])
+            except Exception as e:
+                app.logger.error(f"Leader job {name} failed: {e}")
+    
+    def _drain_queue(self, name, handle):
+        queue = self.queue_getter()
+        while True:
+            rows = list(queue.find({"job": name}, {"article_id": 1, "token": 1})
+                        .sort("queued_at", 1).limit(self.batch_size))
+            if not rows:
+                return
+            handle([row["article_id"] for row in rows])
+            queue.bulk_write(
+                [DeleteOne({"_id": row["_id"], "token": row["token"]}) for row in rows], ordered=False
+            )
+            if len(rows) < self.batch_size:
+                return
+    
+    def drain(self):
+        self.stopped.set()
+        self.wake.set()
+
+def scheduler_leases_collection():
+    db, _, _, _ = get_collections()
+    return db["scheduler_leases"]
+
+def leader_job_queue_collection():
+    db, _, _, _ = get_collections()
+    return db["leader_job_queue"]
+
+# Add these lines to your app.py
+PUBLISH_FANOUT_WINDOW = float(os.getenv("PUBLISH_FANOUT_WINDOW", "2"))
+SCHEDULER_POLL_INTERVAL = float(os.getenv("SCHEDULER_POLL_INTERVAL", "60"))
+SCHEDULER_LOOKAHEAD = float(os.getenv("SCHEDULER_LOOKAHEAD", "300"))
+SCHEDULER_LEASE_TTL = float(os.getenv("SCHEDULER_LEASE_TTL", "30"))
+
+metrics.describe("publish_fanout_batches_total", "counter", "Post-publish fan-out batches run")
+metrics.describe("publish_fanout_articles_total", "counter", "Articles handled by post-publish fan-out")
+metrics.describe("scheduled_articles_published_total", "counter", "Scheduled articles promoted to published")
+
+publish_fanout = PublishFanout(window=PUBLISH_FANOUT_WINDOW)
+publish_scheduler = PublishScheduler(
+    get_collections,
+    LeaderLease(scheduler_leases_collection, "publish-scheduler", ttl=SCHEDULER_LEASE_TTL),
+    poll_interval=SCHEDULER_POLL_INTERVAL,
+    lookahead=SCHEDULER_LOOKAHEAD
+)
+LEADER_JOBS_TICK = float(os.getenv("LEADER_JOBS_TICK", "5"))
+
+# Index builds, sitemap renders and rebuilds run in one worker only
+leader_jobs = LeaderJobs(lambda: publish_scheduler.is_leader, leader_job_queue_collection, tick=LEADER_JOBS_TICK)
+leader_jobs.register("ensure-indexes", run=data_access.ensure_indexes, interval=float("inf"))
+leader_jobs.register("facet-counts", run=reconcile_facet_counts, interval=FACET_REBUILD_INTERVAL)
+
+@on_worker_start
+def start_publish_workers():
+    '''Per-worker threads; only the lease holder promotes and runs leader jobs'''
+    publish_fanout.start()
+    publish_scheduler.start()
+    leader_jobs.start()
+    # Registered here so each worker drains its own threads and releases its lease
+    atexit.register(publish_fanout.drain)
+    atexit.register(publish_scheduler.drain)
+    atexit.register(leader_jobs.drain)
+
+# In the update/status-change route, after the write succeeds:
+#     if updated_article["status"] == "published" and previous_article["status"] != "published":
+#         publish_fanout.enqueue(updated_article)
+#     elif updated_article["status"] == "scheduled":
+#         publish_scheduler.notify(updated_article)
+"""
+
+
+# 23. PRE-RENDERED RSS FEED AND SHARDED SITEMAPS
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from email.utils import format_datetime
+from pathlib import Path
+from xml.sax.saxutils import escape
+from flask import send_file, make_response, abort
+from pymongo import DeleteOne, UpdateOne
+
+# The sitemap protocol allows 50,000 URLs per file
+SITEMAP_SHARD_LIMIT = 50000
+SITEMAP_NAME_RE = re.compile(r'^sitemap-(pages|[0-9]+)[.]xml$')
+SITEMAP_STATIC_PAGES = [
+    ("", "daily", "1.0"),
+    ("/articles", "daily", "0.8"),
+    ("/about", "monthly", "0.6"),
+    ("/contact", "monthly", "0.5")
+]
+SYNDICATION_PROJECTION = {
+    "title": 1, "slug": 1, "excerpt": 1, "category": 1, "author": 1,
+    "date": 1, "published_date": 1, "updated_at": 1, "status": 1
+}
+
+def _cdata(value):
+    return "<![CDATA[" + str(value or "").replace("]]>", "]]]]><![CDATA[>") + "]]>"
+
+def _as_datetime(value):
+    '''Article dates are datetimes or "YYYY-MM-DD" strings'''
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        except ValueError:
+            return None
+    return None
+
+def article_pub_date(article):
+    return _as_datetime(article.get("published_date")) or _as_datetime(article.get("date"))
+
+def article_lastmod(article):
+    return _as_datetime(article.get("updated_at")) or article_pub_date(article)
+
+def ensure_syndication_indexes(db):
+    db["sitemap_urls"].create_index([("shard", 1), ("_id", 1)], name="shard_id")
+
+class SyndicationStore:
+    '''feed.xml, sitemap.xml (index) and sitemap-<n>.xml shards kept on disk
+
+    Each published article has a sitemap_urls row pinned to a shard, so a
+    publish, edit or unpublish re-renders only the feed, the shards it
+    touches and the small index. Only the lease holder assigns shards and
+    renders; every worker serves the files with content-hash ETags.
+    '''
+    
+    def __init__(self, directory, site_url, feed_size=20, shard_limit=SITEMAP_SHARD_LIMIT):
+        self.directory = Path(directory)
+        self.site_url = site_url.rstrip("/")
+        self.feed_size = feed_size
+        self.shard_limit = shard_limit
+        self.lock = threading.Lock()
+        self.etags = {}  # file name -> (mtime_ns, size, etag)
+        self.directory.mkdir(parents=True, exist_ok=True)
+    
+    def _write(self, name, text):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{name}.")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self.directory / name)
+    
+    def etag(self, name, stat_result):
+        cached = self.etags.get(name)
+        if cached and cached[0] == stat_result.st_mtime_ns and cached[1] == stat_result.st_size:
+            return cached[2]
+        digest = hashlib.blake2b((self.directory / name).read_bytes(), digest_size=16).hexdigest()
+        self.etags[name] = (stat_result.st_mtime_ns, stat_result.st_size, digest)
+        return digest
+    
+    # Rendering
+    
+    def render_feed(self, articles_col):
+        articles = list(
+            articles_col.find({"status": "published"}, SYNDICATION_PROJECTION)
+            .sort([("date", -1), ("_id", -1)])
+            .limit(self.feed_size)
+        )
+        items = []
+        for article in articles:
+            link = f"{self.site_url}/articles/{escape(article.get('slug') or '')}"
+            parts = [
+                "    <item>",
+                f"      <title>{_cdata(article.get('title'))}</title>",
+                f"      <description>{_cdata(article.get('excerpt'))}</description>",
+                f"      <link>{link}</link>",
+                f'      <guid isPermaLink="true">{link}</guid>'
+            ]
+            pub_date = article_pub_date(article)
+            if pub_date:
+                parts.append(f"      <pubDate>{format_datetime(pub_date, usegmt=True)}</pubDate>")
+            if article.get("category"):
+                parts.append(f"      <category>{_cdata(article['category'])}</category>")
+            if article.get("author"):
+                parts.append(f"      <author>{_cdata(article['author'])}</author>")
+            parts.append("    </item>")
+            items.append("\n".join(parts))
+        
+        newest = max((article_lastmod(a) for a in articles if article_lastmod(a)), default=None)
+        build_date = format_datetime(newest or datetime.now(timezone.utc), usegmt=True)
+        self._write("feed.xml", "\n".join([
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">',
+            "  <channel>",
+            "    <title>Future Human Journal - Articles</title>",
+            "    <description>Explore the latest insights on the future of humanity through technology, science, and philosophy.</description>",
+            f"    <link>{self.site_url}</link>",
+            "    <language>en-US</language>",
+            f"    <lastBuildDate>{build_date}</lastBuildDate>",
+            f'    <atom:link href="{self.site_url}/feed.xml" rel="self" type="application/rss+xml"/>',
+            *items,
+            "  </channel>",
+            "</rss>",
+            ""
+        ]))
+    
+    def _urlset(self, entries):
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        for loc, lastmod, changefreq, priority in entries:
+            lines.append("  <url>")
+            lines.append(f"    <loc>{escape(loc)}</loc>")
+            if lastmod:
+                lines.append(f"    <lastmod>{lastmod.strftime('%Y-%m-%dT%H:%M:%SZ')}</lastmod>")
+            lines.append(f"    <changefreq>{changefreq}</changefreq>")
+            lines.append(f"    <priority>{priority}</priority>")
+            lines.append("  </url>")
+        lines.append("</urlset>")
+        lines.append("")
+        return "\n".join(lines)
+    
+    def render_shard(self, db, shard):
+        rows = db["sitemap_urls"].find({"shard": shard}, {"slug": 1, "lastmod": 1}).sort("_id", 1)
+        entries = [
+            (f"{self.site_url}/articles/{row['slug']}", _as_datetime(row.get("lastmod")), "weekly", "0.7")
+            for row in rows
+        ]
+        self._write(f"sitemap-{shard}.xml", self._urlset(entries))
+    
+    def render_index(self, db):
+        '''sitemap.xml: one <sitemap> per shard plus the static pages file'''
+        shards = db["sitemap_urls"].aggregate([
+            {"$group": {"_id": "$shard", "lastmod": {"$max": "$lastmod"}}},
+            {"$sort": {"_id": 1}}
+        ])
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        lines.append(f"  <sitemap><loc>{self.site_url}/sitemaps/sitemap-pages.xml</loc></sitemap>")
+        for shard in shards:
+            lastmod = _as_datetime(shard.get("lastmod"))
+            lastmod_tag = f"<lastmod>{lastmod.strftime('%Y-%m-%dT%H:%M:%SZ')}</lastmod>" if lastmod else ""
+            lines.append(f"  <sitemap><loc>{self.site_url}/sitemaps/sitemap-{shard['_id']}.xml</loc>{lastmod_tag}</sitemap>")
+        lines.append("</sitemapindex>")
+        lines.append("")
+        self._write("sitemap.xml", "\n".join(lines))
+    
+    def render_static_pages(self):
+        now = datetime.now(timezone.utc)
+        entries = [(f"{self.site_url}{path}", now, changefreq, priority) for path, changefreq, priority in SITEMAP_STATIC_PAGES]
+        self._write("sitemap-pages.xml", self._urlset(entries))
+    
+    # Maintenance
+    
+    def _next_shard(self, db):
+        '''Last shard while it has room, otherwise a new one'''
+        urls = db["sitemap_urls"]
+        last = urls.find_one({}, {"shard": 1}, sort=[("shard", -1)])
+        if last is None:
+            return 0, 0
+        shard = last["shard"]
+        return shard, urls.count_documents({"shard": shard})
+    
+    def apply(self, articles, removed_ids=()):
+        '''Fold changed/removed articles into the sitemap rows and re-render what they touch'''
+        db, articles_col, _, _ = get_collections()
+        urls = db["sitemap_urls"]
+        with self.lock:
+            ids = [article["_id"] for article in articles] + list(removed_ids)
+            existing = {row["_id"]: row for row in urls.find({"_id": {"$in": ids}}, {"shard": 1, "slug": 1, "lastmod": 1})}
+            shard, used = self._next_shard(db)
+            operations = []
+            touched = set()
+            
+            for article in articles:
+                row = existing.get(article["_id"])
+                if article.get("status") != "published":
+                    if row:
+                        operations.append(DeleteOne({"_id": article["_id"]}))
+                        touched.add(row["shard"])
+                    continue
+                
+                lastmod = article_lastmod(article)
+                if row:
+                    if row.get("slug") == article.get("slug") and _as_datetime(row.get("lastmod")) == lastmod:
+                        continue
+                    target = row["shard"]
+                else:
+                    if used >= self.shard_limit:
+                        shard, used = shard + 1, 0
+                    target = shard
+                    used += 1
+                operations.append(UpdateOne(
+                    {"_id": article["_id"]},
+                    {"$set": {"slug": article.get("slug"), "lastmod": lastmod, "shard": target}},
+                    upsert=True
+                ))
+                touched.add(target)
+            
+            for obj_id in removed_ids:
+                row = existing.get(obj_id)
+                if row:
+                    operations.append(DeleteOne({"_id": obj_id}))
+                    touched.add(row["shard"])
+            
+            if operations:
+                urls.bulk_write(operations, ordered=False)
+            for touched_shard in sorted(touched):
+                self.render_shard(db, touched_shard)
+            if touched:
+                self.render_index(db)
+            self.render_feed(articles_col)
+    
+    def rebuild(self):
+        '''Reassign every published article to shards and render all files'''
+        db, articles_col, _, _ = get_collections()
+        urls = db["sitemap_urls"]
+        with self.lock:
+            urls.delete_many({})
+            batch = []
+            position = 0
+            for article in articles_col.find({"status": "published"}, {"slug": 1, "updated_at": 1, "date": 1, "published_date": 1}).sort("_id", 1):
+                batch.append({
+                    "_id": article["_id"],
+                    "slug": article.get("slug"),
+                    "lastmod": article_lastmod(article),
+                    "shard": position // self.shard_limit
+                })
+                position += 1
+                if len(batch) >= 1000:
+                    urls.insert_many(batch, ordered=False)
+                    batch = []
+            if batch:
+                urls.insert_many(batch, ordered=False)
+            
+            for shard in range((position + self.shard_limit - 1) // self.shard_limit):
+                self.render_shard(db, shard)
+            self.render_index(db)
+            self.render_static_pages()
+            self.render_feed(articles_col)
+        app.logger.info(f"Rebuilt feed and sitemaps for {position} published articles")
+    
+    def apply_ids(self, ids):
+        '''Leader job handler: re-read queued articles (missing ones were deleted)'''
+        _, articles_col, _, _ = get_collections()
+        articles = list(articles_col.find({"_id": {"$in": list(ids)}}, SYNDICATION_PROJECTION))
+        found = {article["_id"] for article in articles}
+        self.apply(articles, removed_ids=[obj_id for obj_id in ids if obj_id not in found])
+    
+    def ensure_built(self):
+        '''Leader job: full rebuild when the files are missing (fresh volume)'''
+        if not (self.directory / "sitemap.xml").exists():
+            self.rebuild()
+    
+    def serve(self, name):
+        path = self.directory / name
+        try:
+            stat_result = path.stat()
+        except FileNotFoundError:
+            abort(404)
+        etag = self.etag(name, stat_result)
+        if request.if_none_match.contains(etag):
+            response = make_response("", 304)
+            response.set_etag(etag)
+        else:
+            response = send_file(
+                path,
+                mimetype="application/xml",
+                conditional=True,
+                etag=etag,
+                last_modified=stat_result.st_mtime,
+                max_age=SYNDICATION_MAX_AGE
+            )
+        response.cache_control.public = True
+        response.cache_control.max_age = SYNDICATION_MAX_AGE
+        return response
+
+@app.route("/syndication/feed.xml", methods=["GET", "HEAD"])
+def syndication_feed():
+    return syndication.serve("feed.xml")
+
+@app.route("/syndication/sitemap.xml", methods=["GET", "HEAD"])
+def syndication_sitemap_index():
+    return syndication.serve("sitemap.xml")
+
+@app.route("/syndication/sitemaps/<name>", methods=["GET", "HEAD"])
+def syndication_sitemap_shard(name):
+    if not SITEMAP_NAME_RE.match(name):
+        abort(404)
+    return syndication.serve(name)
+
+# Add these lines to your app.py
+SYNDICATION_DIR = os.getenv("SYNDICATION_DIR", "syndication")  # shared volume when running several hosts
+SITE_URL = os.getenv("SITE_URL", "https://futurehumanjournal.com")
+SYNDICATION_MAX_AGE = int(os.getenv("SYNDICATION_MAX_AGE", "300"))
+
+SYNDICATION_CHECK_INTERVAL = float(os.getenv("SYNDICATION_CHECK_INTERVAL", "3600"))
+
+syndication = SyndicationStore(SYNDICATION_DIR, SITE_URL)
+
+# Shard assignment and renders happen in the lease holder only, so no two
+# workers race on the last shard or replace a newer file with an older one.
+# Publishes (create, batch import and the scheduler) arrive through the fan-out.
+leader_jobs.register(
+    "syndication",
+    run=syndication.ensure_built,
+    interval=SYNDICATION_CHECK_INTERVAL,
+    handle=syndication.apply_ids
+)
+publish_fanout.register(leader_jobs.publish_hook("syndication"))
+
+# In the update/delete routes, after the write succeeds (edit, slug change, unpublish or delete):
+#     leader_jobs.request("syndication", [obj_id])
+"""
+
+
+# 24. PRECOMPUTED RELATED-ARTICLES INDEX
+"""
+# pip install numpy
+import hashlib
+import threading
+from collections import Counter, defaultdict
+import numpy as np
+from bson import ObjectId
+from pymongo import DeleteOne, UpdateOne
+
+# MinHash over a weighted feature set: taxonomy features are repeated by
+# weight so a shared tag counts more than a shared content word
+RELATED_NUM_PERM = 64
+RELATED_BANDS = 32  # 32 bands x 2 rows: pairs at Jaccard 0.2 share a band ~73% of the time
+RELATED_PRIME = (1 << 31) - 1
+RELATED_FEATURE_WEIGHTS = {"category": 2, "tags": 3, "topics": 3}
+RELATED_CONTENT_TERMS = 25
+
+# Fixed seed so signatures are stable across restarts and leader changes
+_minhash_rng = np.random.default_rng(0x5EED)
+MINHASH_A = _minhash_rng.integers(1, RELATED_PRIME, size=RELATED_NUM_PERM, dtype=np.uint64)
+MINHASH_B = _minhash_rng.integers(0, RELATED_PRIME, size=RELATED_NUM_PERM, dtype=np.uint64)
+
+RELATED_CARD_FIELDS = ["title", "slug", "excerpt", "cover_image", "category", "author", "date", "reading_time"]
+RELATED_SOURCE_PROJECTION = {
+    "category": 1, "tags": 1, "topics": 1, "content": 1, "status": 1, "slug": 1, "updated_at": 1
+}
+
+def related_features(doc):
+    '''Feature tokens for an article: category/tags/topics plus its top TF-IDF content stems'''
+    features = []
+    if doc.get("category"):
+        features += [f"c:{doc['category'].lower()}#{i}" for i in range(RELATED_FEATURE_WEIGHTS["category"])]
+    for field, prefix in (("tags", "t"), ("topics", "p")):
+        for value in doc.get(field) or []:
+            features += [f"{prefix}:{str(value).lower()}#{i}" for i in range(RELATED_FEATURE_WEIGHTS[field])]
+    
+    counts = Counter(stem(token) for token in tokenize(HTML_TAG_RE.sub(" ", doc.get("content") or "")))
+    if counts:
+        idf = search_index.term_idf(counts)
+        top_terms = sorted(counts, key=lambda term: counts[term] * idf[term], reverse=True)
+        features += [f"w:{term}" for term in top_terms[:RELATED_CONTENT_TERMS]]
+    return features
+
+def minhash_signature(features):
+    '''RELATED_NUM_PERM-wide MinHash of a feature set (None when there are no features)'''
+    if not features:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=4).digest(), "big") for f in set(features)),
+        dtype=np.uint64
+    )
+    # (a * x + b) mod p for every permutation at once; fits in uint64 for 32-bit x and 31-bit a, b
+    return ((np.outer(hashes, MINHASH_A) + MINHASH_B) % np.uint64(RELATED_PRIME)).min(axis=0).astype(np.uint32)
+
+def ensure_related_indexes(db):
+    db["article_related"].create_index("slug", name="slug")
+
+class RelatedIndex:
+    '''MinHash/LSH index, held by the lease holder, that keeps article_related up to date
+
+    Signatures live in one NumPy matrix; LSH buckets pick candidates and
+    their similarity is scored in a single vectorized comparison. Each
+    article's top-K neighbours are stored in article_related with card
+    fields, so a detail page needs one key lookup.
+    '''
+    
+    def __init__(self, top_k=8, min_score=0.05):
+        self.top_k = top_k
+        self.min_score = min_score
+        self.lock = threading.RLock()
+        self.ids = []                           # row -> article _id
+        self.rows = {}                          # article _id -> row
+        self.signatures = np.zeros((1024, RELATED_NUM_PERM), dtype=np.uint32)
+        self.active = np.zeros(1024, dtype=bool)  # published rows with a signature
+        self.buckets = defaultdict(set)         # (band, band bytes) -> rows
+        self.row_bands = {}                     # row -> band keys (for removal)
+        self.neighbors = {}                     # _id -> [(neighbour _id, score)]
+        self.listed_in = defaultdict(set)       # _id -> articles listing it
+        self.last_synced = None
+    
+    def _band_keys(self, signature):
+        bands = signature.reshape(RELATED_BANDS, -1)
+        return [(band, bands[band].tobytes()) for band in range(RELATED_BANDS)]
+    
+    def _set(self, obj_id, signature, active):
+        row = self.rows.get(obj_id)
+        if row is None:
+            row = len(self.ids)
+            if row >= len(self.signatures):
+                self.signatures = np.concatenate([self.signatures, np.zeros_like(self.signatures)])
+                self.active = np.concatenate([self.active, np.zeros_like(self.active)])
+            self.ids.append(obj_id)
+            self.rows[obj_id] = row
+        
+        for key in self.row_bands.pop(row, ()):
+            self.buckets[key].discard(row)
+        
+        self.active[row] = bool(active and signature is not None)
+        if self.active[row]:
+            self.signatures[row] = signature
+            keys = self._band_keys(signature)
+            for key in keys:
+                self.buckets[key].add(row)
+            self.row_bands[row] = keys
+    
+    def _compute(self, obj_id):
+        '''Top-K (neighbour _id, score) for an indexed, active article'''
+        row = self.rows.get(obj_id)
+        if row is None or not self.active[row]:
+            return []
+        candidates = set()
+        for key in self.row_bands.get(row, ()):
+            candidates |= self.buckets[key]
+        candidates.discard(row)
+        if not candidates:
+            return []
+        
+        candidate_rows = np.fromiter(candidates, dtype=np.int64)
+        scores = (self.signatures[candidate_rows] == self.signatures[row]).mean(axis=1)
+        keep = scores >= self.min_score
+        candidate_rows, scores = candidate_rows[keep], scores[keep]
+        if len(scores) > self.top_k:
+            best = np.argpartition(-scores, self.top_k - 1)[:self.top_k]
+            candidate_rows, scores = candidate_rows[best], scores[best]
+        order = np.argsort(-scores, kind="stable")
+        return [(self.ids[candidate_rows[i]], float(scores[i])) for i in order]
+    
+    def _kth_score(self, obj_id):
+        current = self.neighbors.get(obj_id) or []
+        return current[-1][1] if len(current) >= self.top_k else self.min_score
+    
+    def _store(self, obj_id, neighbours):
+        for old_id, _ in self.neighbors.get(obj_id, ()):
+            self.listed_in[old_id].discard(obj_id)
+        self.neighbors[obj_id] = neighbours
+        for new_id, _ in neighbours:
+            self.listed_in[new_id].add(obj_id)
+    
+    def update(self, articles, removed_ids=()):
+        '''Re-sign changed articles and recompute every list they can affect'''
+        dirty = set()
+        with self.lock:
+            for article in articles:
+                obj_id = article["_id"]
+                signature = minhash_signature(related_features(article))
+                self._set(obj_id, signature, article.get("status") == "published")
+                dirty.add(obj_id)
+                dirty |= self.listed_in.get(obj_id, set())
+            for obj_id in removed_ids:
+                if obj_id in self.rows:
+                    self._set(obj_id, None, False)
+                dirty.add(obj_id)
+                dirty |= self.listed_in.get(obj_id, set())
+            
+            # A changed article may now beat the weakest neighbour of its own neighbours
+            for article in articles:
+                for other_id, score in self._compute(article["_id"]):
+                    if score > self._kth_score(other_id):
+                        dirty.add(other_id)
+            
+            results = {obj_id: self._compute(obj_id) for obj_id in dirty}
+            for obj_id, neighbours in results.items():
+                self._store(obj_id, neighbours)
+        
+        self._write(results, removed_ids)
+        return len(results)
+    
+    def _write(self, results, removed_ids=()):
+        '''Persist neighbour lists with card snapshots in one bulk_write'''
+        if not results:
+            return
+        db, articles_col, _, _ = get_collections()
+        needed = {obj_id for neighbours in results.values() for obj_id, _ in neighbours} | set(results)
+        cards = {
+            doc["_id"]: doc
+            for doc in articles_col.find({"_id": {"$in": list(needed)}}, {field: 1 for field in RELATED_CARD_FIELDS})
+        }
+        now = datetime.now(timezone.utc)
+        removed = set(removed_ids)
+        operations = []
+        for obj_id, neighbours in results.items():
+            if obj_id in removed or obj_id not in cards:
+                operations.append(DeleteOne({"_id": obj_id}))
+                continue
+            related = []
+            for other_id, score in neighbours:
+                card = cards.get(other_id)
+                if not card:
+                    continue
+                entry = {"id": str(other_id), "score": round(score, 4)}
+                entry.update({field: _lean_value(card[field]) for field in RELATED_CARD_FIELDS if field in card})
+                related.append(entry)
+            operations.append(UpdateOne(
+                {"_id": obj_id},
+                {"$set": {"slug": cards[obj_id].get("slug"), "related": related, "updated_at": now}},
+                upsert=True
+            ))
+        db["article_related"].bulk_write(operations, ordered=False)
+        
+        tags = [f"related:{obj_id}" for obj_id in results]
+        tags += [f"related:{cards[obj_id]['slug']}" for obj_id in results if cards.get(obj_id, {}).get("slug")]
+        response_cache.invalidate(tags)
+    
+    def build(self, collection):
+        '''Sign every article, recompute all lists and replace article_related'''
+        started = datetime.now(timezone.utc)
+        fresh = RelatedIndex(self.top_k, self.min_score)
+        for doc in collection.find({}, RELATED_SOURCE_PROJECTION):
+            fresh._set(doc["_id"], minhash_signature(related_features(doc)), doc.get("status") == "published")
+        results = {}
+        for obj_id in fresh.ids:
+            if fresh.active[fresh.rows[obj_id]]:
+                results[obj_id] = fresh._compute(obj_id)
+                fresh._store(obj_id, results[obj_id])
+        
+        with self.lock:
+            self.ids, self.rows = fresh.ids, fresh.rows
+            self.signatures, self.active = fresh.signatures, fresh.active
+            self.buckets, self.row_bands = fresh.buckets, fresh.row_bands
+            self.neighbors, self.listed_in = fresh.neighbors, fresh.listed_in
+            self.last_synced = started
+        
+        items = list(results.items())
+        for start in range(0, len(items), 1000):
+            self._write(dict(items[start:start + 1000]))
+        collection.database["article_related"].delete_many({"updated_at": {"$lt": started}})
+        app.logger.info(f"Related index built for {len(results)} published articles")
+    
+    def sync(self, collection):
+        '''Fold in articles other workers changed since the last sync'''
+        if self.last_synced is None:
+            return self.build(collection)
+        started = datetime.now(timezone.utc)
+        changed = list(collection.find({"updated_at": {"$gte": self.last_synced}}, RELATED_SOURCE_PROJECTION))
+        if changed:
+            self.update(changed)
+        self.last_synced = started
+        return len(changed)
+    
+    def update_ids(self, ids):
+        '''Leader job handler: re-read queued articles (missing ones were deleted)'''
+        _, articles_col, _, _ = get_collections()
+        articles = list(articles_col.find({"_id": {"$in": list(ids)}}, RELATED_SOURCE_PROJECTION))
+        found = {article["_id"] for article in articles}
+        self.update(articles, removed_ids=[obj_id for obj_id in ids if obj_id not in found])
+    
+    def reset(self):
+        '''Forget sync state so the next time this worker leads it rebuilds'''
+        with self.lock:
+            self.last_synced = None
+
+@app.route("/articles/<key>/related", methods=["GET"])
+@cached_response(lambda key: [f"related:{key}"])
+def get_related_articles(key):
+    '''Precomputed related reading for an article id or slug'''
+    db, _, _, _ = get_collections()
+    try:
+        limit = max(1, min(int(request.args.get("limit", 4)), related_index.top_k))
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    
+    lookup = {"_id": ObjectId(key)} if ObjectId.is_valid(key) else {"slug": key}
+    doc = db["article_related"].find_one(lookup, {"related": {"$slice": limit}})
+    return jsonify({"success": True, "related": doc.get("related", []) if doc else []}), 200
+
+def sync_related_index():
+    _, articles_col, _, _ = get_collections()
+    related_index.sync(articles_col)
+
+# Add these lines to your app.py (after the search index and leader_jobs are set up)
+RELATED_TOP_K = int(os.getenv("RELATED_TOP_K", "8"))
+RELATED_SYNC_INTERVAL = float(os.getenv("RELATED_SYNC_INTERVAL", "120"))
+
+# Only the lease holder builds and syncs, so article_related has one writer and
+# one IDF; other workers queue changed ids for it
+related_index = RelatedIndex(top_k=RELATED_TOP_K)
+leader_jobs.register(
+    "related",
+    run=sync_related_index,
+    interval=RELATED_SYNC_INTERVAL,
+    handle=related_index.update_ids,
+    reset=related_index.reset
+)
+publish_fanout.register(leader_jobs.publish_hook("related"))
+
+# In the update/delete routes, after the write succeeds (edit, unpublish or delete):
+#     leader_jobs.request("related", [obj_id])
+"""
+
+
+# 25. TIME-DECAYED TRENDING SCORE AND "HOT NOW"
+"""
+import threading
+import time
+from pymongo import UpdateOne
+
+# Scores are kept on a log2 scale anchored at a fixed epoch:
+#     trending = log2(decayed score at t) + (t - TRENDING_EPOCH) / half-life
+# which ranks articles exactly like their decayed scores do right now, but
+# never has to be rewritten as time passes. Only interactions touch it.
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+TRENDING_MIN_SCORE = 1e-6
+
+def trending_points(inc):
+    '''Weighted points for a buffered counter delta (unlikes subtract)'''
+    return (
+        inc.get("view_count", 0) * TRENDING_WEIGHTS["view"]
+        + inc.get("likes", 0) * TRENDING_WEIGHTS["like"]
+        + inc.get("shares", 0) * TRENDING_WEIGHTS["share"]
+    )
+
+def trending_update(obj_id, points, at):
+    '''Pipeline update: decay the stored score to `at`, add points and re-rank'''
+    half_life_ms = TRENDING_HALF_LIFE_HOURS * 3600 * 1000
+    elapsed_ms = {"$max": [{"$subtract": [at, {"$ifNull": ["$trending_at", at]}]}, 0]}
+    decayed = {"$multiply": [
+        {"$ifNull": ["$trending_score", 0]},
+        {"$pow": [2, {"$divide": [{"$multiply": [-1, elapsed_ms]}, half_life_ms]}]}
+    ]}
+    anchor = {"$divide": [{"$subtract": ["$trending_at", TRENDING_EPOCH]}, half_life_ms]}
+    return UpdateOne({"_id": obj_id}, [
+        {"$set": {
+            "trending_score": {"$max": [{"$add": [decayed, points]}, TRENDING_MIN_SCORE]},
+            "trending_at": {"$max": [at, {"$ifNull": ["$trending_at", at]}]}
+        }},
+        {"$set": {"trending": {"$add": [{"$log": ["$trending_score", 2]}, anchor]}}}
+    ])
+
+def current_trending_score(article, now=None):
+    '''Decayed score as of now (for display; ranking uses the trending field)'''
+    if article.get("trending") is None:
+        return 0.0
+    now = now or datetime.now(timezone.utc)
+    half_lives = (now - TRENDING_EPOCH).total_seconds() / 3600 / TRENDING_HALF_LIFE_HOURS
+    return 2 ** (article["trending"] - half_lives)
+
+class TrendingBoard:
+    '''In-memory top-N published articles by trending, refreshed from the index'''
+    
+    def __init__(self, size=50, refresh_interval=30.0):
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.articles = []
+        self.refreshed_at = None
+        self.thread = None
+        self.pid = None
+    
+    def start(self):
+        '''Start the refresh thread in this process (threads do not survive fork)'''
+        with self.lock:
+            if self.pid == os.getpid() and self.thread and self.thread.is_alive():
+                return
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self.run, name="trending-board", daemon=True)
+            self.thread.start()
+    
+    def refresh(self, articles_col):
+        projection = dict(PROJECTION_PROFILES["card"], trending=1)
+        docs = list(
+            articles_col.find({"status": "published", "trending": {"$ne": None}}, projection)
+            .sort([("trending", -1), ("_id", -1)])
+            .limit(self.size)
+        )
+        now = datetime.now(timezone.utc)
+        articles = []
+        for doc in docs:
+            serialized = serialize_article_profile(doc, "card")
+            serialized["trending_score"] = round(current_trending_score(doc, now), 3)
+            articles.append(serialized)
+        with self.lock:
+            self.articles = articles
+            self.refreshed_at = now
+    
+    def top(self, limit):
+        with self.lock:
+            return self.articles[:limit], self.refreshed_at
+    
+    def run(self):
+        while True:
+            try:
+                _, articles_col, _, _ = get_collections()
+                self.refresh(articles_col)
+            except Exception as e:
+                app.logger.error(f"Error refreshing trending board: {e}")
+            time.sleep(self.refresh_interval)
+
+@app.route("/api/trending", methods=["GET"])
+def hot_now():
+    '''Top trending articles from the in-memory board (no database round trip)'''
+    try:
+        limit = max(1, min(int(request.args.get("limit", 5)), trending_board.size))
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    articles, refreshed_at = trending_board.top(limit)
+    response = jsonify({
+        "success": True,
+        "articles": articles,
+        "refreshed_at": refreshed_at.isoformat() if refreshed_at else None
+    })
+    response.cache_control.public = True
+    response.cache_control.max_age = int(trending_board.refresh_interval)
+    return response, 200
+
+# Add these lines to your app.py
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+TRENDING_WEIGHTS = {
+    "view": float(os.getenv("TRENDING_WEIGHT_VIEW", "1")),
+    "like": float(os.getenv("TRENDING_WEIGHT_LIKE", "5")),
+    "share": float(os.getenv("TRENDING_WEIGHT_SHARE", "10"))
+}
+
+trending_board = TrendingBoard(
+    size=int(os.getenv("TRENDING_BOARD_SIZE", "50")),
+    refresh_interval=float(os.getenv("TRENDING_REFRESH_INTERVAL", "30"))
+)
+on_worker_start(trending_board.start)
+
+# sort_by=trending uses the status_trending_id index created from CURSOR_SORT_FIELDS
+"""
+
+
+# 26. FAST SERIALIZATION: COMPILED PROFILES, ORJSON PROVIDER, COMPILED VALIDATOR
+"""
+# pip install orjson   (optional; falls back to the stdlib encoder)
+import base64
+import json
+from decimal import Decimal
+from bson import Binary, Decimal128, ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _bson_default(value):
+    '''Encode the BSON/Python types the JSON backends do not know'''
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        # orjson encodes datetimes itself (same RFC 3339 text); this is the stdlib path
+        return value.isoformat()
+    if isinstance(value, (Decimal128, Decimal)):
+        return str(value)
+    if isinstance(value, (bytes, Binary)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONProvider(DefaultJSONProvider):
+    '''Flask JSON provider backed by orjson, with BSON types handled natively'''
+    
+    def dumps(self, obj, **kwargs):
+        if orjson is not None:
+            return orjson.dumps(obj, default=_bson_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        return json.dumps(obj, default=_bson_default, ensure_ascii=False, separators=(",", ":"))
+    
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is not None:
+            body = orjson.dumps(obj, default=_bson_default, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            body = self.dumps(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+def compile_article_serializer(fields=None, exclude=(), interactions=False, unique_viewers=False):
+    '''Build a serializer for one profile from its field list
+
+    fields=None copies every field except exclude (the full profile). The
+    field tuple, interaction map and lookups are bound once here instead of
+    being rebuilt for every article. unique_viewers adds the HLL estimate to
+    interactions (the profile's projection must load uv_hll).
+    '''
+    fields = tuple(fields) if fields is not None else None
+    excluded = frozenset(exclude) | {"_id"}
+    counts = tuple(INTERACTION_COUNT_FIELDS.items())
+    
+    if fields is not None:
+        def serialize(article):
+            serialized = {"id": str(article["_id"])}
+            for field in fields:
+                if field in article:
+                    serialized[field] = article[field]
+            if interactions:
+                get = article.get
+                serialized["interactions"] = {name: get(source, 0) for name, source in counts}
+            return serialized
+    else:
+        def serialize(article):
+            serialized = {"id": str(article["_id"])}
+            for field, value in article.items():
+                if field not in excluded:
+                    serialized[field] = value
+            # Stored trending is a log-scale rank key; clients get the score as of now
+            if article.get("trending") is not None:
+                serialized["trending_score"] = round(current_trending_score(article), 3)
+            if interactions:
+                get = article.get
+                serialized["interactions"] = {name: get(source, 0) for name, source in counts}
+                if unique_viewers:
+                    serialized["interactions"]["unique_viewers"] = estimate_unique_viewers(article)
+            return serialized
+    return serialize
+
+ARTICLE_SERIALIZERS = {
+    "card": compile_article_serializer(CARD_FIELDS, interactions=True),
+    "feed": compile_article_serializer(FEED_FIELDS),
+    "sitemap": compile_article_serializer(SITEMAP_FIELDS),
+    "full": compile_article_serializer(exclude=INTERNAL_FIELDS, interactions=True),
+    "detail": compile_article_serializer(exclude=INTERNAL_FIELDS, interactions=True, unique_viewers=True)
+}
+
+# The existing article payload rules; compile_validator turns them into checks once
+ARTICLE_SCHEMA = {
+    "title": {"label": "Title", "required": True, "max_length": 200},
+    "content": {"label": "Content", "required": True, "min_length": 100},
+    "category": {"label": "Category", "choices": VALID_CATEGORIES}
+}
+
+def compile_validator(schema):
+    '''Turn a field-rule schema into a validate(data) -> errors function'''
+    checks = []
+    for field, rules in schema.items():
+        label = rules["label"]
+        required = rules.get("required", False)
+        max_length = rules.get("max_length")
+        min_length = rules.get("min_length")
+        choices = rules.get("choices")
+        choice_set = frozenset(choices) if choices else None
+        messages = {
+            "required": f"{label} is required",
+            "max_length": f"{label} must be less than {max_length} characters",
+            "min_length": f"{label} must be at least {min_length} characters",
+            "choices": f"Invalid {label.lower()}. Valid options: {', '.join(choices)}" if choices else None
+        }
+        
+        def check(data, field=field, required=required, max_length=max_length,
+                  min_length=min_length, choice_set=choice_set, messages=messages):
+            value = data.get(field)
+            if not value:
+                return {"field": field, "message": messages["required"]} if required else None
+            if max_length is not None and len(value) > max_length:
+                return {"field": field, "message": messages["max_length"]}
+            if min_length is not None and len(value) < min_length:
+                return {"field": field, "message": messages["min_length"]}
+            if choice_set is not None:
+                try:
+                    allowed = value in choice_set
+                except TypeError:
+                    # Unhashable (e.g. a list) can't be one of the options
+                    allowed = False
+                if not allowed:
+                    return {"field": field, "message": messages["choices"]}
+            return None
+        
+        checks.append(check)
+    
+    def validate(data):
+        errors = []
+        for check in checks:
+            error = check(data)
+            if error is not None:
+                errors.append(error)
+        return errors
+    
+    return validate
+
+# Add these lines to your app.py, right after app = Flask(__name__)
+app.json_provider_class = FastJSONProvider
+app.json = FastJSONProvider(app)
+
+article_validator = compile_validator(ARTICLE_SCHEMA)
+"""
+
+
+# 27. DEDUPLICATED, PERSISTENT RESEARCH-TOPIC CACHE
+"""
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import timedelta
+
+RESEARCH_MODELS = ["sonar-pro", "sonar"]
+
+def normalize_research_query(query):
+    '''Case, width, punctuation and whitespace-insensitive form of a query'''
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = "".join(ch if ch.isalnum() else " " for ch in text)
+    return " ".join(text.split())
+
+def research_cache_key(query, model, api_key=None):
+    '''Cache key for a query, model and credential
+
+    Results fetched with a caller-supplied api_key are cached only for that
+    key (by its hash), so a key that works never fills the shared entry that
+    server-key requests read.
+    '''
+    normalized = normalize_research_query(query)
+    credential = hashlib.sha256(api_key.encode("utf-8")).hexdigest() if api_key else None
+    return hashlib.sha256(json.dumps([model, normalized, credential]).encode("utf-8")).hexdigest()
+
+class SonarResearchClient:
+    '''Research client for the Perplexity Sonar chat completions API'''
+    
+    def __init__(self, api_key, base_url="https://api.perplexity.ai", timeout=120):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+    
+    def research(self, query, model, api_key=None):
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": "You are a research assistant for a publication about technology and the future of humanity. Summarize recent, well-sourced developments."},
+                {"role": "user", "content": query}
+            ]
+        }
+        req = urllib.request.Request(
+            f"{self.base_url}/chat/completions",
+            data=json.dumps(payload).encode("utf-8"),
+            method="POST",
+            headers={
+                "Authorization": f"Bearer {api_key or self.api_key}",
+                "Content-Type": "application/json"
+            }
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            raw = json.loads(response.read().decode("utf-8"))
+        return {
+            "summary": raw["choices"][0]["message"]["content"],
+            "sources": raw.get("citations", []),
+            "raw_response": json.dumps(raw)
+        }
+
+class StubResearchClient:
+    '''Local stand-in that answers every query with canned text (for tests and dev)'''
+    
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+    
+    def research(self, query, model, api_key=None):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return {
+            "summary": f"Stub research summary for '{query}' ({model}).",
+            "sources": ["https://example.com/research"],
+            "raw_response": "{}"
+        }
+
+class ResearchCache:
+    '''TTL + LRU cache of research results with single-flight lookups
+
+    Results are kept in a local LRU and in the research_cache collection
+    (TTL index on expires_at), so they survive restarts and are shared by
+    workers. Concurrent requests for the same key wait on one outbound call.
+    '''
+    
+    def __init__(self, client, collection_getter=None, ttl=7 * 24 * 3600, max_entries=500, wait_timeout=180):
+        self.client = client
+        self.collection_getter = collection_getter
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self.entries = OrderedDict()  # key -> (data, expires_at monotonic)
+        self.in_flight = {}           # key -> Future
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def _get_local(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+    
+    def _set_local(self, key, data, ttl):
+        with self.lock:
+            self.entries[key] = (data, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def _get_persisted(self, key):
+        if self.collection_getter is None:
+            return None
+        try:
+            doc = self.collection_getter().find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}
+            )
+        except Exception as e:
+            app.logger.warning(f"Research cache read failed: {e}")
+            return None
+        if not doc:
+            return None
+        expires_at = doc["expires_at"].replace(tzinfo=timezone.utc) if doc["expires_at"].tzinfo is None else doc["expires_at"]
+        remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        self._set_local(key, doc["data"], remaining)
+        return doc["data"]
+    
+    def _persist(self, key, data):
+        if self.collection_getter is None:
+            return
+        now = datetime.now(timezone.utc)
+        try:
+            self.collection_getter().replace_one(
+                {"_id": key},
+                {"_id": key, "data": data, "created_at": now, "expires_at": now + timedelta(seconds=self.ttl)},
+                upsert=True
+            )
+        except Exception as e:
+            app.logger.warning(f"Research cache write failed: {e}")
+    
+    def lookup(self, query, model, refresh=False, api_key=None):
+        '''Return (data, source) where source is "memory", "persisted", "shared" or "fetched"'''
+        key = research_cache_key(query, model, api_key)
+        if not refresh:
+            data = self._get_local(key)
+            if data is not None:
+                self.hits += 1
+                return data, "memory"
+            data = self._get_persisted(key)
+            if data is not None:
+                self.hits += 1
+                return data, "persisted"
+        
+        with self.lock:
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+        
+        if not leader:
+            # An identical request is already out; share its answer
+            self.hits += 1
+            return future.result(timeout=self.wait_timeout), "shared"
+        
+        try:
+            if not refresh:
+                # A leader (here or in another worker) that finished between our
+                # cache check and taking the slot has already stored the answer
+                data = self._get_local(key) or self._get_persisted(key)
+                if data is not None:
+                    self.hits += 1
+                    future.set_result(data)
+                    return data, "shared"
+            
+            self.misses += 1
+            result = self.client.research(query, model, api_key=api_key)
+            data = {
+                "query": query,
+                "model": model,
+                "summary": result["summary"],
+                "sources": result.get("sources", []),
+                "raw_response": result.get("raw_response", ""),
+                "generated_at": datetime.now(timezone.utc).isoformat()
+            }
+            self._set_local(key, data, self.ttl)
+            self._persist(key, data)
+            future.set_result(data)
+            return data, "fetched"
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+def research_cache_collection():
+    db, _, _, _ = get_collections()
+    return db["research_cache"]
+
+def ensure_research_cache_indexes(db):
+    db["research_cache"].create_index("expires_at", expireAfterSeconds=0, name="expires_at_ttl")
+
+@app.route("/api/research-topic", methods=["POST"])
+def research_topic():
+    '''Research a topic, answering repeats from the cache'''
+    data = request.get_json(silent=True) or {}
+    query = (data.get("query") or "").strip()
+    model = data.get("model", "sonar-pro")
+    
+    if not query:
+        return jsonify({"status": "error", "error": "Research query is required"}), 400
+    if model not in RESEARCH_MODELS:
+        return jsonify({"status": "error", "error": f"Invalid model. Valid options: {', '.join(RESEARCH_MODELS)}"}), 400
+    
+    started = time.perf_counter()
+    try:
+        result, source = research_cache.lookup(
+            query, model, refresh=bool(data.get("refresh")), api_key=data.get("api_key")
+        )
+    except Exception as e:
+        app.logger.error(f"Research request failed: {e}")
+        return jsonify({"status": "error", "error": "Research request failed", "details": str(e)}), 502
+    
+    # Echo the caller's wording even when a differently-phrased query filled the cache
+    result = dict(result, query=query)
+    metrics.observe("research_lookup_seconds", time.perf_counter() - started, source=source)
+    return jsonify({"status": "success", "data": result, "cached": source != "fetched", "cache_source": source}), 200
+
+# Add these lines to your app.py
+RESEARCH_CACHE_TTL = float(os.getenv("RESEARCH_CACHE_TTL", str(7 * 24 * 3600)))
+RESEARCH_CACHE_MAX_ENTRIES = int(os.getenv("RESEARCH_CACHE_MAX_ENTRIES", "500"))
+
+# RESEARCH_CLIENT=stub answers locally without calling out
+if os.getenv("RESEARCH_CLIENT", "sonar") == "stub":
+    research_client = StubResearchClient(delay=float(os.getenv("RESEARCH_STUB_DELAY", "0")))
+else:
+    research_client = SonarResearchClient(os.getenv("PERPLEXITY_API_KEY", ""))
+
+research_cache = ResearchCache(
+    research_client,
+    collection_getter=research_cache_collection,
+    ttl=RESEARCH_CACHE_TTL,
+    max_entries=RESEARCH_CACHE_MAX_ENTRIES
+)
+metrics.describe("research_lookup_seconds", "histogram", "POST /api/research-topic time by cache source")
+"""
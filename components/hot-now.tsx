@@ -0,0 +1,87 @@
+"use client";
+
+import React from "react";
+import Link from "next/link";
+import { Flame } from "lucide-react";
+
+interface TrendingArticle {
+  id: string;
+  title: string;
+  slug: string;
+  category?: string;
+  trending_score: number;
+}
+
+async function getTrendingArticles(
+  limit: number = 5
+): Promise<TrendingArticle[]> {
+  const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL;
+  try {
+    const res = await fetch(`${API_BASE_URL}/api/trending?limit=${limit}`, {
+      next: { revalidate: 60 },
+    });
+
+    if (!res.ok) {
+      console.error(
+        "Failed to fetch trending articles from Flask, status:",
+        res.status
+      );
+      return [];
+    }
+    const responseData = await res.json();
+    return responseData.articles || [];
+  } catch (error) {
+    console.error("Error fetching trending articles from Flask:", error);
+    return [];
+  }
+}
+
+export function HotNow() {
+  const [articles, setArticles] = React.useState<TrendingArticle[]>([]);
+
+  React.useEffect(() => {
+    getTrendingArticles().then(setArticles);
+  }, []);
+
+  if (articles.length === 0) {
+    return null;
+  }
+
+  return (
+    <section className="py-12 md:py-16 relative">
+      <div className="container px-8">
+        <div className="mx-auto max-w-2xl">
+          <h2 className="text-xl font-bold tracking-tight mb-6 flex items-center gap-2">
+            <Flame className="h-5 w-5 text-accent-secondary" />
+            <span className="bg-gradient-to-r from-primary to-primary/70 bg-clip-text text-transparent">
+              Hot
+            </span>{" "}
+            Now
+          </h2>
+          <ol className="space-y-3">
+            {articles.map((article, index) => (
+              <li key={article.id} className="flex items-baseline gap-4">
+                <span className="text-sm font-mono text-muted-foreground w-5">
+                  {index + 1}
+                </span>
+                <div className="flex-1">
+                  <Link
+                    href={`/articles/${article.slug}`}
+                    className="text-sm font-medium hover:text-primary transition-colors"
+                  >
+                    {article.title}
+                  </Link>
+                  {article.category && (
+                    <span className="ml-2 text-xs text-muted-foreground">
+                      {article.category}
+                    </span>
+                  )}
+                </div>
+              </li>
+            ))}
+          </ol>
+        </div>
+      </div>
+    </section>
+  );
+}
@@ -10,7 +10,7 @@ async function getRecentArticles(limit: number = 4): Promise<Article[]> {
   const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL;
   try {
     const res = await fetch(
-      `${API_BASE_URL}/articles?limit=${limit}&sort_by=date&sort_order=desc`,
+      `${API_BASE_URL}/articles?limit=${limit}&sort_by=date&sort_order=desc&fields=card`,
       {
         next: { revalidate: 3600 }, // Revalidate every hour
       }
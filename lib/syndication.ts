@@ -0,0 +1,48 @@
+// Feed and sitemap XML is pre-rendered by the Flask backend; these helpers
+// pass requests through with their conditional headers so a poll that
+// finds nothing new is a 304 from a static file.
+
+const PASSTHROUGH_HEADERS = [
+  "content-type",
+  "etag",
+  "last-modified",
+  "cache-control",
+];
+
+export async function proxySyndication(
+  request: Request,
+  path: string
+): Promise<Response | null> {
+  const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL;
+  const headers: Record<string, string> = {};
+  const ifNoneMatch = request.headers.get("if-none-match");
+  const ifModifiedSince = request.headers.get("if-modified-since");
+  if (ifNoneMatch) headers["If-None-Match"] = ifNoneMatch;
+  if (ifModifiedSince) headers["If-Modified-Since"] = ifModifiedSince;
+
+  try {
+    const res = await fetch(`${API_BASE_URL}/syndication/${path}`, {
+      headers,
+      cache: "no-store",
+    });
+
+    if (res.status !== 200 && res.status !== 304) {
+      console.error(`Failed to fetch ${path} from backend, status:`, res.status);
+      return null;
+    }
+
+    const responseHeaders = new Headers();
+    for (const name of PASSTHROUGH_HEADERS) {
+      const value = res.headers.get(name);
+      if (value) responseHeaders.set(name, value);
+    }
+
+    return new Response(res.status === 304 ? null : res.body, {
+      status: res.status,
+      headers: responseHeaders,
+    });
+  } catch (error) {
+    console.error(`Error fetching ${path} from backend:`, error);
+    return null;
+  }
+}
@@ -0,0 +1,269 @@
+'''Tests for the app.py snippets in backend_fixes.py
+
+The snippets are not an importable module, so load() pulls named top-level
+definitions out of the section code blocks and runs them in a namespace the
+test provides. Later definitions of a name win, as when the sections are
+pasted into app.py in order.
+'''
+import ast
+import hashlib
+import json
+import math
+import re
+import threading
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+SOURCE = Path(__file__).resolve().parent.parent / "backend_fixes.py"
+
+def _definitions():
+    text = SOURCE.read_text(encoding="utf-8")
+    definitions = {}
+    for block in text.split('"""')[1::2]:
+        try:
+            tree = ast.parse(block)
+        except SyntaxError:
+            continue
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+                definitions[node.name] = node
+            elif isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        definitions[target.id] = node
+    return definitions
+
+DEFINITIONS = _definitions()
+
+def load(*names, **namespace):
+    '''Run the named definitions in order and return the namespace'''
+    module = ast.Module(body=[DEFINITIONS[name] for name in names], type_ignores=[])
+    exec(compile(module, str(SOURCE), "exec"), namespace)
+    return namespace
+
+class Args(dict):
+    '''The request.args calls listing_tags_for makes (values are lists)'''
+
+    def get(self, name, default=None):
+        values = super().get(name)
+        return values[0] if values else default
+
+    def getlist(self, name):
+        return super().get(name, [])
+
+
+# Compiled validator (section 26)
+
+@pytest.fixture
+def validate():
+    ns = load("compile_validator")
+    return ns["compile_validator"]({
+        "title": {"label": "Title", "required": True, "max_length": 10},
+        "content": {"label": "Content", "required": True, "min_length": 5},
+        "category": {"label": "Category", "choices": ["Technology", "Science"]}
+    })
+
+def test_validator_accepts_valid_data(validate):
+    assert validate({"title": "Hello", "content": "Long enough", "category": "Science"}) == []
+
+def test_validator_reports_each_rule(validate):
+    errors = validate({"title": "x" * 11, "content": "tiny", "category": "Cooking"})
+    assert [error["field"] for error in errors] == ["title", "content", "category"]
+    assert errors[0]["message"] == "Title must be less than 10 characters"
+    assert errors[1]["message"] == "Content must be at least 5 characters"
+    assert errors[2]["message"].startswith("Invalid category. Valid options: Technology, Science")
+
+def test_validator_required_and_unhashable_choice(validate):
+    errors = validate({"content": "Long enough", "category": ["Science"]})
+    assert errors == [
+        {"field": "title", "message": "Title is required"},
+        {"field": "category", "message": errors[1]["message"]}
+    ]
+
+
+# Research cache keys (section 27)
+
+@pytest.fixture
+def research():
+    return load("normalize_research_query", "research_cache_key", hashlib=hashlib, json=json, unicodedata=unicodedata)
+
+def test_research_query_normalization(research):
+    normalize = research["normalize_research_query"]
+    assert normalize("  What's NEW in   AI? ") == "what s new in ai"
+    assert normalize("ＡＩ ethics") == "ai ethics"
+
+def test_research_cache_key_ignores_formatting_not_model(research):
+    key = research["research_cache_key"]
+    assert key("AI ethics?", "sonar") == key("ai   ETHICS", "sonar")
+    assert key("AI ethics", "sonar") != key("AI ethics", "sonar-pro")
+
+def test_research_cache_key_fields_do_not_run_together(research):
+    key = research["research_cache_key"]
+    assert key("0 ai", "sonar") != key("ai", "sonar 0")
+
+def test_research_cache_key_is_per_credential(research):
+    key = research["research_cache_key"]
+    assert key("AI ethics", "sonar", "caller-key") != key("AI ethics", "sonar")
+    assert key("AI ethics", "sonar", "caller-key") != key("AI ethics", "sonar", "other-key")
+    assert key("AI ethics", "sonar", "") == key("AI ethics", "sonar")
+
+
+# Unique-viewer sketch (section 6)
+
+@pytest.fixture
+def hll():
+    return load(
+        "HLL_PRECISION", "HLL_REGISTERS", "HLL_ALPHA", "hll_register", "estimate_unique_viewers",
+        hashlib=hashlib, math=math
+    )
+
+def sketch_of(hll, viewers):
+    registers = {}
+    for viewer in viewers:
+        index, rank = hll["hll_register"](viewer)
+        registers[str(index)] = max(rank, registers.get(str(index), 0))
+    return {"uv_hll": registers}
+
+def test_unique_viewers_empty_sketch(hll):
+    assert hll["estimate_unique_viewers"]({}) == 0
+
+@pytest.mark.parametrize("count", [10, 200, 5000])
+def test_unique_viewers_estimate_is_close(hll, count):
+    viewers = [f"user-{i}" for i in range(count)]
+    estimate = hll["estimate_unique_viewers"](sketch_of(hll, viewers + viewers[: count // 2]))
+    assert abs(estimate - count) <= max(2, count * 0.15)
+
+
+# Interaction flush retries (section 6)
+
+@pytest.fixture
+def buffer():
+    ns = load("InteractionBuffer", threading=threading)
+    return ns["InteractionBuffer"](lambda: None)
+
+def test_failed_parts_retries_only_listed_ops(buffer):
+    at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    first_chunk = [{"type": "share", "timestamp": at}]
+    second_chunk = [{"type": "like", "timestamp": at + timedelta(hours=1)}]
+    batch = {"a": dict(
+        buffer._new_entry(), inc={"view_count": 3}, trending=2.0,
+        likes={"u1": True, "u2": False}, events=first_chunk + second_chunk, last_interaction=at
+    )}
+    owners = [
+        ("a", "counters"), ("a", "trending"), ("a", ("like", "u2")),
+        ("a", ("events", first_chunk)), ("a", ("events", second_chunk))
+    ]
+    failed = buffer._failed_parts(batch, owners, [1, 2, 4])
+    assert failed["a"]["inc"] == {}
+    assert failed["a"]["trending"] == 2.0
+    assert failed["a"]["likes"] == {"u2": False}
+    assert failed["a"]["events"] == second_chunk
+
+
+# Decayed trending score (section 25)
+
+def test_current_trending_score_halves_each_half_life():
+    ns = load("TRENDING_EPOCH", "current_trending_score", datetime=datetime, timezone=timezone)
+    ns["TRENDING_HALF_LIFE_HOURS"] = 24.0
+    now = datetime(2025, 6, 1, tzinfo=timezone.utc)
+    half_lives = (now - ns["TRENDING_EPOCH"]).total_seconds() / 3600 / 24
+    article = {"trending": half_lives + math.log2(8)}
+    score = ns["current_trending_score"]
+    assert score(article, now) == pytest.approx(8)
+    assert score(article, now + timedelta(hours=24)) == pytest.approx(4)
+    assert score({"trending": None}, now) == 0.0
+
+
+# Listing cache tags (section 15)
+
+@pytest.fixture
+def listing_tags_for():
+    return load("listing_tags_for")["listing_tags_for"]
+
+def test_listing_tags_narrowed_by_facets(listing_tags_for):
+    tags = listing_tags_for(Args(category=["AI"], tags=["ml", "ethics"]))
+    assert tags == ["articles:category:AI", "articles:tag:ml", "articles:tag:ethics"]
+
+def test_listing_tags_fall_back_to_all_articles(listing_tags_for):
+    assert listing_tags_for(Args()) == ["articles"]
+    assert listing_tags_for(Args(category=["AI"], search=["robots"])) == ["articles"]
+
+@pytest.mark.parametrize("sort_by", ["views", "likes", "trending"])
+def test_listing_tags_for_interaction_sorts(listing_tags_for, sort_by):
+    assert listing_tags_for(Args(sort_by=[sort_by])) == ["articles", f"articles:sort:{sort_by}"]
+    assert listing_tags_for(Args(sort_by=["date"])) == ["articles"]
+
+
+# Keyset pagination (section 8)
+
+def page_through(ns, collection, sort_field, sort_direction, limit):
+    seen = []
+    after = None
+    sort = [(sort_field, sort_direction), ("_id", sort_direction)]
+    while True:
+        query = {"status": "published"}
+        if after:
+            query = ns["apply_cursor"](query, after, sort_field, sort_direction)
+        docs = list(collection.find(query).sort(sort).limit(limit + 1))
+        seen += [doc["_id"] for doc in docs[:limit]]
+        if len(docs) <= limit:
+            return seen
+        after = ns["encode_cursor"](docs[limit - 1], sort_field, sort_direction)
+
+@pytest.mark.parametrize("sort_direction", [-1, 1])
+def test_cursor_includes_articles_missing_the_sort_field(sort_direction):
+    bson = pytest.importorskip("bson")
+    mongomock = pytest.importorskip("mongomock")
+    import base64
+    ns = load("encode_cursor", "decode_cursor", "apply_cursor", base64=base64, json_util=bson.json_util)
+
+    collection = mongomock.MongoClient()["fhj_test_pagination"]["articles"]
+    scored = [{"_id": bson.ObjectId(), "status": "published", "trending": float(i % 3)} for i in range(7)]
+    unscored = [{"_id": bson.ObjectId(), "status": "published"} for _ in range(4)]
+    unscored.append({"_id": bson.ObjectId(), "status": "published", "trending": None})
+    collection.insert_many(scored + unscored)
+
+    for limit in (1, 2, 5):
+        seen = page_through(ns, collection, "trending", sort_direction, limit)
+        expected = [doc["_id"] for doc in collection.find({"status": "published"}).sort(
+            [("trending", sort_direction), ("_id", sort_direction)]
+        )]
+        assert seen == expected
+        assert len(seen) == len(scored) + len(unscored)
+
+def test_cursor_rejects_a_different_sort():
+    bson = pytest.importorskip("bson")
+    import base64
+    ns = load("encode_cursor", "decode_cursor", "apply_cursor", base64=base64, json_util=bson.json_util)
+    token = ns["encode_cursor"]({"_id": bson.ObjectId(), "date": "2025-01-01"}, "date", -1)
+    with pytest.raises(ValueError):
+        ns["apply_cursor"]({}, token, "likes", -1)
+    with pytest.raises(ValueError):
+        ns["decode_cursor"]("not-a-cursor")
+
+
+# Batch import slugs and NDJSON chunks (section 13)
+
+class EmptySlugs:
+    '''A collection with no existing slugs'''
+
+    def find(self, query, projection):
+        return []
+
+def test_allocate_slugs_avoids_slugs_reserved_by_earlier_chunks():
+    allocate_slugs = load("allocate_slugs", re=re)["allocate_slugs"]
+    reserved = set()
+    assert allocate_slugs(["ai", "ai"], EmptySlugs(), reserved) == ["ai", "ai-1"]
+    assert allocate_slugs(["ai", "robots"], EmptySlugs(), reserved) == ["ai-2", "robots"]
+    assert reserved == {"ai", "ai-1", "ai-2", "robots"}
+
+def test_ndjson_batches_keep_input_line_numbers():
+    ns = load("_ndjson_batches", json=json, NDJSON_CHUNK_SIZE=2)
+    body = [b'{"title": "a"}\n', b"\n", b"not json\n", b'{"title": "c"}\n']
+    chunks = list(ns["_ndjson_batches"](body))
+    assert [(start, lines) for start, _, _, lines in chunks] == [(0, [1, 3]), (2, [4])]
+    assert chunks[0][1] == [{"title": "a"}, None]
+    assert [index for index, _ in chunks[0][2]] == [1]